@@ -0,0 +1,287 @@
+import os, sys, json, time, random, argparse, tempfile, contextlib, io
+
+from textsplit import (markdown_to_blocks, block_to_block_type, lex_blocks, text_to_textnodes,
+                       markdown_to_html_node, scan_spans, BlockType, INLINE_PARSERS)
+
+WORDS = ("elf ring shire ranger river mountain wizard hobbit forest song tower lore "
+         "ancient shadow road valley star journey council king sword fire").split()
+
+BENCH_TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>"""
+
+
+class CorpusSpec():
+    """Knobs for the synthetic site: how many pages, how big, how busy."""
+
+    def __init__(self, pages=200, blocks_per_page=40, words_per_paragraph=60, inline_density=0.15,
+                 list_ratio=0.15, code_ratio=0.05, images_per_page=2, links_per_page=5, seed=1):
+        self.pages = pages
+        self.blocks_per_page = blocks_per_page
+        self.words_per_paragraph = words_per_paragraph
+        self.inline_density = inline_density
+        self.list_ratio = list_ratio
+        self.code_ratio = code_ratio
+        self.images_per_page = images_per_page
+        self.links_per_page = links_per_page
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def inline_text(rng, words, density):
+    # A run of words where roughly `density` of them carry inline markup
+    parts = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        if rng.random() < density:
+            kind = rng.randrange(3)
+            if kind == 0:
+                word = f"**{word}**"
+            elif kind == 1:
+                word = f"_{word}_"
+            else:
+                word = f"`{word}`"
+        parts.append(word)
+    return " ".join(parts)
+
+def generate_page_markdown(spec, rng, index):
+    blocks = [f"# Page {index}: {rng.choice(WORDS).title()} {rng.choice(WORDS).title()}"]
+    links = spec.links_per_page
+    images = spec.images_per_page
+
+    for block_index in range(spec.blocks_per_page):
+        roll = rng.random()
+        if block_index % 10 == 9:
+            blocks.append(f"## {inline_text(rng, 4, 0)}")
+        elif roll < spec.code_ratio:
+            lines = "\n".join(f"print('{rng.choice(WORDS)}')" for _ in range(rng.randint(2, 8)))
+            blocks.append(f"```\n{lines}\n```")
+        elif roll < spec.code_ratio + spec.list_ratio:
+            items = rng.randint(2, 6)
+            if rng.random() < 0.5:
+                blocks.append("\n".join(f"- {inline_text(rng, 8, spec.inline_density)}" for _ in range(items)))
+            else:
+                blocks.append("\n".join(f"{n}. {inline_text(rng, 8, spec.inline_density)}" for n in range(1, items + 1)))
+        elif roll < spec.code_ratio + spec.list_ratio + 0.05:
+            blocks.append(f"> {inline_text(rng, 20, spec.inline_density)}")
+        else:
+            paragraph = inline_text(rng, spec.words_per_paragraph, spec.inline_density)
+            if links:
+                paragraph += f" [{rng.choice(WORDS)}](/page-{rng.randrange(spec.pages)})"
+                links -= 1
+            if images:
+                paragraph += f" ![{rng.choice(WORDS)}](/images/{rng.choice(WORDS)}.png)"
+                images -= 1
+            blocks.append(paragraph)
+
+    return "\n\n".join(blocks) + "\n"
+
+def generate_corpus(spec):
+    # Returns {relative content path: markdown}, reproducible for the same spec
+    rng = random.Random(spec.seed)
+    corpus = {}
+    for index in range(spec.pages):
+        folder = "" if index == 0 else f"section-{index % 10}/page-{index}/"
+        corpus[f"{folder}index.md"] = generate_page_markdown(spec, rng, index)
+    return corpus
+
+def write_site(spec, site_path):
+    # Lay the corpus out like the real repo: content/, static/ and template.html
+    for relative_path, markdown in generate_corpus(spec).items():
+        path = os.path.join(site_path, "content", relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(markdown)
+    os.makedirs(os.path.join(site_path, "static", "images"), exist_ok=True)
+    with open(os.path.join(site_path, "static", "index.css"), 'w', encoding='utf-8') as file:
+        file.write("body { margin: 0 auto; max-width: 40em; }\n")
+    with open(os.path.join(site_path, "template.html"), 'w', encoding='utf-8') as file:
+        file.write(BENCH_TEMPLATE)
+
+
+def best_of(repeat, function):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run_benchmarks(spec, repeat=3):
+    corpus = list(generate_corpus(spec).values())
+    input_bytes = sum(len(markdown.encode('utf-8')) for markdown in corpus)
+
+    blocks = [block for markdown in corpus for block in markdown_to_blocks(markdown)]
+    inline_texts = [" ".join(" ".join(block.lines).split()) for markdown in corpus for block in lex_blocks(markdown)
+                    if block.block_type == BlockType.PARAGRAPH]
+    trees = [markdown_to_html_node(markdown) for markdown in corpus]
+
+    stages = {
+        # What the build splits and types blocks with
+        "lex_blocks": lambda: [list(lex_blocks(markdown)) for markdown in corpus],
+        # The two stages the lexer replaced, kept so older baselines still line up
+        "markdown_to_blocks": lambda: [markdown_to_blocks(markdown) for markdown in corpus],
+        "block_to_block_type": lambda: [block_to_block_type(block) for block in blocks],
+        "text_to_textnodes": lambda: [text_to_textnodes(text) for text in inline_texts],
+        "scan_spans": lambda: [scan_spans(text) for text in inline_texts],
+        "markdown_to_html_node": lambda: [markdown_to_html_node(markdown) for markdown in corpus],
+        "to_html": lambda: [tree.to_html() for tree in trees],
+    }
+    results = {name: best_of(repeat, function) for name, function in stages.items()}
+    results.update(time_full_builds(spec, repeat))
+    return results, input_bytes
+
+def time_full_builds(spec, repeat):
+    # Run main() for real inside a throwaway copy of the synthetic site
+    from main import main
+
+    results = {}
+    previous_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as site_path:
+        write_site(spec, site_path)
+        os.chdir(site_path)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                results["main_full_build"] = best_of(repeat, lambda: main(["--clean", "--no-cache"]))
+                # Every page re-rendered, but parsed trees come from the cache (a template-only change)
+                results["main_cached_build"] = best_of(repeat, lambda: main(["--clean"]))
+                results["main_noop_build"] = best_of(repeat, lambda: main([]))
+        finally:
+            os.chdir(previous_cwd)
+    return results
+
+
+def adversarial_inputs(size):
+    # Paragraphs aimed at the worst cases of an inline parser, each repeating its pattern `size` times
+    return {
+        "many_links": " ".join(f"[link {index}](/page-{index})" for index in range(size)),
+        "many_images": " ".join(f"![image {index}](/images/{index}.png)" for index in range(size)),
+        "unclosed_brackets": "[" * size,
+        "unclosed_links": "[a](" * size,
+        "unclosed_images": "![a](" * size,
+        "nested_brackets": "[" * size + "](" * size,
+        "bracket_lines": "[a\n" * size + "](/x)",
+        "underscores": "_" * (2 * size),
+        "bold_runs": "**" * (2 * size),
+        "backticks": "`" * (2 * size),
+        "unclosed_backticks": "a `" * (2 * size + 1),
+    }
+
+def time_adversarial(size, repeat=3):
+    # Every inline parser on every hostile paragraph, at `size` and at twice that.
+    # Returns {(input, parser): (seconds, seconds at 2 * size)}.
+    def parse_all(parse, text):
+        try:
+            parse(text)
+        except Exception:
+            # Unclosed delimiters are an error, but the error has to arrive quickly too
+            pass
+
+    small, large = adversarial_inputs(size), adversarial_inputs(2 * size)
+    return {
+        (name, parser_name): (best_of(repeat, lambda: parse_all(parse, small[name])),
+                              best_of(repeat, lambda: parse_all(parse, large[name])))
+        for name in small
+        for parser_name, parse in sorted(INLINE_PARSERS.items())
+    }
+
+def report_adversarial(results, size, limit=3.0, noise_floor=0.005):
+    # Prints how each time grows when the input doubles: about 2x is linear, 4x quadratic.
+    # Returns the (input, parser) pairs growing faster than `limit`.
+    superlinear = []
+    print(f"😈 Adversarial paragraphs, {size} vs {2 * size} repeats")
+    print(f"{'input':<22}{'parser':<10}{'seconds':>10}{'doubled':>10}{'growth':>9}")
+    for (name, parser_name), (seconds, doubled) in results.items():
+        growth = doubled / seconds if seconds else 1.0
+        line = f"{name:<22}{parser_name:<10}{seconds:>10.4f}{doubled:>10.4f}{growth:>8.1f}x"
+        # Sub-millisecond timings are mostly noise, don't judge them
+        if growth > limit and doubled > noise_floor:
+            line += " 🐢"
+            superlinear.append((name, parser_name))
+        print(line)
+    return superlinear
+
+def report(results, spec, input_bytes, baseline=None, threshold=0.10):
+    # Prints a table and returns the names of stages that got slower than the baseline allows
+    megabytes = input_bytes / (1024 * 1024)
+    regressions = []
+    print(f"📊 {spec.pages} pages, {megabytes:.2f} MB of markdown")
+    print(f"{'stage':<24}{'seconds':>10}{'pages/s':>12}{'MB/s':>10}{'vs baseline':>14}")
+    for name, seconds in results.items():
+        line = f"{name:<24}{seconds:>10.4f}{spec.pages / seconds:>12.1f}{megabytes / seconds:>10.2f}"
+        old_seconds = (baseline or {}).get("results", {}).get(name)
+        if old_seconds:
+            change = seconds / old_seconds - 1
+            line += f"{change:>+13.1%}"
+            if change > threshold:
+                line += " 🐢"
+                regressions.append(name)
+        print(line)
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the markdown pipeline on a synthetic site.")
+    defaults = CorpusSpec()
+    parser.add_argument("--pages", type=int, default=defaults.pages)
+    parser.add_argument("--blocks-per-page", type=int, default=defaults.blocks_per_page)
+    parser.add_argument("--words-per-paragraph", type=int, default=defaults.words_per_paragraph)
+    parser.add_argument("--inline-density", type=float, default=defaults.inline_density,
+                        help="share of words wrapped in bold/italic/code (default: %(default)s)")
+    parser.add_argument("--list-ratio", type=float, default=defaults.list_ratio)
+    parser.add_argument("--code-ratio", type=float, default=defaults.code_ratio)
+    parser.add_argument("--images-per-page", type=int, default=defaults.images_per_page)
+    parser.add_argument("--links-per-page", type=int, default=defaults.links_per_page)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the best one counts")
+    parser.add_argument("--baseline", help="compare against a JSON file saved with --save-baseline")
+    parser.add_argument("--save-baseline", help="write this run's timings to a JSON file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="slowdown vs the baseline that counts as a regression (default: %(default)s)")
+    parser.add_argument("--adversarial", action="store_true",
+                        help="time the inline parsers on hostile paragraphs instead, and fail if any is superlinear")
+    parser.add_argument("--adversarial-size", type=int, default=20000,
+                        help="pattern repeats per hostile paragraph (default: %(default)s)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.adversarial:
+        superlinear = report_adversarial(time_adversarial(args.adversarial_size, args.repeat), args.adversarial_size)
+        if superlinear:
+            sys.exit(f"🚨 Superlinear: {', '.join(f'{name} ({parser})' for name, parser in superlinear)}")
+        return
+
+    spec = CorpusSpec(args.pages, args.blocks_per_page, args.words_per_paragraph, args.inline_density,
+                      args.list_ratio, args.code_ratio, args.images_per_page, args.links_per_page, args.seed)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        if baseline.get("spec") != spec.to_dict():
+            print("⚠️ Baseline was recorded with a different corpus, comparisons may be meaningless.")
+
+    results, input_bytes = run_benchmarks(spec, args.repeat)
+    regressions = report(results, spec, input_bytes, baseline, args.threshold)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as file:
+            json.dump({"spec": spec.to_dict(), "input_bytes": input_bytes, "results": results}, file, indent=2)
+        print(f"💾 Baseline saved to '{args.save_baseline}'.")
+
+    if regressions:
+        sys.exit(f"🚨 Slower than baseline: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
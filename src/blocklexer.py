@@ -0,0 +1,102 @@
+import re
+from textnode import BlockType
+
+HEADING_LINE = re.compile(r'#{1,6} .+')
+FENCE = '```'
+
+
+class Block():
+    """One top-level markdown block: its type, its stripped lines and where it sat.
+
+    start and end are 0-based line numbers in the source, end exclusive.
+    """
+    __slots__ = ("block_type", "lines", "start", "end")
+
+    def __init__(self, block_type, lines, start, end):
+        self.block_type = block_type
+        self.lines = lines
+        self.start = start
+        self.end = end
+
+    @property
+    def text(self):
+        return "\n".join(self.lines)
+
+    def __eq__(self, other):
+        return (self.block_type, self.lines, self.start, self.end) == (other.block_type, other.lines, other.start, other.end)
+
+    def __repr__(self):
+        return f"Block({self.block_type.value}, {self.lines}, {self.start}, {self.end})"
+
+
+def lex_blocks(markdown):
+    return lex_lines(markdown.split('\n'))
+
+def lex_lines(lines, fences=True, offset=0):
+    # Single pass state machine over the lines. Every line is stripped and classified
+    # once, and the block type falls out of the flags gathered on the way, so nothing
+    # is re-split later. It agrees with markdown_to_blocks + block_to_block_type,
+    # except that a fenced code block keeps its blank lines and ends at its closing fence.
+    #
+    # lines can be any iterable (an open file works), and each block is yielded as soon
+    # as it ends, so only the current block is ever held in memory.
+    iterator = iter(lines)
+    index = offset - 1
+    block_lines = []
+    start = offset
+
+    for raw_line in iterator:
+        index += 1
+        line = raw_line.strip()
+
+        if not line:
+            if block_lines:
+                yield finish_block(block_lines, start, index, all_quotes, all_unordered, all_ordered)
+                block_lines = []
+            continue
+
+        # "```x``` is code" is inline code in a paragraph, only a line that doesn't close
+        # what it opens starts a fence
+        if not block_lines and fences and line.startswith(FENCE) and FENCE not in line[len(FENCE):]:
+            start = index
+            fence_lines = [line]
+            for raw_line in iterator:
+                index += 1
+                line = raw_line.strip()
+                fence_lines.append(line)
+                if line == FENCE:
+                    yield Block(BlockType.CODE, fence_lines, start, index + 1)
+                    break
+            else:
+                # The fence never closed, so none of it is code after all. Nothing
+                # follows it either, which is why later fences can be switched off.
+                yield from lex_lines(fence_lines, fences=False, offset=start)
+                return
+            continue
+
+        if not block_lines:
+            start = index
+            all_quotes = all_unordered = all_ordered = True
+        if all_quotes and not line.startswith('>'):
+            all_quotes = False
+        if all_unordered and not line.startswith('- '):
+            all_unordered = False
+        if all_ordered and not line.startswith(f"{len(block_lines) + 1}. "):
+            all_ordered = False
+        block_lines.append(line)
+
+    if block_lines:
+        yield finish_block(block_lines, start, index + 1, all_quotes, all_unordered, all_ordered)
+
+def finish_block(block_lines, start, end, all_quotes, all_unordered, all_ordered):
+    if HEADING_LINE.match(block_lines[0]):
+        block_type = BlockType.HEADING
+    elif all_quotes:
+        block_type = BlockType.QUOTE
+    elif all_unordered:
+        block_type = BlockType.UNORDERED_LIST
+    elif all_ordered:
+        block_type = BlockType.ORDERED_LIST
+    else:
+        block_type = BlockType.PARAGRAPH
+    return Block(block_type, block_lines, start, end)
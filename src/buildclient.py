@@ -0,0 +1,48 @@
+import argparse, json, socket, sys
+
+# Only the standard library in here: a client that had to import the generator
+# first would spend the time the daemon is there to save.
+SOCKET_PATH = "./.ssg-daemon.sock"
+
+
+def send_request(request, socket_path=SOCKET_PATH):
+    # One request to a serve-builds daemon (see builddaemon.BuildDaemon), returns its response
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps(request).encode('utf-8') + b"\n")
+        with client.makefile('rb') as responses:
+            return json.loads(responses.readline())
+
+def request_main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py request-build",
+                                     description="Ask a running serve-builds daemon for a build.")
+    parser.add_argument("paths", nargs="*", help="content, static or template files and folders to rebuild "
+                                                 "(default: a full incremental build)")
+    parser.add_argument("--changes", action="store_true", help="rebuild whatever changed since the last request")
+    parser.add_argument("--stop", action="store_true", help="shut the daemon down")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="where the daemon listens (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.stop:
+        request = {"command": "stop"}
+    elif args.changes:
+        request = {"command": "changes"}
+    elif args.paths:
+        request = {"command": "build", "paths": args.paths}
+    else:
+        request = {"command": "full"}
+
+    try:
+        response = send_request(request, args.socket)
+    except OSError:
+        sys.exit(f"🚨 Oops, no serve-builds daemon is listening on '{args.socket}'.")
+    if "error" in response:
+        sys.exit(f"🚨 {response['error']}")
+    print(response["log"], end="")
+    print(f"⏱️ {response['command']} took {response['ms']:.1f} ms.")
+    if response["failures"]:
+        sys.exit(f"🚨 {len(response['failures'])} page(s) failed to generate.")
+
+
+if __name__ == "__main__":
+    request_main()
@@ -0,0 +1,189 @@
+import argparse, io, json, os, socket, socketserver, sys, threading, time
+from contextlib import redirect_stdout
+
+from buildclient import SOCKET_PATH
+from main import CACHE_PATH, build_site
+from textsplit import INLINE_MEMO_SIZE, INLINE_PARSERS, get_inline_parser, set_inline_memo_size, set_inline_parser
+from treecache import TreeCache, DEFAULT_CACHE_SIZE
+from watch import SiteWatcher, inside, snapshot
+
+# Parsed pages kept decoded in memory between requests
+MEMORY_ENTRIES = 2048
+
+
+class BuildDaemon(SiteWatcher):
+    """A SiteWatcher that rebuilds when asked instead of polling on a timer.
+
+    The process stays up between requests, so the compiled template, the
+    inline memo, recently parsed pages and the snapshot of every watched
+    file are still warm when the next request comes in. Requests are
+    dicts, answered with a dict that says how long they took:
+
+        {"command": "build", "paths": [...]}   rebuild these files or folders
+        {"command": "changes"}                 rebuild whatever changed since last time
+        {"command": "full"}                    an ordinary (incremental) build_site run
+        {"command": "stop"}
+    """
+
+    def __init__(self, basepath="/", checksum=False, tree_cache=None, build_options=None, **paths):
+        super().__init__(basepath, checksum, build_options=build_options, **paths)
+        self.tree_cache = tree_cache
+        self.failures = []
+        # One build at a time, however many clients are connected
+        self.lock = threading.Lock()
+
+    def full_build(self):
+        self.manifest, failures = build_site(self.basepath, checksum=self.checksum,
+                                             content_path=self.content_path, static_path=self.static_path,
+                                             template_path=self.template_path, destination_path=self.destination_path,
+                                             tree_cache=self.tree_cache, **self.build_options)
+        self.failures.extend(failures)
+        self.state = snapshot(self.watched_paths())
+
+    def build_page(self, source_path):
+        error = super().build_page(source_path)
+        if error is not None:
+            self.failures.append((source_path, error))
+        return error
+
+    def watched_form(self, path):
+        # The path spelled the way the snapshot spells it, whether the client sent it
+        # relative or absolute. None when it's nothing the site is built from.
+        absolute_path = os.path.abspath(path)
+        for watched_path in self.watched_paths():
+            relative_path = os.path.relpath(absolute_path, os.path.abspath(watched_path))
+            if relative_path == os.curdir:
+                return watched_path
+            if not relative_path.startswith(os.pardir):
+                return os.path.join(watched_path, relative_path)
+        return None
+
+    def build_paths(self, paths):
+        watched = []
+        for path in paths:
+            watched_path = self.watched_form(path)
+            if watched_path is None:
+                print(f"🚨 Oops, '{path}' isn't part of {', '.join(self.watched_paths())}, skipping it.")
+            else:
+                watched.append(watched_path)
+        paths = watched
+        current = snapshot(paths)
+        removed = sorted(path for path in self.state if path not in current
+                         and any(path == asked or inside(path, asked) for asked in paths))
+        self.state.update(current)
+        for path in removed:
+            del self.state[path]
+        self.apply_changes(sorted(current), removed)
+
+    def handle(self, request):
+        command = request.get("command") if isinstance(request, dict) else None
+        if command not in ("build", "changes", "full", "stop"):
+            return {"ok": False, "error": f"Unknown command '{command}'."}
+
+        with self.lock:
+            started = time.perf_counter()
+            self.failures = []
+            log = io.StringIO()
+            with redirect_stdout(log):
+                if command == "build":
+                    self.build_paths(request.get("paths") or [])
+                elif command == "changes":
+                    self.poll()
+                elif command == "full":
+                    self.full_build()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        return {
+            "ok": not self.failures,
+            "command": command,
+            "ms": round(elapsed_ms, 3),
+            "failures": [list(failure) for failure in self.failures],
+            "log": log.getvalue(),
+        }
+
+
+class BuildRequestHandler(socketserver.StreamRequestHandler):
+    # One JSON request per line, one JSON response per line, for as long as the client stays connected
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                response = {"ok": False, "error": "Requests are one JSON object per line."}
+            else:
+                response = self.server.build_daemon.handle(request)
+            self.wfile.write(json.dumps(response).encode('utf-8') + b"\n")
+            self.wfile.flush()
+            if response.get("command") == "stop":
+                # shutdown() waits for serve_forever, which is waiting for us: do it from elsewhere
+                threading.Thread(target=self.server.shutdown).start()
+                return
+
+
+class BuildServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, build_daemon):
+        super().__init__(socket_path, BuildRequestHandler)
+        self.build_daemon = build_daemon
+
+
+def claim_socket(socket_path):
+    # A socket file left behind by a daemon that died can go, one that still answers can't
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            os.remove(socket_path)
+            return
+    sys.exit(f"🚨 Oops, a serve-builds daemon is already listening on '{socket_path}'.")
+
+def serve_builds(basepath="/", socket_path=SOCKET_PATH, checksum=False, memory_entries=MEMORY_ENTRIES,
+                 build_options=None, **paths):
+    claim_socket(socket_path)
+    build_daemon = BuildDaemon(basepath, checksum, TreeCache(CACHE_PATH, DEFAULT_CACHE_SIZE, memory_entries),
+                               build_options, **paths)
+    # Build once up front: it brings docs/ up to date and warms every cache
+    build_daemon.full_build()
+
+    server = BuildServer(socket_path, build_daemon)
+    print(f"🛎️ Serving builds on '{socket_path}'.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+    print("👋 Stopped serving builds.")
+
+def serve_main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py serve-builds",
+                                     description="Stay running and build the site whenever asked over a Unix socket.")
+    parser.add_argument("basepath", nargs="?", default="/", help="URL prefix the site is served under (default: /)")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="where to listen (default: %(default)s)")
+    parser.add_argument("--checksum", action="store_true",
+                        help="compare static files by content hash instead of size and mtime")
+    parser.add_argument("--memory", type=int, default=MEMORY_ENTRIES,
+                        help="parsed pages to keep in memory between builds (default: %(default)s)")
+    # The build flags of main.py that work with incremental rebuilds, see UNSUPPORTED_FLAGS there
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="render the pages of a full build in N worker processes (0 = one per CPU core, default: 1)")
+    parser.add_argument("--inline-parser", choices=sorted(INLINE_PARSERS), default=get_inline_parser(),
+                        help="inline markdown parser to use (default: %(default)s)")
+    parser.add_argument("--inline-memo", type=int, default=INLINE_MEMO_SIZE,
+                        help="how many inline texts to remember rendered nodes for, 0 turns it off (default: %(default)s)")
+    parser.add_argument("--no-image-sizes", dest="image_sizes", action="store_false",
+                        help="don't add width/height and lazy-loading attributes to local images")
+    parser.add_argument("--minify", action="store_true",
+                        help="collapse whitespace in the generated pages (<pre> and <code> are kept as they are)")
+    parser.add_argument("--critical-css", action="store_true",
+                        help="inline the rules of static/index.css each page needs and load the rest without blocking")
+    args = parser.parse_args(argv)
+    set_inline_parser(args.inline_parser)
+    set_inline_memo_size(args.inline_memo)
+    build_options = {"jobs": args.jobs if args.jobs > 0 else (os.cpu_count() or 1), "image_sizes": args.image_sizes,
+                     "minify": args.minify, "critical_css": args.critical_css}
+    serve_builds(args.basepath, args.socket, args.checksum, args.memory, build_options)
@@ -0,0 +1,182 @@
+import os, re
+
+from fingerprint import map_css_urls
+from htmlnode import SpanNode, split_url_suffix
+
+# Every tag the markdown renderer can put into a page. A streamed page is written
+# before its blocks are known, so it has to assume all of them.
+RENDERER_TAGS = frozenset(("div", "h1", "h2", "h3", "h4", "h5", "h6", "p", "ul", "ol", "li",
+                           "blockquote", "pre", "code", "a", "img", "b", "i"))
+
+CSS_COMMENT_PATTERN = re.compile(r"/\*.*?\*/", re.DOTALL)
+# Parts of a selector that never name an element: attribute tests and pseudo-class arguments
+SELECTOR_NOISE_PATTERN = re.compile(r"\[[^\]]*\]|\([^)]*\)")
+SELECTOR_COMBINATOR_PATTERN = re.compile(r"\s*[\s>+~]\s*")
+TYPE_SELECTOR_PATTERN = re.compile(r"[a-zA-Z][\w-]*")
+TAG_PATTERN = re.compile(r"<([a-zA-Z][\w-]*)")
+LINK_TAG_PATTERN = re.compile(r"<link\b[^>]*>", re.IGNORECASE)
+ATTRIBUTE_PATTERN = re.compile(r'\b(rel|href)="([^"]*)"', re.IGNORECASE)
+
+
+class StyleRule():
+    __slots__ = ("selectors", "body", "selector_tags")
+
+    def __init__(self, selectors, body):
+        self.selectors = selectors
+        self.body = body
+        # The element names each selector needs on the page to match anything
+        self.selector_tags = [selector_tags(selector) for selector in selectors]
+
+    def subset(self, tags):
+        selectors = [selector for selector, needed in zip(self.selectors, self.selector_tags) if needed <= tags]
+        if not selectors:
+            return ""
+        return f"{','.join(selectors)}{{{self.body}}}"
+
+
+class MediaRule():
+    __slots__ = ("prelude", "rules")
+
+    def __init__(self, prelude, rules):
+        self.prelude = prelude
+        self.rules = rules
+
+    def subset(self, tags):
+        inner = "".join(rule.subset(tags) for rule in self.rules)
+        if not inner:
+            return ""
+        return f"{self.prelude}{{{inner}}}"
+
+
+def selector_tags(selector):
+    # "pre code" -> {"pre", "code"}, "a:hover" -> {"a"}, ".note" / "*" / "::selection" -> set()
+    selector = SELECTOR_NOISE_PATTERN.sub("", selector)
+    tags = set()
+    for compound in SELECTOR_COMBINATOR_PATTERN.split(selector.strip()):
+        match = TYPE_SELECTOR_PATTERN.match(compound)
+        if match:
+            tags.add(match.group().lower())
+    return frozenset(tags)
+
+def matching_brace(css, open_position):
+    depth = 0
+    quote = None
+    for position in range(open_position, len(css)):
+        character = css[position]
+        if quote:
+            if character == quote and css[position - 1] != "\\":
+                quote = None
+        elif character in "\"'":
+            quote = character
+        elif character == "{":
+            depth += 1
+        elif character == "}":
+            depth -= 1
+            if depth == 0:
+                return position
+    raise ValueError("Unbalanced braces in stylesheet.")
+
+def parse_css(css):
+    """Split a stylesheet into StyleRule and MediaRule objects.
+
+    Other at-rules (@import, @font-face, @keyframes, ...) are left out; the
+    full stylesheet still brings them in once it has loaded.
+    """
+    css = CSS_COMMENT_PATTERN.sub("", css)
+    rules = []
+    position = 0
+    while True:
+        open_position = css.find("{", position)
+        if open_position == -1:
+            return rules
+        close_position = matching_brace(css, open_position)
+        # Statement at-rules like "@import ...;" end up in front of the next prelude
+        prelude = css[position:open_position].rsplit(";", 1)[-1].strip()
+        body = css[open_position + 1:close_position]
+        position = close_position + 1
+
+        if prelude.lower().startswith("@media"):
+            rules.append(MediaRule(" ".join(prelude.split()), parse_css(body)))
+        elif not prelude.startswith("@"):
+            selectors = [" ".join(selector.split()) for selector in prelude.split(",")]
+            declarations = [" ".join(declaration.split()) for declaration in body.split(";")]
+            rules.append(StyleRule(selectors, ";".join(declaration for declaration in declarations if declaration)))
+
+def used_tags(node):
+    # The element names in an HTMLNode tree
+    tags = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.tag is not None:
+            tags.add(node.tag)
+        if type(node) is SpanNode:
+            tags.update(node.tags())
+        elif node.children:
+            stack.extend(node.children)
+    return tags
+
+def template_tags(html):
+    return {tag.lower() for tag in TAG_PATTERN.findall(html)}
+
+
+class CriticalCss():
+    """The rules of one stylesheet, ready to be cut down to what a page uses.
+
+    The stylesheet is parsed once per build, and the elements each selector
+    needs are worked out along with it. A page then keeps the selectors
+    whose elements it actually contains. Pages with the same set of elements
+    share one result.
+    """
+
+    def __init__(self, url, css):
+        self.url = url
+        self.rules = parse_css(css)
+        self._subsets = {}
+
+    @classmethod
+    def load(cls, static_path, css_path, resolve_url=None):
+        # The rules are inlined into pages at every depth, where a URL relative to the
+        # stylesheet would point somewhere else. So every local url() becomes root-relative,
+        # and then goes through resolve_url (see basepath_resolver) like the pages' own URLs.
+        url = "/" + os.path.relpath(css_path, static_path).replace(os.sep, '/')
+        with open(css_path, 'r', encoding='utf-8') as file:
+            css = file.read()
+        resolve_url = resolve_url or (lambda url: url)
+        return cls(url, map_css_urls(css, url, lambda absolute_path, path: resolve_url(absolute_path)))
+
+    def for_tags(self, tags):
+        tags = frozenset(tags)
+        subset = self._subsets.get(tags)
+        if subset is None:
+            subset = "".join(rule.subset(tags) for rule in self.rules)
+            self._subsets[tags] = subset
+        return subset
+
+    def __getstate__(self):
+        # Workers build their own memo
+        return {"url": self.url, "rules": self.rules}
+
+    def __setstate__(self, state):
+        self.url = state["url"]
+        self.rules = state["rules"]
+        self._subsets = {}
+
+
+def defer_stylesheet(html, url, style_slot):
+    # Swap the template's <link rel="stylesheet"> to url for an inline <style> holding
+    # style_slot, followed by the same link loading without blocking rendering.
+    # Returns None when the template doesn't link that stylesheet.
+    for match in LINK_TAG_PATTERN.finditer(html):
+        attributes = {name.lower(): value for name, value in ATTRIBUTE_PATTERN.findall(match.group())}
+        if attributes.get("rel", "").lower() != "stylesheet" or split_url_suffix(attributes.get("href", ""))[0] != url:
+            continue
+        link = match.group()
+        if link.endswith("/>"):
+            opening, closing = link[:-2].rstrip(), " />"
+        else:
+            opening, closing = link[:-1].rstrip(), ">"
+        deferred_link = f"{opening} media=\"print\" onload=\"this.media='all'\"{closing}"
+        replacement = f"<style>{style_slot}</style>{deferred_link}<noscript>{link}</noscript>"
+        return html[:match.start()] + replacement + html[match.end():]
+    return None
@@ -0,0 +1,172 @@
+import hashlib, json, os, posixpath, re, shutil
+
+from htmlnode import split_url_suffix
+from manifest import file_hash
+
+ASSET_MANIFEST_FILENAME = "asset-manifest.json"
+HASH_LENGTH = 10
+
+# Pages keep their names, so links to them don't break
+UNHASHED_EXTENSIONS = (".html",)
+# Files that crawlers, browsers and GitHub Pages ask for by name. Dotfiles (.nojekyll)
+# and anything under a dot folder (.well-known/) keep their names too.
+FIXED_NAMES = frozenset(("robots.txt", "favicon.ico", "sitemap.xml", "CNAME", "humans.txt", "ads.txt",
+                         "apple-touch-icon.png", "manifest.webmanifest"))
+# Stylesheets point at other assets, so they're copied with those references rewritten
+REWRITTEN_EXTENSIONS = (".css",)
+# url(x), url('x') and url("x")
+CSS_URL_PATTERN = re.compile(r"""url\(\s*(['"]?)([^'")\s]+)\1\s*\)""")
+
+
+def fingerprinted_path(relative_path, digest):
+    # "images/tom.png" -> "images/tom.<hash>.png"
+    root, extension = os.path.splitext(relative_path)
+    return f"{root}.{digest[:HASH_LENGTH]}{extension}"
+
+def keeps_its_name(relative_path):
+    # True for static files that must be published under their own name, unhashed
+    parts = relative_path.split('/')
+    name = parts[-1]
+    return (name.endswith(UNHASHED_EXTENSIONS) or name in FIXED_NAMES
+            or any(part.startswith('.') for part in parts))
+
+def map_css_urls(css, css_url, rewrite):
+    # Hand the url()s of the stylesheet at css_url that point at local files to
+    # rewrite(absolute_path, path), path being the URL as written and absolute_path
+    # the root-relative one it resolves to, both without ?query/#fragment.
+    # rewrite returns the URL to write instead, or None to leave it as it was.
+    css_folder = posixpath.dirname(css_url)
+
+    def replace(match):
+        quote, url = match.groups()
+        path, suffix = split_url_suffix(url)
+        if not path or path.startswith("//") or ":" in path:
+            # data:, https:, protocol-relative and "#fragment" URLs aren't ours
+            return match.group(0)
+        absolute_path = path if path.startswith("/") else posixpath.normpath(posixpath.join(css_folder, path))
+        rewritten = rewrite(absolute_path, path)
+        if rewritten is None:
+            return match.group(0)
+        return f"url({quote}{rewritten}{suffix}{quote})"
+
+    return CSS_URL_PATTERN.sub(replace, css)
+
+def rewrite_css_urls(css, css_url, asset_map):
+    # Point the url()s of the stylesheet at css_url to the fingerprinted names. Root-relative
+    # URLs stay root-relative, relative ones stay relative to the (renamed) stylesheet.
+    css_folder = posixpath.dirname(css_url)
+
+    def rewrite(absolute_path, path):
+        fingerprinted = asset_map.get(absolute_path)
+        if fingerprinted is None or path.startswith("/"):
+            return fingerprinted
+        return posixpath.relpath(fingerprinted, css_folder)
+
+    return map_css_urls(css, css_url, rewrite)
+
+def load_asset_manifest(dest_path):
+    manifest_path = os.path.join(dest_path, ASSET_MANIFEST_FILENAME)
+    if not os.path.isfile(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as file:
+            return json.load(file).get("assets", {})
+    except (OSError, ValueError):
+        print(f"🚨 Oops, asset manifest '{manifest_path}' is unreadable, rehashing every asset.")
+        return {}
+
+def fingerprint_assets(static_path, dest_path, manifest=None):
+    """Copy every static file to dest_path as name.<hash>.ext.
+
+    Pages, dotfiles and well-known names (robots.txt, CNAME, see
+    keeps_its_name) are copied under their own names.
+
+    Writes asset-manifest.json (URL -> fingerprinted URL, plus the size,
+    mtime and hash it was computed from) and returns the URL mapping. Files
+    whose size and mtime match the previous asset manifest reuse its hash
+    instead of being read again.
+
+    Stylesheets go last: their url()s are rewritten to the fingerprinted
+    names, and they're hashed after that, so a changed image renames the
+    stylesheets pointing at it too.
+    """
+    if not os.path.exists(static_path):
+        print(f"🚨 Oops, '{static_path}' path, which you wanna copy FROM, doesn't exist!")
+        return {}
+
+    previous = load_asset_manifest(dest_path)
+    assets = {}
+    copied, unchanged = 0, 0
+
+    static_files = []
+    for root, dirs, files in os.walk(static_path):
+        dirs.sort()
+        for name in sorted(files):
+            static_files.append(os.path.join(root, name))
+    # Everything a stylesheet can point at is hashed before the stylesheets
+    static_files.sort(key=lambda path: path.endswith(REWRITTEN_EXTENSIONS))
+
+    for from_path in static_files:
+        name = os.path.basename(from_path)
+        relative_path = os.path.relpath(from_path, static_path).replace(os.sep, '/')
+        url = "/" + relative_path
+        stat = os.stat(from_path)
+
+        rewritten = None
+        if name.endswith(REWRITTEN_EXTENSIONS):
+            # Depends on the other assets' names, so it's always read (stylesheets are small)
+            with open(from_path, 'r', encoding='utf-8', errors='surrogateescape') as file:
+                css = file.read()
+            rewritten = rewrite_css_urls(css, url, {asset_url: entry["file"] for asset_url, entry in assets.items()})
+            rewritten = rewritten.encode('utf-8', errors='surrogateescape')
+            digest = hashlib.sha256(rewritten).hexdigest()
+        else:
+            old_entry = previous.get(url)
+            if old_entry and old_entry.get("size") == stat.st_size and old_entry.get("mtime_ns") == stat.st_mtime_ns:
+                digest = old_entry["hash"]
+            else:
+                digest = file_hash(from_path)
+
+        if keeps_its_name(relative_path):
+            output_relative_path = relative_path
+        else:
+            output_relative_path = fingerprinted_path(relative_path, digest)
+        to_path = os.path.join(dest_path, *output_relative_path.split('/'))
+        output_size = stat.st_size if rewritten is None else len(rewritten)
+
+        # The name already carries the content hash, so an existing file is the right one
+        if os.path.isfile(to_path) and os.path.getsize(to_path) == output_size and output_relative_path != relative_path:
+            unchanged += 1
+        else:
+            os.makedirs(os.path.dirname(to_path), exist_ok=True)
+            if rewritten is None:
+                shutil.copy2(from_path, to_path)
+            else:
+                with open(to_path, 'wb') as file:
+                    file.write(rewritten)
+            print(f"📄 Copied file: '{from_path}' → '{to_path}'")
+            copied += 1
+        if manifest is not None:
+            manifest.record_asset(to_path)
+
+        assets[url] = {
+            "file": "/" + output_relative_path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": digest,
+        }
+
+    os.makedirs(dest_path, exist_ok=True)
+    manifest_path = os.path.join(dest_path, ASSET_MANIFEST_FILENAME)
+    with open(manifest_path, 'w', encoding='utf-8') as file:
+        json.dump({"assets": assets}, file, indent=2, sort_keys=True)
+    if manifest is not None:
+        manifest.record_asset(manifest_path)
+
+    print(f"🔖 Fingerprinted assets: {copied} copied, {unchanged} unchanged.")
+    return {asset_url: entry["file"] for asset_url, entry in assets.items()}
+
+def asset_map_digest(asset_map):
+    # A short stable id for the mapping, so pages get rebuilt when any asset name changes
+    encoded = json.dumps(asset_map, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
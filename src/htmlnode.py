@@ -1,8 +1,27 @@
-import re
+import functools, io, re, sys
+from array import array
+
+class FrozenProps(dict):
+    # A dict that refuses to change, so one empty instance can be shared by every leaf
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("These props are shared and read-only, pass your own dict instead.")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+EMPTY_PROPS = FrozenProps()
+
+def intern_tag(tag):
+    # Tag names repeat on every node, keep a single copy of each
+    return sys.intern(tag) if isinstance(tag, str) else tag
 
 class HTMLNode():
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
-        self.tag = tag
+        self.tag = intern_tag(tag)
         self.value = value
         self.children = children
         self.props = props
@@ -20,28 +39,21 @@ class HTMLNode():
                 return f"<{self.tag}{props_html}>{self.value}</{self.tag}>"
             
         else:
-            children_html = ""
-            for child in self.children:
-                children_html += child.to_html()
-
-            if self.value is None:
-                return f"<{self.tag}{props_html}>{children_html}</{self.tag}>"
-            else:
-                return f"<{self.tag}{props_html}>{self.value}{children_html}</{self.tag}>"
+            return render_html(self)
     
-    def props_to_html(self):
-            if self.props is None or len(self.props) == 0:
-                return ""
-            return "".join(f' {key}="{value}"' for key, value in self.props.items())
+    def props_to_html(self, resolve_url=None):
+            return format_props(self.props, resolve_url)
     
     def __repr__(self):
         return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
     
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         if value is None:
             raise ValueError("A LeafNode must have a value.")  # Ensure value is always given
-        super().__init__(tag, value, None, props or {})  # Default props to an empty dict if None
+        super().__init__(tag, value, None, props or EMPTY_PROPS)  # Default props to the shared empty dict if None
 
     def to_html(self):
         if self.value is None:
@@ -59,6 +71,8 @@ class LeafNode(HTMLNode):
         return f"{opening_tag}{self.value}</{self.tag}>"
     
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
     def to_html(self):
@@ -67,16 +81,304 @@ class ParentNode(HTMLNode):
         elif self.children is None:
             raise ValueError("A ParentNode must have children.")
         else:
-            children_html = "".join(child.to_html() for child in self.children)
-            attributes = self.props_to_html()
-            return f"<{self.tag}{attributes}>{children_html}</{self.tag}>"
-        
+            return render_html(self)
+
+
+# Token kinds of a SpanNode, each the tag it is written as (plain text has none)
+SPAN_TEXT, SPAN_BOLD, SPAN_ITALIC, SPAN_CODE, SPAN_LINK, SPAN_IMAGE = range(6)
+SPAN_TAGS = (None, "b", "i", "code", "a", "img")
+
+class SpanNode(HTMLNode):
+    """A run of inline markdown kept as token records instead of one node per token.
+
+    Token i is kinds[i] over text[starts[i]:ends[i]], plus the URL in
+    text[url_starts[i]:url_ends[i]] for links and images. The records live in
+    compact array-module arrays that point into the original text, so
+    nothing is sliced out of it until the node is serialized.
+    """
+    __slots__ = ("text", "kinds", "starts", "ends", "url_starts", "url_ends")
+
+    def __init__(self, text):
+        super().__init__()
+        self.text = text
+        self.kinds = array("b")
+        self.starts = array("i")
+        self.ends = array("i")
+        self.url_starts = array("i")
+        self.url_ends = array("i")
+
+    def add(self, kind, start, end, url_start=0, url_end=0):
+        self.kinds.append(kind)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.url_starts.append(url_start)
+        self.url_ends.append(url_end)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def tags(self):
+        return {SPAN_TAGS[kind] for kind in set(self.kinds) if kind != SPAN_TEXT}
+
+    def leaves(self):
+        # The same LeafNodes text_node_to_html_node would have made, one per token
+        text = self.text
+        for kind, start, end, url_start, url_end in zip(self.kinds, self.starts, self.ends,
+                                                        self.url_starts, self.url_ends):
+            if kind == SPAN_LINK:
+                yield LeafNode("a", text[start:end], {"href": text[url_start:url_end]})
+            elif kind == SPAN_IMAGE:
+                yield LeafNode("img", "", {"src": text[url_start:url_end], "alt": text[start:end]})
+            else:
+                yield LeafNode(SPAN_TAGS[kind], text[start:end])
+
+    def write(self, out, resolve_url=None, image_size=None, minify=False):
+        # Same output as writing leaves() one by one with write_html
+        write = out.write
+        text = self.text
+        for kind, start, end, url_start, url_end in zip(self.kinds, self.starts, self.ends,
+                                                        self.url_starts, self.url_ends):
+            if kind == SPAN_IMAGE:
+                props = {"src": text[url_start:url_end], "alt": text[start:end]}
+                if image_size is not None:
+                    props = image_attributes(props, image_size)
+                write(f"<img{format_props(props, resolve_url)}></img>")
+                continue
+
+            value = text[start:end]
+            if minify and kind != SPAN_CODE:
+                value = collapse_whitespace(value)
+            if kind == SPAN_TEXT:
+                write(value)
+            elif kind == SPAN_LINK:
+                write(f"<a{format_props({'href': text[url_start:url_end]}, resolve_url)}>{value}</a>")
+            else:
+                tag = SPAN_TAGS[kind]
+                write(f"<{tag}>{value}</{tag}>")
+
+    def to_html(self):
+        buffer = io.StringIO()
+        self.write(buffer)
+        return buffer.getvalue()
+
+    def __repr__(self):
+        return f"SpanNode({self.text!r}, {len(self)} tokens)"
+
+
+# Props that hold URLs, the ones a basepath applies to
+URL_ATTRIBUTES = frozenset(("href", "src"))
+
+def basepath_resolver(basepath, asset_map=None):
+    # Returns a cached function that puts root-relative URLs under the basepath,
+    # or None when the site lives at "/" and nothing needs rewriting.
+    # Protocol-relative URLs ("//cdn.example.com/...") are left alone.
+    # asset_map ("/index.css" -> "/index.1a2b3c4d5e.css") swaps in fingerprinted asset names first.
+    if basepath == "/" and not asset_map:
+        return None
+
+    @functools.lru_cache(maxsize=4096)
+    def resolve_url(url):
+        if not isinstance(url, str) or not url.startswith("/") or url.startswith("//"):
+            return url
+        if asset_map:
+            path, suffix = split_url_suffix(url)
+            url = asset_map.get(path, path) + suffix
+        return basepath + url[1:]
+
+    return resolve_url
+
+def format_props(props, resolve_url=None):
+    if props is None or len(props) == 0:
+        return ""
+    if resolve_url is not None:
+        return "".join(
+            f' {key}="{resolve_url(value) if key in URL_ATTRIBUTES else value}"'
+            for key, value in props.items()
+        )
+    return "".join(f' {key}="{value}"' for key, value in props.items())
+
+def image_attributes(props, image_size):
+    # A local <img> gets its width/height (when image_size knows them) so the page
+    # doesn't reflow once it loads, and is fetched lazily and decoded off the main thread.
+    # Returns a new dict, the node's own props are shared and stay untouched.
+    src = props.get("src")
+    if not isinstance(src, str) or not src.startswith("/") or src.startswith("//"):
+        return props
+    props = dict(props)
+    size = image_size(split_url_suffix(src)[0])
+    if size is not None:
+        props.setdefault("width", size[0])
+        props.setdefault("height", size[1])
+    props.setdefault("loading", "lazy")
+    props.setdefault("decoding", "async")
+    return props
+
+def split_url_suffix(url):
+    # "/a.css?v=1#x" -> ("/a.css", "?v=1#x")
+    for position, character in enumerate(url):
+        if character in "?#":
+            return url[:position], url[position:]
+    return url, ""
+
+# Elements whose text is shown as written, so minifying leaves their whitespace alone
+PRESERVE_WHITESPACE_TAGS = frozenset(("pre", "code", "textarea", "script", "style"))
+WHITESPACE_RUN = re.compile(r"\s+")
+
+def collapse_whitespace(text):
+    return WHITESPACE_RUN.sub(" ", text)
+
+# How write_html treats each node class. Looked up by exact type, which is cheaper than a
+# chain of isinstance checks on every node; subclasses fall back to node_kind.
+LEAF_KIND, SPAN_KIND, PARENT_KIND, PLAIN_KIND = range(4)
+NODE_KINDS = {LeafNode: LEAF_KIND, SpanNode: SPAN_KIND, ParentNode: PARENT_KIND, HTMLNode: PLAIN_KIND}
+
+def node_kind(node):
+    for node_class, kind in NODE_KINDS.items():
+        if isinstance(node, node_class):
+            return kind
+    raise TypeError(f"🚨 Can't write a {type(node).__name__} as HTML.")
+
+def write_html(node, out, resolve_url=None, image_size=None, minify=False):
+    # Serialize a node tree into anything with a write() method (an open file,
+    # io.StringIO, ...) in one walk, without building each subtree's string first.
+    # An explicit stack of open parents keeps deep trees from hitting the recursion limit:
+    # each entry is the parent's remaining children, its closing tag and whether its text
+    # keeps its whitespace.
+    # resolve_url (see basepath_resolver) rewrites href/src values as they are written.
+    # image_size (URL -> (width, height) or None) turns on image_attributes for <img> leaves.
+    # minify collapses whitespace runs in text, except inside <pre>, <code> and friends.
+    write = out.write
+    stack = []
+    children = iter((node,))
+    closing = None
+    preserving = False
+    while True:
+        for node in children:
+            kind = NODE_KINDS.get(type(node))
+            if kind is None:
+                kind = node_kind(node)
+            tag = node.tag
+
+            if kind == LEAF_KIND:
+                value = node.value
+                if tag is None:
+                    write(collapse_whitespace(str(value)) if minify and not preserving else str(value))
+                    continue
+                props = node.props
+                if image_size is not None and tag == "img":
+                    props = image_attributes(props, image_size)
+                if minify and not preserving and tag not in PRESERVE_WHITESPACE_TAGS:
+                    value = collapse_whitespace(value)
+                if props:
+                    write(f"<{tag}{format_props(props, resolve_url)}>{value}</{tag}>")
+                else:
+                    write(f"<{tag}>{value}</{tag}>")
+                continue
+
+            if kind == SPAN_KIND:
+                node.write(out, resolve_url, image_size, minify and not preserving)
+                continue
+
+            if kind == PARENT_KIND:
+                if tag is None:
+                    raise ValueError("A ParentNode must have a tag.")
+                elif node.children is None:
+                    raise ValueError("A ParentNode must have children.")
+                write(f"<{tag}{format_props(node.props, resolve_url)}>")
+            elif tag is None:
+                write(node.value or "")
+                continue
+            else:
+                write(f"<{tag}{format_props(node.props, resolve_url)}>")
+                if node.value is not None:
+                    write(node.value)
+                if node.children is None:
+                    write(f"</{tag}>")
+                    continue
+
+            # Go down into the children, and pick this parent's up again once they're written
+            stack.append((children, closing, preserving))
+            children, closing = iter(node.children), f"</{tag}>"
+            preserving = preserving or (minify and tag in PRESERVE_WHITESPACE_TAGS)
+            break
+        else:
+            if not stack:
+                return
+            write(closing)
+            children, closing, preserving = stack.pop()
+
+def render_html(node, resolve_url=None, image_size=None, minify=False):
+    buffer = io.StringIO()
+    write_html(node, buffer, resolve_url, image_size, minify)
+    return buffer.getvalue()
+
+
+# What images and links look like. Python's re backtracks on these: a paragraph full of
+# unclosed "[" or "![a](" takes quadratic time to search, so the parsers use the finders
+# below, which give the same matches in one pass over the text.
+IMAGE_PATTERN = re.compile(r"!\[(.*?)\]\((.*?)\)")
+LINK_PATTERN = re.compile(r"\[(.*?)\]\((.*?\)?)\)")
+
+def find_markdown_image(text, position=0, end=None):
+    # IMAGE_PATTERN.search(text, position, end) as (start, end, alt_start, alt_end, url_start, url_end), or None
+    return find_bracketed(text, position, len(text) if end is None else end, "![", False)
+
+def find_markdown_link(text, position=0, end=None):
+    # LINK_PATTERN.search(text, position, end), in the same shape as find_markdown_image
+    return find_bracketed(text, position, len(text) if end is None else end, "[", True)
+
+def find_bracketed(text, position, end, opener, closing_paren_in_url):
+    # The lazy groups always stop at the first "](" after the opener and the first ")" after
+    # that, and neither may cross a line break. So when an opener fails, every other opener
+    # before the line break that failed it does too, and the search carries on after it.
+    # The "](" and ")" found are remembered for the openers that follow, which keeps the
+    # whole search a single pass over the text.
+    width = len(opener)
+    middle = url_end = -1
+    while True:
+        start = text.find(opener, position, end)
+        if start == -1:
+            return None
+        if middle < start + width:
+            middle = text.find("](", start + width, end)
+            if middle == -1:
+                return None
+        newline = text.find("\n", start, middle)
+        if newline != -1:
+            position = newline + 1
+            continue
+        if url_end < middle + 2:
+            url_end = text.find(")", middle + 2, end)
+            if url_end == -1:
+                return None
+        newline = text.find("\n", middle + 2, url_end)
+        if newline != -1:
+            position = newline + 1
+            continue
+        # LINK_PATTERN's optional "\)?" keeps one ")" of a "))" inside the URL
+        if closing_paren_in_url and text.startswith(")", url_end + 1, end):
+            return start, url_end + 2, start + width, middle, middle + 2, url_end + 1
+        return start, url_end + 1, start + width, middle, middle + 2, url_end
+
+def iter_markdown_images(text):
+    match = find_markdown_image(text)
+    while match is not None:
+        yield match
+        match = find_markdown_image(text, match[1])
+
+def iter_markdown_links(text):
+    match = find_markdown_link(text)
+    while match is not None:
+        yield match
+        match = find_markdown_link(text, match[1])
 
 def extract_markdown_images(text):
-    return re.findall(r"!\[(.*?)\]\((.*?)\)", text)
+    return [(text[alt_start:alt_end], text[url_start:url_end])
+            for _, _, alt_start, alt_end, url_start, url_end in iter_markdown_images(text)]
 
 def extract_markdown_links(text):
-    return re.findall(r"\[(.*?)\]\((.*?\)?)\)", text)
+    return [(text[text_start:text_end], text[url_start:url_end])
+            for _, _, text_start, text_end, url_start, url_end in iter_markdown_links(text)]
 
 
 
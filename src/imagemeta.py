@@ -0,0 +1,157 @@
+import hashlib, json, os, struct
+
+# Build state like the manifest, gitignored as well
+IMAGE_INDEX_FILENAME = ".ssg-image-index.json"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif")
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# JPEG start-of-frame markers (baseline, progressive, lossless, ...); 0xC4, 0xC8 and 0xCC aren't frames
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def read_image_size(path):
+    # Returns (width, height) from the file header alone, or None if it isn't an image we know
+    with open(path, 'rb') as file:
+        head = file.read(26)
+        if head.startswith(PNG_SIGNATURE) and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head.startswith(b"\xff\xd8"):
+            file.seek(2)
+            return read_jpeg_size(file)
+    return None
+
+def read_jpeg_size(file):
+    # Hop from segment to segment until a start-of-frame one, without decoding anything
+    while True:
+        byte = file.read(1)
+        while byte and byte != b"\xff":
+            byte = file.read(1)
+        while byte == b"\xff":
+            byte = file.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue  # markers without a length field
+        length_bytes = file.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+        if marker in JPEG_SOF_MARKERS:
+            frame = file.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        file.seek(length - 2, os.SEEK_CUR)
+
+def stamp_of(folder):
+    # A folder's mtime, None when it isn't there
+    try:
+        return os.stat(folder).st_mtime_ns
+    except OSError:
+        return None
+
+
+class ImageIndex():
+    """Width and height of every image under static/, keyed by its site URL.
+
+    Saved next to the build manifest with each file's size and mtime, so the
+    next build only reopens images that changed. A long-running process
+    (--preview) asks is_stale() first, which only stats the folders and the
+    images the last refresh() saw instead of walking static/ again.
+    """
+
+    def __init__(self, entries=None):
+        self.entries = entries or {}
+        # What the last refresh() saw: folder -> mtime and image path -> (mtime, size), None before one
+        self.folder_stamps = None
+        self.image_stamps = None
+
+    @classmethod
+    def load(cls, dest_dir):
+        index_path = os.path.join(dest_dir, IMAGE_INDEX_FILENAME)
+        if not os.path.isfile(index_path):
+            return cls()
+        try:
+            with open(index_path, 'r', encoding='utf-8') as file:
+                return cls(json.load(file))
+        except (OSError, ValueError):
+            print(f"🚨 Oops, image index '{index_path}' is unreadable, re-reading every image.")
+            return cls()
+
+    def refresh(self, static_path):
+        # The folders are stamped before they're listed, so a file added or removed
+        # while walking changes a stamp and is_stale() notices it next time
+        self.folder_stamps = {static_path: stamp_of(static_path)}
+        for root, dirs, _ in os.walk(static_path):
+            for name in dirs:
+                folder = os.path.join(root, name)
+                self.folder_stamps[folder] = stamp_of(folder)
+        self.image_stamps = {}
+
+        entries = {}
+        read = 0
+        for root, dirs, files in os.walk(static_path):
+            dirs.sort()
+            for name in sorted(files):
+                if not name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                url = "/" + os.path.relpath(path, static_path).replace(os.sep, '/')
+                stat = os.stat(path)
+                self.image_stamps[path] = (stat.st_mtime_ns, stat.st_size)
+                old_entry = self.entries.get(url)
+                if old_entry and old_entry["size"] == stat.st_size and old_entry["mtime_ns"] == stat.st_mtime_ns:
+                    entries[url] = old_entry
+                    continue
+                size = read_image_size(path)
+                read += 1
+                if size is not None:
+                    entries[url] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                                    "width": size[0], "height": size[1]}
+        self.entries = entries
+        return read
+
+    def is_stale(self, static_path):
+        # True when an image may have been added, removed or edited since the last refresh().
+        # Adding, removing or renaming a file changes its folder's mtime, and an image edited
+        # in place changes its own stamp.
+        if self.folder_stamps is None:
+            return True
+        if any(stamp_of(folder) != stamp for folder, stamp in self.folder_stamps.items()):
+            return True
+        for path, stamp in self.image_stamps.items():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return True
+            if (stat.st_mtime_ns, stat.st_size) != stamp:
+                return True
+        return False
+
+    def save(self, dest_dir):
+        os.makedirs(dest_dir, exist_ok=True)
+        index_path = os.path.join(dest_dir, IMAGE_INDEX_FILENAME)
+        with open(index_path, 'w', encoding='utf-8') as file:
+            json.dump(self.entries, file, indent=2, sort_keys=True)
+        return index_path
+
+    def sizes(self):
+        return {url: (entry["width"], entry["height"]) for url, entry in self.entries.items()}
+
+    def digest(self):
+        encoded = json.dumps(self.sizes(), sort_keys=True).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def build_image_index(static_path, dest_dir, manifest=None):
+    index = ImageIndex.load(dest_dir)
+    read = index.refresh(static_path)
+    index_path = index.save(dest_dir)
+    if manifest is not None:
+        manifest.record_asset(index_path)
+    print(f"🖼️ Image index: {len(index.entries)} image(s), {read} header(s) read.")
+    return index
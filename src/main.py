@@ -1,24 +1,332 @@
-import os, shutil, re, sys
+import os, shutil, re, sys, io, glob, argparse, contextlib, itertools
+from concurrent.futures import ProcessPoolExecutor
 from textnode import TextNode, TextType
+from htmlnode import basepath_resolver
 from textsplit import *
+from manifest import BuildManifest, file_hash
+from template import (load_template, set_asset_map, get_asset_map, set_image_sizes, get_image_sizes,
+                      set_minify, get_minify, set_critical_css, get_critical_css)
+from fingerprint import fingerprint_assets, asset_map_digest
+from imagemeta import build_image_index
+from precompress import precompress_outputs
+from criticalcss import CriticalCss
+from treecache import TreeCache, DEFAULT_CACHE_SIZE, set_tree_cache, get_tree_cache
+from shard import ShardOutput, check_shards, pages_in_shard, parse_shard, shard_path
+from profiler import Tracer, current_tracer, set_tracer, span
+
+CONTENT_PATH = './content/'
+STATIC_PATH = './static'
+TEMPLATE_PATH = './template.html'
+DESTINATION_PATH = './docs'
+CACHE_PATH = './.ssg-cache'
+
+# Build flags a serving mode can't honour, so they're refused rather than silently ignored.
+# Every other build flag is passed on to the builds the mode does.
+UNSUPPORTED_FLAGS = {
+    "watch": ("fingerprint", "precompress", "shard", "profile", "clean"),
+    # Nothing is written, pages are rendered one request at a time and gzipped on the fly
+    "preview": ("jobs", "checksum", "fingerprint", "precompress", "shard", "profile", "clean", "dest", "stream"),
+}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the static site from ./content into ./docs.")
+    parser.add_argument("basepath", nargs="?", default="/", help="URL prefix the site is served under (default: /)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="render pages in N worker processes (0 = one per CPU core, default: 1)")
+    parser.add_argument("--inline-parser", choices=sorted(INLINE_PARSERS), default=get_inline_parser(),
+                        help="inline markdown parser to use (default: %(default)s)")
+    parser.add_argument("--inline-memo", type=int, default=INLINE_MEMO_SIZE,
+                        help="how many inline texts to remember rendered nodes for, 0 turns it off (default: %(default)s)")
+    parser.add_argument("--stream", action="store_true",
+                        help=f"stream every page block by block (pages over {STREAM_THRESHOLD // (1024 * 1024)} MB always are)")
+    parser.add_argument("--checksum", action="store_true",
+                        help="compare static files by content hash instead of size and mtime")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="copy static files as name.<hash>.ext and point pages at those names")
+    parser.add_argument("--no-image-sizes", dest="image_sizes", action="store_false",
+                        help="don't add width/height and lazy-loading attributes to local images")
+    parser.add_argument("--minify", action="store_true",
+                        help="collapse whitespace in the generated pages (<pre> and <code> are kept as they are)")
+    parser.add_argument("--critical-css", action="store_true",
+                        help="inline the rules of static/index.css each page needs and load the rest without blocking")
+    parser.add_argument("--precompress", action="store_true",
+                        help="also write max-level .gz and .deflate copies of the HTML, CSS, XML and JSON outputs")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help=f"don't keep parsed pages in {CACHE_PATH}, parse every page from scratch")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+                        help="MB the parse cache may grow to before old entries are evicted (default: %(default)s)")
+    parser.add_argument("--shard", type=shard_argument,
+                        help="only render shard i of N (e.g. 2/4) of the pages, into docs-shard-i-of-N; "
+                             "combine the shards with 'merge'")
+    parser.add_argument("--dest", help=f"folder to write the site to (default: {DESTINATION_PATH})")
+    parser.add_argument("--clean", action="store_true",
+                        help="wipe the destination folder and rebuild everything")
+    parser.add_argument("--profile", action="store_true",
+                        help="record per-page, per-stage timings as a Chrome trace and list the slowest pages")
+    parser.add_argument("--profile-output", default="build-profile.json",
+                        help="where --profile writes the trace (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=10, help="how many slow pages --profile lists (default: 10)")
+    parser.add_argument("--watch", action="store_true",
+                        help="serve ./docs, rebuild whatever changes and reload open browser tabs")
+    parser.add_argument("--preview", action="store_true",
+                        help="serve the site straight from content/ and static/, rendering pages on request, without writing docs/")
+    parser.add_argument("--port", type=int, default=8888, help="port for --watch or --preview to serve on (default: 8888)")
+    parser.add_argument("--interval", type=float, default=0.2,
+                        help="seconds between --watch polls for changes (default: 0.2)")
+    args = parser.parse_args(argv)
+    if args.watch and args.preview:
+        parser.error("--watch writes docs/ and --preview doesn't, pick one")
+    for mode, names in UNSUPPORTED_FLAGS.items():
+        given = [name for name in names if getattr(args, name) != parser.get_default(name)]
+        if getattr(args, mode) and given:
+            parser.error(f"--{mode} can't be combined with {', '.join('--' + name.replace('_', '-') for name in given)}")
+    if args.shard and args.precompress:
+        parser.error("--precompress works on the whole site, pass it to 'merge' instead")
+    return args
+
+def shard_argument(text):
+    try:
+        return parse_shard(text)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+def parse_merge_args(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py merge",
+                                     description="Combine the outputs of --shard builds and ./static into ./docs.")
+    parser.add_argument("shards", nargs="*",
+                        help=f"shard output folders (default: every {DESTINATION_PATH}-shard-*-of-* folder)")
+    parser.add_argument("--dest", default=DESTINATION_PATH, help="folder to write the site to (default: %(default)s)")
+    parser.add_argument("--checksum", action="store_true",
+                        help="compare files by content hash instead of size and mtime")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="copy static files as name.<hash>.ext (the shards have to be built with it too)")
+    parser.add_argument("--precompress", action="store_true",
+                        help="also write max-level .gz and .deflate copies of the HTML, CSS, XML and JSON outputs")
+    return parser.parse_args(argv)
+
+def merge_main(argv=None):
+    args = parse_merge_args(argv)
+    shard_paths = args.shards or sorted(glob.glob(f"{glob.escape(os.path.normpath(args.dest))}-shard-*-of-*"))
+    problems = merge_site(shard_paths, destination_path=args.dest, checksum=args.checksum,
+                          fingerprint=args.fingerprint, precompress=args.precompress)
+    if problems:
+        sys.exit(f"🚨 {len(problems)} problem(s) with the shards, nothing was merged.")
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ["merge"]:
+        merge_main(argv[1:])
+        return
+    if argv[:1] == ["serve-builds"]:
+        from builddaemon import serve_main
+        serve_main(argv[1:])
+        return
+    if argv[:1] == ["request-build"]:
+        from buildclient import request_main
+        request_main(argv[1:])
+        return
 
-def main():
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
-    else:
-        basepath = "/"
-    
-    copy_path = './static'
-    destination_path = './docs'
-    delete_everything_inside_folder(destination_path)
-    copy_everything_from_to(copy_path, destination_path)
-    generate_pages_recursive('./content/', './template.html', destination_path, basepath)
+    args = parse_args(argv)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    set_inline_parser(args.inline_parser)
+    set_inline_memo_size(args.inline_memo)
+    if args.stream:
+        set_stream_threshold(0)
 
+    tree_cache = TreeCache(CACHE_PATH, args.cache_size * 1024 * 1024) if args.cache else None
 
+    if args.watch:
+        from watch import watch
+        watch(args.basepath, port=args.port, interval=args.interval, checksum=args.checksum,
+              destination_path=args.dest or DESTINATION_PATH, jobs=jobs, image_sizes=args.image_sizes,
+              minify=args.minify, critical_css=args.critical_css, tree_cache=tree_cache)
+        return
+    if args.preview:
+        from preview import preview
+        preview(args.basepath, port=args.port, image_sizes=args.image_sizes, minify=args.minify,
+                critical_css=args.critical_css, tree_cache=tree_cache)
+        return
 
-    
+    if args.profile:
+        set_tracer(Tracer())
+
+    destination_path = args.dest or DESTINATION_PATH
+    if args.shard and not args.dest:
+        destination_path = shard_path(DESTINATION_PATH, *args.shard)
+
+    with span("build"):
+        _, failures = build_site(args.basepath, jobs, args.checksum, args.clean,
+                                 destination_path=destination_path,
+                                 fingerprint=args.fingerprint, image_sizes=args.image_sizes,
+                                 minify=args.minify, critical_css=args.critical_css, precompress=args.precompress,
+                                 tree_cache=tree_cache, shard=args.shard)
+
+    tracer = current_tracer()
+    if tracer is not None:
+        tracer.save(args.profile_output)
+        print(tracer.summary(args.top))
+        print(f"🔬 Trace written to '{args.profile_output}', open it in chrome://tracing or ui.perfetto.dev.")
+
+    if failures:
+        sys.exit(f"🚨 {len(failures)} page(s) failed to generate.")
+
+def build_site(basepath="/", jobs=1, checksum=False, clean=False,
+               content_path=CONTENT_PATH, static_path=STATIC_PATH,
+               template_path=TEMPLATE_PATH, destination_path=DESTINATION_PATH,
+               fingerprint=False, image_sizes=True, minify=False, critical_css=False, precompress=False,
+               tree_cache=None, shard=None):
+    # One full (incremental) build. Returns the saved manifest and the pages that failed.
+    # With shard=(index, count) only that shard's pages are rendered, for merge_site to combine.
+    if clean:
+        delete_everything_inside_folder(destination_path)
+    manifest = BuildManifest.load(destination_path, template_path, basepath)
+    manifest.shard = shard
+
+    if shard is None or fingerprint:
+        # A fingerprinting shard still needs the hashed names to link to
+        asset_map = publish_static(static_path, destination_path, manifest, checksum, fingerprint)
+    else:
+        # merge_site copies static/ into the final site once, instead of every shard doing it
+        asset_map = None
+    if fingerprint:
+        # New asset names mean new links in every page
+        manifest.set_option("assets", asset_map_digest(asset_map))
+    set_asset_map(asset_map)
+
+    if image_sizes:
+        with span("index images"):
+            index_images(static_path, destination_path, manifest)
+    else:
+        set_image_sizes(None)
+
+    set_minify(minify)
+    if minify:
+        manifest.set_option("minify", True)
+
+    if critical_css:
+        with span("critical css"):
+            set_critical_css(load_critical_css(static_path, manifest, basepath))
+    else:
+        set_critical_css(None)
 
+    set_tree_cache(tree_cache)
 
+    memo_before = inline_memo_stats()
+    if jobs == 1 and shard is None:
+        with span("generate pages"):
+            failures = generate_pages_recursive(content_path, template_path, destination_path, basepath, manifest)
+    else:
+        with span("discover pages"):
+            pages = discover_pages(content_path, destination_path)
+            if shard is not None:
+                pages = pages_in_shard(pages, content_path, *shard)
+                print(f"🧩 Shard {shard[0]}/{shard[1]}: {len(pages)} page(s).")
+        with span("generate pages"):
+            if jobs == 1:
+                failures = generate_pages_listed(pages, template_path, basepath, manifest)
+            else:
+                failures = generate_pages_parallel(pages, template_path, basepath, jobs, manifest)
+
+    hits, misses = (now - before for now, before in zip(inline_memo_stats(), memo_before))
+    if hits + misses:
+        print(f"🧠 Inline memo: {hits} hits, {misses} misses ({hits / (hits + misses):.0%} hit rate).")
+
+    if precompress:
+        with span("precompress"):
+            # Recorded like any other output, so a sidecar goes away together with its source
+            for sidecar_path in precompress_outputs(destination_path, manifest.outputs()):
+                manifest.record_asset(os.path.join(destination_path, sidecar_path))
+
+    if tree_cache is not None:
+        with span("prune cache"):
+            entries, size, evicted = tree_cache.prune()
+        print(f"🗃️ Parse cache: {entries} page(s), {size / (1024 * 1024):.1f} MB, {evicted} evicted.")
+
+    with span("finish manifest"):
+        if not failures:
+            manifest.remove_stale_outputs()
+        # With failures, keep the old outputs of failed pages around, but remember what we did build
+        manifest.save()
+    return manifest, failures
+
+
+def merge_site(shard_paths, content_path=CONTENT_PATH, static_path=STATIC_PATH, template_path=TEMPLATE_PATH,
+               destination_path=DESTINATION_PATH, checksum=False, fingerprint=False, precompress=False):
+    # Combine the outputs of --shard builds and the static files into the final site.
+    # Returns the problems that stopped the merge; nothing is touched when there are any.
+    try:
+        shards = [ShardOutput.load(path) for path in shard_paths]
+    except ValueError as error:
+        print(error)
+        return [str(error)]
+
+    expected_pages = [os.path.relpath(dest_path, destination_path).replace(os.sep, '/')
+                      for _, dest_path in discover_pages(content_path, destination_path)]
+    problems = check_shards(shards, expected_pages) if shards else ["No shard folders to merge."]
+    if problems:
+        for problem in problems:
+            print(f"🚨 {problem}")
+        return problems
+
+    manifest = BuildManifest.load(destination_path, template_path, None)
+    publish_static(static_path, destination_path, manifest, checksum, fingerprint)
+
+    copied, unchanged = 0, 0
+    with span("merge pages"):
+        for shard in shards:
+            for relative_path, entry in sorted(shard.pages.items()):
+                from_path = os.path.join(shard.path, *relative_path.split('/'))
+                to_path = os.path.join(destination_path, *relative_path.split('/'))
+                if file_is_unchanged(from_path, to_path, checksum):
+                    unchanged += 1
+                else:
+                    os.makedirs(os.path.dirname(to_path), exist_ok=True)
+                    shutil.copy2(from_path, to_path)
+                    copied += 1
+                # Keep what each page was built from, so the next build knows what's fresh
+                manifest.record_page_entry(to_path, entry)
+    print(f"🧩 Merged {len(shards)} shard(s): {copied} page(s) copied, {unchanged} unchanged.")
+
+    if precompress:
+        with span("precompress"):
+            for sidecar_path in precompress_outputs(destination_path, manifest.outputs()):
+                manifest.record_asset(os.path.join(destination_path, sidecar_path))
+
+    with span("finish manifest"):
+        manifest.remove_stale_outputs()
+        manifest.save()
+    return []
+
+def publish_static(static_path, destination_path, manifest, checksum=False, fingerprint=False):
+    # Copy static/ into the site, as name.<hash>.ext when fingerprinting.
+    # Returns the asset map, None without fingerprinting.
+    if fingerprint:
+        with span("fingerprint static"):
+            return fingerprint_assets(static_path, destination_path, manifest)
+    with span("sync static"):
+        copied, unchanged = sync_everything_from_to(static_path, destination_path, manifest, checksum)
+    print(f"📦 Static files synced: {copied} copied, {unchanged} unchanged.")
+    return None
+
+def index_images(static_path, destination_path, manifest):
+    # Read the size of every static image (only the changed ones, really) for the <img> tags
+    index = build_image_index(static_path, destination_path, manifest)
+    set_image_sizes(index.sizes())
+    # A resized image means new width/height attributes in the pages showing it
+    manifest.set_option("images", index.digest())
+    return index
+
+
+def load_critical_css(static_path, manifest, basepath="/"):
+    # Parse the stylesheet once for the whole build
+    css_path = os.path.join(static_path, "index.css")
+    if not os.path.isfile(css_path):
+        print(f"🚨 Oops, '{css_path}' doesn't exist, so there's no critical CSS to inline.")
+        return None
+    # An edited stylesheet changes what gets inlined into every page
+    manifest.set_option("critical_css", file_hash(css_path))
+    return CriticalCss.load(static_path, css_path, basepath_resolver(basepath, get_asset_map()))
 
 
 def delete_everything_inside_folder(inside_folder):
@@ -42,7 +350,7 @@ def delete_everything_inside_folder(inside_folder):
             print(f"🗑️ Directory and its contents deleted: {item_path}")
 
 
-def copy_everything_from_to(from_path, to_path):
+def copy_everything_from_to(from_path, to_path, manifest=None):
     if not os.path.exists(from_path):
         print(f"🚨 Oops, '{from_path}' path, which you wanna copy FROM, doesn't exist!")
         return
@@ -59,11 +367,60 @@ def copy_everything_from_to(from_path, to_path):
             # If it's a file, simply copy it!
             shutil.copy(new_from_path, new_to_path)
             print(f"📄 Copied file: '{new_from_path}' → '{new_to_path}'")
+            if manifest is not None:
+                manifest.record_asset(new_to_path)
 
         elif os.path.isdir(new_from_path):
             # If it's a directory, use recursion to copy its contents
             print(f"📂 Found directory: '{new_from_path}'. Going deeper...")
-            copy_everything_from_to(new_from_path, new_to_path)
+            copy_everything_from_to(new_from_path, new_to_path, manifest)
+
+
+def sync_everything_from_to(from_path, to_path, manifest=None, checksum=False):
+    # Like copy_everything_from_to, but only copies files that are new or changed.
+    # Returns how many files were copied and how many were already up to date.
+    if not os.path.exists(from_path):
+        print(f"🚨 Oops, '{from_path}' path, which you wanna copy FROM, doesn't exist!")
+        return 0, 0
+
+    if not os.path.exists(to_path):
+        os.mkdir(to_path)
+        print(f"📁 Destination folder '{to_path}' created.")
+
+    copied, unchanged = 0, 0
+    for item in os.listdir(from_path):
+        new_from_path = os.path.join(from_path, item)
+        new_to_path = os.path.join(to_path, item)
+
+        if os.path.isfile(new_from_path):
+            if file_is_unchanged(new_from_path, new_to_path, checksum):
+                unchanged += 1
+            else:
+                # copy2 keeps the mtime, so the next build can tell the file is unchanged
+                shutil.copy2(new_from_path, new_to_path)
+                print(f"📄 Copied file: '{new_from_path}' → '{new_to_path}'")
+                copied += 1
+            if manifest is not None:
+                manifest.record_asset(new_to_path)
+
+        elif os.path.isdir(new_from_path):
+            print(f"📂 Found directory: '{new_from_path}'. Going deeper...")
+            sub_copied, sub_unchanged = sync_everything_from_to(new_from_path, new_to_path, manifest, checksum)
+            copied += sub_copied
+            unchanged += sub_unchanged
+
+    return copied, unchanged
+
+def file_is_unchanged(from_path, to_path, checksum=False):
+    if not os.path.isfile(to_path):
+        return False
+    from_stat = os.stat(from_path)
+    to_stat = os.stat(to_path)
+    if from_stat.st_size != to_stat.st_size:
+        return False
+    if checksum:
+        return file_hash(from_path) == file_hash(to_path)
+    return from_stat.st_mtime_ns == to_stat.st_mtime_ns
 
 
 def extract_title(markdown):
@@ -76,32 +433,111 @@ def extract_title(markdown):
     
 def generate_page(from_path, template_path, dest_path, basepath):
     print(f"Generating page from {from_path} to {dest_path} using {template_path}.")
+
+    streaming = os.path.getsize(from_path) >= get_stream_threshold()
+    tracer = current_tracer()
+    if tracer is not None:
+        with tracer.page(from_path):
+            if streaming:
+                with tracer.span("stream"):
+                    generate_page_streaming(from_path, template_path, dest_path, basepath)
+            else:
+                generate_page_traced(tracer, from_path, template_path, dest_path, basepath)
+        print("✨ Template filled successfully!")
+        return
+
+    if streaming:
+        generate_page_streaming(from_path, template_path, dest_path, basepath)
+        print("✨ Template filled successfully!")
+        return
     
     with open(from_path, 'r', encoding='utf-8') as file:
         source_content = file.read()
     
-    with open(template_path, 'r', encoding='utf-8') as file:
-        template_content = file.read()
+    template = load_template(template_path, basepath)
  
-    html_content = markdown_to_html_node(source_content)
+    html_content, text_title = parse_page(source_content)
 
-    text_title = extract_title(source_content)
-
-    final_result = template_content.replace('{{ Title }}', text_title).replace('{{ Content }}', html_content.to_html())
-
-    final_result = final_result.replace('href="/', f'href="{basepath}')
-    final_result = final_result.replace('src="/', f'src="{basepath}')
-
-
-    with open(dest_path, 'w', encoding='utf-8') as file:
-        file.write(final_result)
+    # Stream the page into the file instead of building the whole HTML string first
+    with replacing(dest_path) as file:
+        template.write(file, text_title, html_content)
 
     print("✨ Template filled successfully!")
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
+def parse_page(source_content):
+    # The page's HTMLNode tree and title, straight from the parse cache when it has them
+    tree_cache = get_tree_cache()
+    if tree_cache is None:
+        return markdown_to_html_node(source_content), extract_title(source_content)
+
+    key = tree_cache.key(source_content, get_inline_parser())
+    cached = tree_cache.get(key)
+    tracer = current_tracer()
+    if cached is not None:
+        if tracer is not None:
+            tracer.count("cache_hits")
+        text_title, html_content = cached
+        return html_content, text_title
+
+    html_content = markdown_to_html_node(source_content)
+    text_title = extract_title(source_content)
+    tree_cache.put(key, text_title, html_content)
+    return html_content, text_title
+
+def generate_page_streaming(from_path, template_path, dest_path, basepath):
+    # For huge sources: read lines lazily and render each block as soon as it is lexed,
+    # so peak memory is about one block rather than several copies of the whole page
+    template = load_template(template_path, basepath)
+
+    with open(from_path, 'r', encoding='utf-8') as source:
+        blocks = lex_lines(source)
+        # The title has to be the first thing in the file, and the template needs it up front
+        first_block = next(blocks, None)
+        text_title = extract_title(first_block.text if first_block is not None else "")
+        all_blocks = itertools.chain([first_block], blocks)
+
+        with replacing(dest_path) as file:
+            template.write_with(file, text_title, lambda out, **options: write_blocks_html(all_blocks, out, **options))
+
+@contextlib.contextmanager
+def replacing(dest_path):
+    # Write next to the target and swap it in at the end, so a page that fails
+    # halfway doesn't leave a truncated file behind
+    temporary_path = dest_path + ".tmp"
+    try:
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            yield file
+        os.replace(temporary_path, dest_path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+def generate_page_traced(tracer, from_path, template_path, dest_path, basepath):
+    # Same steps as generate_page, but serialization, template filling and the write
+    # are done one after another so each gets its own timing
+    with tracer.span("read"):
+        with open(from_path, 'r', encoding='utf-8') as file:
+            source_content = file.read()
+    with tracer.span("template load"):
+        template = load_template(template_path, basepath)
+    with tracer.span("parse"):
+        html_content, text_title = parse_page(source_content)
+    with tracer.span("serialize"):
+        content_html = template.render_content(html_content)
+    with tracer.span("template fill"):
+        final_result = template.render(text_title, content_html, template.page_style(html_content))
+    with tracer.span("write"):
+        with replacing(dest_path) as file:
+            file.write(final_result)
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath, manifest=None, failures=None):
+    # Returns the pages that failed as (source path, error), like generate_pages_parallel
+    if failures is None:
+        failures = []
     if not os.path.exists(dir_path_content):
         print(f"🚨 Oops, '{dir_path_content}' path, which you wanna generate FROM, doesn't exist!")
-        return
+        return failures
     
     os.makedirs(dest_dir_path, exist_ok=True)
     print(f"📁 Ensured destination folder '{dest_dir_path}' exists.")
@@ -115,19 +551,135 @@ def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, bas
             if item.endswith('.md'):
                 html_filename = os.path.splitext(item)[0] + ".html"
                 dest_file_path = os.path.join(dest_dir_path, html_filename)
-                generate_page(new_from_path, template_path, dest_file_path, basepath)
+
+                generate_tracked_page(new_from_path, template_path, dest_file_path, basepath, manifest, failures)
 
         elif os.path.isdir(new_from_path):
             # If it's a directory, use recursion to copy its contents
             print(f"📂 Found directory: '{new_from_path}'. Going deeper...")
-            generate_pages_recursive(new_from_path, template_path, new_to_path, basepath)
-
-
-
-
-
-    
-    
+            generate_pages_recursive(new_from_path, template_path, new_to_path, basepath, manifest, failures)
+    return failures
+
+def generate_pages_listed(pages, template_path, basepath, manifest=None):
+    # The serial twin of generate_pages_parallel, for pages found by discover_pages
+    failures = []
+    for from_path, dest_path in pages:
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        generate_tracked_page(from_path, template_path, dest_path, basepath, manifest, failures)
+    return failures
+
+def generate_tracked_page(from_path, template_path, dest_path, basepath, manifest, failures):
+    if manifest is None:
+        try_generate_page(from_path, template_path, dest_path, basepath, failures)
+        return
 
+    # Skip pages whose source, template and basepath haven't changed
+    source_hash = file_hash(from_path)
+    if manifest.is_fresh(dest_path, from_path, source_hash):
+        print(f"⏭️ Up to date, skipping: {dest_path}")
+    elif not try_generate_page(from_path, template_path, dest_path, basepath, failures):
+        manifest.keep_previous_page(dest_path)
+        return
+    manifest.record_page(dest_path, from_path, source_hash)
+
+def try_generate_page(from_path, template_path, dest_path, basepath, failures):
+    # One broken page shouldn't cost the rest of the site its build
+    try:
+        generate_page(from_path, template_path, dest_path, basepath)
+    except Exception as caught:
+        error = f"{type(caught).__name__}: {caught}"
+        print(f"🚨 Failed to generate '{from_path}': {error}")
+        failures.append((from_path, error))
+        return False
+    return True
+
+def discover_pages(dir_path_content, dest_dir_path):
+    # Walk the content tree up front and pair every markdown file with its output path
+    pages = []
+    if not os.path.exists(dir_path_content):
+        print(f"🚨 Oops, '{dir_path_content}' path, which you wanna generate FROM, doesn't exist!")
+        return pages
 
-main()
\ No newline at end of file
+    for root, dirs, files in os.walk(dir_path_content):
+        dirs.sort()
+        relative_dir = os.path.relpath(root, dir_path_content)
+        for item in sorted(files):
+            if item.endswith('.md'):
+                html_filename = os.path.splitext(item)[0] + ".html"
+                dest_file_path = os.path.normpath(os.path.join(dest_dir_path, relative_dir, html_filename))
+                pages.append((os.path.join(root, item), dest_file_path))
+    return pages
+
+def render_page_job(job):
+    # Runs inside a worker: capture the log so lines from different pages don't interleave,
+    # and hand errors back instead of letting them take the pool down
+    from_path, template_path, dest_path, basepath = job
+    log = io.StringIO()
+    error = None
+    memo_before = inline_memo_stats()
+    try:
+        with contextlib.redirect_stdout(log):
+            generate_page(from_path, template_path, dest_path, basepath)
+    except Exception as caught:
+        error = f"{type(caught).__name__}: {caught}"
+    tracer = current_tracer()
+    events = tracer.drain() if tracer is not None else []
+    memo_counts = tuple(now - before for now, before in zip(inline_memo_stats(), memo_before))
+    return from_path, log.getvalue(), error, events, memo_counts
+
+def init_worker(inline_parser_name, inline_memo_size, profiling, streaming_threshold, asset_map, image_sizes, minify,
+                critical_css, tree_cache):
+    # Workers may be spawned fresh, so hand them the settings this build uses
+    set_inline_parser(inline_parser_name)
+    set_inline_memo_size(inline_memo_size)
+    set_stream_threshold(streaming_threshold)
+    set_asset_map(asset_map)
+    set_image_sizes(image_sizes)
+    set_minify(minify)
+    set_critical_css(critical_css)
+    set_tree_cache(tree_cache)
+    set_tracer(Tracer() if profiling else None)
+
+def generate_pages_parallel(pages, template_path, basepath, jobs, manifest=None):
+    jobs_to_run = []
+    source_hashes = {}
+    for from_path, dest_path in pages:
+        if manifest is not None:
+            source_hashes[dest_path] = file_hash(from_path)
+            if manifest.is_fresh(dest_path, from_path, source_hashes[dest_path]):
+                print(f"⏭️ Up to date, skipping: {dest_path}")
+                manifest.record_page(dest_path, from_path, source_hashes[dest_path])
+                continue
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        jobs_to_run.append((from_path, template_path, dest_path, basepath))
+
+    failures = []
+    if not jobs_to_run:
+        return failures
+
+    print(f"🚀 Rendering {len(jobs_to_run)} page(s) with {jobs} worker(s)...")
+    tracer = current_tracer()
+    worker_settings = (get_inline_parser(), get_inline_memo_size(), tracer is not None, get_stream_threshold(),
+                       get_asset_map(), get_image_sizes(), get_minify(), get_critical_css(), get_tree_cache())
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=worker_settings) as executor:
+        # map() yields in submission order, so the log reads the same on every run
+        results = executor.map(render_page_job, jobs_to_run, chunksize=max(1, len(jobs_to_run) // (jobs * 4)))
+        for job, (from_path, log, error, events, memo_counts) in zip(jobs_to_run, results):
+            dest_path = job[2]
+            print(log, end="")
+            add_inline_memo_stats(*memo_counts)
+            if tracer is not None:
+                tracer.extend(events)
+            if error is not None:
+                print(f"🚨 Failed to generate '{from_path}': {error}")
+                failures.append((from_path, error))
+                if manifest is not None:
+                    manifest.keep_previous_page(dest_path)
+            elif manifest is not None:
+                manifest.record_page(dest_path, from_path, source_hashes[dest_path])
+
+    return failures
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import hashlib, json, os
+
+# Bump this whenever a change to the renderer changes the HTML it produces,
+# so every page written by an older generator gets rebuilt.
+GENERATOR_VERSION = "3"
+
+# Build state, not part of the site: it is gitignored so a committed docs/ never publishes it
+MANIFEST_FILENAME = ".ssg-manifest.json"
+
+
+def file_hash(path):
+    # Hash the raw bytes so the manifest doesn't depend on text decoding
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest():
+    """Remembers which outputs a build produced and from which inputs.
+
+    Pages are keyed by their output path (relative to the destination
+    folder) and store the source path, source hash, template hash, basepath
+    and generator version. A page is only regenerated when one of those
+    changes or when its output file went missing.
+    """
+
+    def __init__(self, dest_dir, template_path, basepath, previous=None, options=None):
+        self.dest_dir = dest_dir
+        self.template_hash = file_hash(template_path) if os.path.exists(template_path) else None
+        self.basepath = basepath
+        # Any other build settings that change the rendered HTML
+        self.options = dict(options or {})
+        # previous is None when there was no (readable) manifest on disk
+        self.previous = previous
+        self.pages = {}
+        self.assets = set()
+        # (index, count) when this build only renders one shard of the pages (--shard)
+        self.shard = None
+
+    @classmethod
+    def load(cls, dest_dir, template_path, basepath, options=None):
+        manifest_path = os.path.join(dest_dir, MANIFEST_FILENAME)
+        previous = None
+        if os.path.isfile(manifest_path):
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as file:
+                    previous = json.load(file)
+            except (OSError, ValueError):
+                print(f"🚨 Oops, manifest '{manifest_path}' is unreadable, doing a full rebuild.")
+                previous = None
+        return cls(dest_dir, template_path, basepath, previous, options)
+
+    @property
+    def is_new(self):
+        return self.previous is None
+
+    def _relative(self, dest_path):
+        return os.path.relpath(dest_path, self.dest_dir).replace(os.sep, '/')
+
+    def _entry(self, source_path, source_hash):
+        return {
+            "source": os.path.normpath(source_path).replace(os.sep, '/'),
+            "source_hash": source_hash,
+            "template_hash": self.template_hash,
+            "basepath": self.basepath,
+            "version": GENERATOR_VERSION,
+            "options": self.options,
+        }
+
+    def set_option(self, name, value):
+        # Pages recorded from now on are only fresh if this setting matches next time
+        self.options[name] = value
+
+    def is_fresh(self, dest_path, source_path, source_hash):
+        if self.previous is None or not os.path.isfile(dest_path):
+            return False
+        old_entry = self.previous.get("pages", {}).get(self._relative(dest_path))
+        return old_entry == self._entry(source_path, source_hash)
+
+    def record_page(self, dest_path, source_path, source_hash):
+        self.pages[self._relative(dest_path)] = self._entry(source_path, source_hash)
+
+    def record_page_entry(self, dest_path, entry):
+        # A page rendered elsewhere (a shard being merged), keeping the entry it was built with
+        self.pages[self._relative(dest_path)] = entry
+
+    def refresh_template(self, template_path):
+        # The template changed mid-session (watch mode): every page recorded from now on uses the new hash
+        self.template_hash = file_hash(template_path) if os.path.exists(template_path) else None
+
+    def forget(self, dest_path):
+        relative_path = self._relative(dest_path)
+        self.pages.pop(relative_path, None)
+        self.assets.discard(relative_path)
+
+    def keep_previous_page(self, dest_path):
+        # Used when a page failed to build: keep tracking its old output
+        # without claiming it is up to date with the current source
+        relative_path = self._relative(dest_path)
+        old_entry = (self.previous or {}).get("pages", {}).get(relative_path)
+        if old_entry is not None:
+            self.pages[relative_path] = old_entry
+
+    def record_asset(self, dest_path):
+        self.assets.add(self._relative(dest_path))
+
+    def outputs(self):
+        # Everything this build has produced so far, relative to dest_dir
+        return sorted(set(self.pages) | self.assets)
+
+    def stale_outputs(self):
+        # Everything the previous build wrote that this build no longer produces
+        current_outputs = set(self.outputs())
+        if self.previous is None:
+            # No record of earlier builds: anything in the folder we didn't produce is a leftover
+            return sorted(set(self.existing_outputs()) - current_outputs)
+        old_outputs = set(self.previous.get("pages", {})) | set(self.previous.get("assets", []))
+        return sorted(old_outputs - current_outputs)
+
+    def existing_outputs(self):
+        for root, _, files in os.walk(self.dest_dir):
+            for name in files:
+                relative_path = self._relative(os.path.join(root, name))
+                if relative_path != MANIFEST_FILENAME:
+                    yield relative_path
+
+    def remove_stale_outputs(self):
+        removed = []
+        for relative_path in self.stale_outputs():
+            output_path = os.path.join(self.dest_dir, relative_path)
+            if os.path.isfile(output_path) or os.path.islink(output_path):
+                os.remove(output_path)
+                print(f"🗑️ Stale output deleted: {output_path}")
+                removed.append(output_path)
+            remove_empty_parents(os.path.dirname(output_path), self.dest_dir)
+        return removed
+
+    def save(self):
+        os.makedirs(self.dest_dir, exist_ok=True)
+        manifest_path = os.path.join(self.dest_dir, MANIFEST_FILENAME)
+        data = {
+            "version": GENERATOR_VERSION,
+            "pages": dict(sorted(self.pages.items())),
+            "assets": sorted(self.assets),
+        }
+        if self.shard is not None:
+            data["shard"] = {"index": self.shard[0], "count": self.shard[1]}
+        with open(manifest_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, indent=2)
+
+
+def remove_empty_parents(folder, stop_at):
+    # Walk upwards deleting folders left empty, but never the destination itself
+    stop_at = os.path.abspath(stop_at)
+    folder = os.path.abspath(folder)
+    while folder != stop_at and folder.startswith(stop_at + os.sep):
+        if not os.path.isdir(folder) or os.listdir(folder):
+            return
+        os.rmdir(folder)
+        print(f"🗑️ Empty directory deleted: {folder}")
+        folder = os.path.dirname(folder)
@@ -0,0 +1,69 @@
+import gzip, os, zlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Text outputs worth compressing; images and fonts already are
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".xml", ".json")
+
+# Sidecar suffix -> how to produce it. ".deflate" holds zlib-wrapped data, which is what
+# HTTP's "Content-Encoding: deflate" actually means.
+ENCODERS = {
+    ".gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0),
+    ".deflate": lambda data: zlib.compress(data, 9),
+}
+
+
+def is_compressible(path):
+    return path.endswith(COMPRESSIBLE_EXTENSIONS) and not os.path.basename(path).startswith(".")
+
+def sidecar_is_fresh(source_path, sidecar_path, source_mtime_ns):
+    return os.path.isfile(sidecar_path) and os.stat(sidecar_path).st_mtime_ns >= source_mtime_ns
+
+def compress_file(source_path):
+    # Returns (size, {suffix: compressed size}, whether anything had to be written)
+    stat = os.stat(source_path)
+    data = None
+    sizes = {}
+    written = False
+    for suffix, encode in ENCODERS.items():
+        sidecar_path = source_path + suffix
+        if sidecar_is_fresh(source_path, sidecar_path, stat.st_mtime_ns):
+            sizes[suffix] = os.path.getsize(sidecar_path)
+            continue
+        if data is None:
+            with open(source_path, 'rb') as file:
+                data = file.read()
+        compressed = encode(data)
+        # Write beside the target and swap it in, so a server never sees half a sidecar
+        temporary_path = sidecar_path + ".tmp"
+        with open(temporary_path, 'wb') as file:
+            file.write(compressed)
+        os.replace(temporary_path, sidecar_path)
+        sizes[suffix] = len(compressed)
+        written = True
+    return stat.st_size, sizes, written
+
+def precompress_outputs(dest_dir, relative_paths, jobs=None):
+    """Write .gz and .deflate siblings next to every compressible output.
+
+    zlib lets go of the GIL while it works, so a thread pool spreads the
+    files over the cores. Sidecars newer than their source are kept as they
+    are. Returns the relative paths of all sidecars, for the build manifest.
+    """
+    paths = [path for path in relative_paths if is_compressible(path)]
+    sources = [os.path.join(dest_dir, path) for path in paths]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(compress_file, sources))
+
+    original_total, gzip_total, compressed, fresh = 0, 0, 0, 0
+    for size, sizes, written in results:
+        original_total += size
+        gzip_total += sizes[".gz"]
+        if written:
+            compressed += 1
+        else:
+            fresh += 1
+
+    saved = original_total - gzip_total
+    print(f"🗜️ Precompressed outputs: {compressed} compressed, {fresh} up to date, "
+          f"{original_total / 1024:.1f} KB → {gzip_total / 1024:.1f} KB gzipped ({saved / 1024:.1f} KB saved).")
+    return [path + suffix for path in paths for suffix in ENCODERS]
@@ -0,0 +1,293 @@
+import gzip, hashlib, io, mimetypes, os, posixpath, threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import unquote, urlsplit
+
+from main import CONTENT_PATH, STATIC_PATH, TEMPLATE_PATH, parse_page
+from criticalcss import CriticalCss
+from htmlnode import basepath_resolver
+from imagemeta import ImageIndex
+from precompress import is_compressible
+from template import load_template, set_critical_css, set_image_sizes, set_minify
+from treecache import set_tree_cache
+
+# How many bytes of rendered pages and static files the preview keeps in memory
+PREVIEW_CACHE_SIZE = 256 * 1024 * 1024
+
+
+class Resource():
+    """One response body, with its strong ETag and (made on first request) its gzipped copy."""
+    __slots__ = ("body", "content_type", "etag", "compressible", "_gzipped")
+
+    def __init__(self, body, content_type, compressible):
+        self.body = body
+        self.content_type = content_type
+        # Strong: it changes whenever a single byte does
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self.compressible = compressible
+        self._gzipped = None
+
+    def gzipped(self):
+        # Compressed once, then every gzip-accepting request gets the same bytes
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, 9, mtime=0)
+        return self._gzipped
+
+    def size(self):
+        return len(self.body) + len(self._gzipped or b"")
+
+
+class PreviewSite():
+    """Serves the site straight from content/ and static/, without writing docs/.
+
+    A request for /blog/tom/ (under the basepath) renders
+    content/blog/tom/index.md through the template right then. The bytes
+    are kept in memory until the source, the template, the sizes of the
+    static images or (with critical_css) static/index.css change, so only
+    the first view of an edited page pays for rendering.
+    """
+
+    def __init__(self, basepath="/", content_path=CONTENT_PATH, static_path=STATIC_PATH,
+                 template_path=TEMPLATE_PATH, max_bytes=PREVIEW_CACHE_SIZE, image_sizes=True, critical_css=False):
+        self.basepath = basepath
+        self.content_path = content_path
+        self.static_path = static_path
+        self.template_path = template_path
+        self.max_bytes = max_bytes
+        # path -> (stamp, Resource), least recently used first
+        self.cache = OrderedDict()
+        self.cached_bytes = 0
+        # Only guards the cache: pages render and files are read outside it
+        self.lock = threading.Lock()
+        # None with --no-image-sizes, otherwise re-read (only the changed images) before each page
+        self.image_index = ImageIndex() if image_sizes else None
+        self.images_digest = None
+        # The (mtime, size) static/index.css was inlined from, when critical_css is on
+        self.critical_css = critical_css
+        self.critical_css_stamp = None
+        self.settings_lock = threading.Lock()
+
+    def refresh_images(self):
+        # The same width/height attributes as a build, read without writing an index file.
+        # Returns a digest of them, which is part of every page's stamp. static/ is only
+        # walked again once is_stale() sees a folder or an image change.
+        if self.image_index is None:
+            return None
+        with self.settings_lock:
+            if self.image_index.is_stale(self.static_path):
+                self.image_index.refresh(self.static_path)
+                digest = self.image_index.digest()
+                if digest != self.images_digest:
+                    set_image_sizes(self.image_index.sizes())
+                    self.images_digest = digest
+            return self.images_digest
+
+    def refresh_critical_css(self):
+        # Re-reads static/index.css for the pages to inline when it changed. Returns its stamp.
+        if not self.critical_css:
+            return None
+        css_path = os.path.join(self.static_path, "index.css")
+        try:
+            stat = os.stat(css_path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+        with self.settings_lock:
+            if stamp != self.critical_css_stamp:
+                set_critical_css(CriticalCss.load(self.static_path, css_path, basepath_resolver(self.basepath)) if stamp else None)
+                self.critical_css_stamp = stamp
+        return stamp
+
+    def locate(self, url_path):
+        # ("page" | "static" | "redirect", path), or None when there's nothing at url_path
+        normalized_path = posixpath.normpath(unquote(url_path))
+        if "\0" in normalized_path:
+            return None
+        # Only what's under the basepath is the site, with the basepath taken off
+        site_path = self.basepath.rstrip("/")
+        if normalized_path == site_path and not url_path.endswith("/"):
+            return "redirect", site_path + "/"
+        if not (normalized_path + "/").startswith(site_path + "/"):
+            return None
+        relative_path = normalized_path[len(site_path):].strip("/")
+        parts = relative_path.split("/") if relative_path else []
+
+        if url_path.endswith("/") or not parts:
+            source_path = os.path.join(self.content_path, *parts, "index.md")
+        elif relative_path.endswith(".html"):
+            source_path = os.path.join(self.content_path, *parts[:-1], parts[-1][:-len(".html")] + ".md")
+        else:
+            source_path = None
+        if source_path is not None and os.path.isfile(source_path):
+            return "page", source_path
+
+        static_path = os.path.join(self.static_path, *parts)
+        if parts and os.path.isfile(static_path):
+            return "static", static_path
+        if parts and not url_path.endswith("/") and os.path.isfile(os.path.join(self.content_path, *parts, "index.md")):
+            # Like any static server does for a folder: /blog/tom -> /blog/tom/
+            return "redirect", url_path + "/"
+        return None
+
+    def resource(self, kind, path):
+        # The Resource for a located page or static file, rendered or read only when its stamp moved
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if kind == "page":
+            template_stat = os.stat(self.template_path)
+            stamp += (template_stat.st_mtime_ns, template_stat.st_size,
+                      self.refresh_images(), self.refresh_critical_css())
+
+        with self.lock:
+            cached = self.cache.get(path)
+            if cached is not None and cached[0] == stamp:
+                self.cache.move_to_end(path)
+                return cached[1]
+
+        # Two requests for the same new page may both render it, neither waits on the other
+        # (and each writes its own tree cache file, see TreeCache.put)
+        if kind == "page":
+            resource = Resource(self.render(path), "text/html; charset=utf-8", True)
+        else:
+            with open(path, 'rb') as file:
+                body = file.read()
+            content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            resource = Resource(body, content_type, is_compressible(path))
+        with self.lock:
+            self.remember(path, stamp, resource)
+        return resource
+
+    def render(self, source_path):
+        with open(source_path, 'r', encoding='utf-8') as file:
+            source_content = file.read()
+        template = load_template(self.template_path, self.basepath)
+        html_content, text_title = parse_page(source_content)
+        buffer = io.StringIO()
+        template.write(buffer, text_title, html_content)
+        return buffer.getvalue().encode('utf-8')
+
+    def remember(self, path, stamp, resource):
+        old = self.cache.pop(path, None)
+        if old is not None:
+            self.cached_bytes -= old[1].size()
+        self.cache[path] = (stamp, resource)
+        # Counted with room for the gzipped copy it will probably get
+        self.cached_bytes += resource.size()
+        while self.cached_bytes > self.max_bytes and len(self.cache) > 1:
+            _, (_, evicted) = self.cache.popitem(last=False)
+            self.cached_bytes -= evicted.size()
+
+
+def coding_quality(parameters):
+    # The q= of one Accept-Encoding entry, 1 when there's none and 0 when it's garbage
+    for parameter in parameters:
+        name, _, value = parameter.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                return 0.0
+            return quality if 0 <= quality <= 1 else 0.0
+    return 1.0
+
+def accepts_gzip(header):
+    # "gzip", "gzip;q=0.8" and "*" count, "gzip;q=0" doesn't, and an explicit gzip entry beats "*"
+    qualities = {}
+    for coding in (header or "").split(","):
+        name, *parameters = coding.split(";")
+        qualities[name.strip().lower()] = coding_quality(parameters)
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+def etag_matches(header, etag):
+    # If-None-Match: "*" or a list of tags; a W/ prefix is ignored like the spec says for GETs
+    if header is None:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    site = None
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def respond(self, send_body):
+        url_path = urlsplit(self.path).path
+        located = self.site.locate(url_path)
+        if located is None:
+            return self.send_text(404, f"Nothing at {url_path}\n", send_body)
+        kind, path = located
+        if kind == "redirect":
+            self.send_response(301)
+            self.send_header("Location", path)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        try:
+            resource = self.site.resource(kind, path)
+        except Exception as error:
+            # A broken page shows its error instead of taking the server down
+            return self.send_text(500, f"🚨 Failed to render '{path}': {type(error).__name__}: {error}\n", send_body)
+
+        body, etag = resource.body, resource.etag
+        use_gzip = resource.compressible and accepts_gzip(self.headers.get("Accept-Encoding"))
+        if use_gzip:
+            # Another representation, so another strong tag
+            body, etag = resource.gzipped(), etag[:-1] + '-gzip"'
+
+        status = 304 if etag_matches(self.headers.get("If-None-Match"), etag) else 200
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        # Always ask again, the answer is a cheap 304 until the source changes
+        self.send_header("Cache-Control", "no-cache")
+        if resource.compressible:
+            self.send_header("Vary", "Accept-Encoding")
+        if status == 304:
+            self.end_headers()
+            return
+        self.send_header("Content-Type", resource.content_type)
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_text(self, status, text, send_body=True):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+def preview(basepath="/", port=8888, image_sizes=True, minify=False, critical_css=False, tree_cache=None):
+    # The same rendering settings a build with these flags would use
+    site = PreviewSite(basepath, image_sizes=image_sizes, critical_css=critical_css)
+    if image_sizes:
+        site.refresh_images()
+    else:
+        set_image_sizes(None)
+    set_critical_css(None)
+    site.refresh_critical_css()
+    set_minify(minify)
+    set_tree_cache(tree_cache)
+    handler = type("SitePreviewHandler", (PreviewHandler,), {"site": site})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    print(f"🔭 Previewing {site.content_path} and {site.static_path} on http://127.0.0.1:{port}{basepath}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("👋 Stopped previewing.")
+    finally:
+        server.server_close()
+        if tree_cache is not None:
+            tree_cache.prune()
@@ -0,0 +1,129 @@
+import json, os, threading, time
+
+# The tracer of the running build, None when --profile is off so the hooks cost almost nothing
+_tracer = None
+
+
+def current_tracer():
+    return _tracer
+
+def set_tracer(tracer):
+    global _tracer
+    _tracer = tracer
+
+
+def now_us():
+    # perf_counter is a system-wide monotonic clock, so worker processes line up with the parent
+    return time.perf_counter_ns() // 1000
+
+
+class Tracer():
+    """Collects build timings as Chrome trace events.
+
+    Spans become complete ("X") events, which chrome://tracing and Perfetto
+    draw as nested bars per process and thread. Counters added while a page
+    is being built end up in that page's event args.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.page_counters = None
+
+    def span(self, name, category="build", **args):
+        return Span(self, name, category, args)
+
+    def page(self, path):
+        return PageSpan(self, path)
+
+    def count(self, name, amount=1):
+        if self.page_counters is not None:
+            self.page_counters[name] = self.page_counters.get(name, 0) + amount
+
+    def add_event(self, name, category, start, duration, args):
+        self.events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start,
+            "dur": duration,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        })
+
+    def drain(self):
+        # Hand the recorded events over (from a worker to the parent) and start afresh
+        events, self.events = self.events, []
+        return events
+
+    def extend(self, events):
+        self.events.extend(events)
+
+    def page_events(self):
+        return [event for event in self.events if event["cat"] == "page"]
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, file)
+
+    def summary(self, top=10):
+        pages = sorted(self.page_events(), key=lambda event: event["dur"], reverse=True)[:top]
+        lines = [f"🐢 {len(pages)} slowest page(s):",
+                 f"{'ms':>9}{'parse':>9}{'inline':>9}{'blocks':>8}{'nodes':>8}  page"]
+        for event in pages:
+            args = event["args"]
+            lines.append(
+                f"{event['dur'] / 1000:>9.2f}{args.get('parse_us', 0) / 1000:>9.2f}"
+                f"{args.get('inline_us', 0) / 1000:>9.2f}{args.get('blocks', 0):>8}"
+                f"{args.get('text_nodes', 0):>8}  {event['name']}"
+            )
+        return "\n".join(lines)
+
+
+class Span():
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = now_us()
+        return self
+
+    def __exit__(self, *exc_info):
+        duration = now_us() - self.start
+        self.tracer.add_event(self.name, self.category, self.start, duration, self.args)
+        if self.tracer.page_counters is not None:
+            self.tracer.count(f"{self.name}_us", duration)
+        return False
+
+
+class PageSpan(Span):
+    # One event per page, carrying the counters gathered while it was built
+    def __init__(self, tracer, path):
+        super().__init__(tracer, path, "page", {})
+
+    def __enter__(self):
+        self.tracer.page_counters = {}
+        return super().__enter__()
+
+    def __exit__(self, *exc_info):
+        self.args = self.tracer.page_counters
+        self.tracer.page_counters = None
+        return super().__exit__(*exc_info)
+
+
+class NullSpan():
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_SPAN = NullSpan()
+
+def span(name, category="build", **args):
+    if _tracer is None:
+        return NULL_SPAN
+    return _tracer.span(name, category, **args)
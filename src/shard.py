@@ -0,0 +1,98 @@
+import hashlib, json, os
+from collections import Counter
+
+from manifest import MANIFEST_FILENAME
+
+
+def parse_shard(text):
+    # "2/4" -> (2, 4); shards count from 1
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(f"🚨 Shard '{text}' should look like i/N, e.g. 1/4.")
+    if not 1 <= index <= count:
+        raise ValueError(f"🚨 Shard '{text}' doesn't exist, pick one from 1/{count} to {count}/{count}.")
+    return index, count
+
+def shard_path(destination_path, index, count):
+    # Where a shard writes its slice unless told otherwise, next to the real destination
+    return f"{os.path.normpath(destination_path)}-shard-{index}-of-{count}"
+
+def shard_of(relative_path, count):
+    # The shard (1..count) a page belongs to. Hashed from its path under content/ with
+    # sha256 rather than hash(), so every machine and every run agrees.
+    relative_path = relative_path.replace(os.sep, '/')
+    digest = hashlib.sha256(relative_path.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+def pages_in_shard(pages, content_path, index, count):
+    # Keep the (source, destination) pairs of discover_pages that belong to shard index
+    return [(from_path, dest_path) for from_path, dest_path in pages
+            if shard_of(os.path.relpath(from_path, content_path), count) == index]
+
+
+class ShardOutput():
+    """What one shard says it built, read back from its manifest."""
+
+    def __init__(self, path, index, count, pages):
+        self.path = path
+        self.index = index
+        self.count = count
+        # Output path (relative to the shard folder) -> manifest entry
+        self.pages = pages
+
+    @classmethod
+    def load(cls, path):
+        manifest_path = os.path.join(path, MANIFEST_FILENAME)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            shard = data["shard"]
+            return cls(path, shard["index"], shard["count"], data.get("pages", {}))
+        except (OSError, ValueError, KeyError, TypeError):
+            raise ValueError(f"🚨 Oops, '{path}' has no readable shard manifest, was it built with --shard?")
+
+
+def check_shards(shards, expected_pages):
+    """Everything wrong with merging these shards, as a list of messages.
+
+    expected_pages are the output paths the content folder should produce.
+    The shards have to be 1..N of the same N, built with the same settings,
+    and between them produce each expected page exactly once.
+    """
+    problems = []
+    counts = {shard.count for shard in shards}
+    if len(counts) > 1:
+        problems.append(f"Shards were split different ways: {', '.join(f'{count} shards' for count in sorted(counts))}.")
+    else:
+        count = counts.pop() if counts else 0
+        indexes = Counter(shard.index for shard in shards)
+        for index in range(1, count + 1):
+            if indexes[index] == 0:
+                problems.append(f"Shard {index}/{count} is missing.")
+            elif indexes[index] > 1:
+                problems.append(f"Shard {index}/{count} was given {indexes[index]} times.")
+
+    # Everything but the source itself has to match, or the pages don't belong in one site
+    settings = {
+        json.dumps({name: value for name, value in entry.items() if name not in ("source", "source_hash")}, sort_keys=True)
+        for shard in shards for entry in shard.pages.values()
+    }
+    if len(settings) > 1:
+        problems.append("Shards were built with different templates, basepaths or options.")
+
+    produced = Counter(relative_path for shard in shards for relative_path in shard.pages)
+    expected_pages = set(expected_pages)
+    for relative_path in sorted(produced):
+        if produced[relative_path] > 1:
+            problems.append(f"'{relative_path}' was produced by {produced[relative_path]} shards.")
+        elif relative_path not in expected_pages:
+            problems.append(f"'{relative_path}' was produced, but there's no such page in the content.")
+    for relative_path in sorted(expected_pages - set(produced)):
+        problems.append(f"'{relative_path}' was not produced by any shard.")
+
+    for shard in shards:
+        for relative_path in sorted(shard.pages):
+            if not os.path.isfile(os.path.join(shard.path, *relative_path.split('/'))):
+                problems.append(f"'{relative_path}' is in the manifest of '{shard.path}', but not on disk.")
+    return problems
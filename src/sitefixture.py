@@ -0,0 +1,49 @@
+import os, tempfile, unittest
+
+
+class SiteTestCase(unittest.TestCase):
+    """A TestCase with a fresh temporary folder, laid out like the repo.
+
+    self.content, self.static, self.dest and self.template point at
+    content/, static/, docs/ and template.html inside self.root. Nothing
+    is created there until a test writes it, and the folder is removed
+    after each test.
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+
+    def write(self, path, data, mtime_ns=None):
+        # path is absolute or relative to self.root; missing folders are made, bytes are written as is
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if isinstance(data, bytes):
+            with open(path, 'wb') as file:
+                file.write(data)
+        else:
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(data)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def read_output(self, *parts):
+        with open(os.path.join(self.dest, *parts), encoding='utf-8') as file:
+            return file.read()
+
+    def read_tree(self, folder, skip=lambda name: False):
+        # {relative path: text} of every file under folder, except those whose name skip() refuses
+        tree = {}
+        for root, _, files in os.walk(folder):
+            for name in files:
+                if not skip(name):
+                    path = os.path.join(root, name)
+                    with open(path, 'r', encoding='utf-8') as file:
+                        tree[os.path.relpath(path, folder)] = file.read()
+        return tree
@@ -0,0 +1,206 @@
+import os, re
+from htmlnode import basepath_resolver, render_html, write_html
+from criticalcss import RENDERER_TAGS, defer_stylesheet, template_tags, used_tags
+
+# The placeholders template.html can use. Style is filled with the page's critical CSS
+# (empty without it), and is put in automatically when --critical-css is on.
+SLOT_PATTERN = re.compile(r"\{\{ (Title|Content|Style) \}\}")
+STYLE_SLOT = "{{ Style }}"
+
+
+# href="..." / src="..." attributes written straight into the template
+URL_ATTRIBUTE_PATTERN = re.compile(r'\b(href|src)="([^"]*)"')
+
+
+# What minify_html looks at: elements it must not touch since their whitespace shows,
+# comments (conditional ones stay) and whitespace runs
+MINIFY_PATTERN = re.compile(r"(<(pre|textarea|script|style)\b.*?</\2\s*>)|(<!--(?!\[if).*?-->)|(\s+)",
+                            re.DOTALL | re.IGNORECASE)
+TAG_NAME_PATTERN = re.compile(r"</?([a-zA-Z][\w-]*)")
+# Elements that don't sit in a line of text, so the whitespace between two of them never shows
+BLOCK_TAGS = frozenset((
+    "html", "head", "body", "title", "meta", "link", "base", "script", "style", "noscript", "template",
+    "main", "header", "footer", "nav", "section", "article", "aside", "address", "div", "p", "pre",
+    "blockquote", "figure", "figcaption", "hr", "ul", "ol", "li", "dl", "dt", "dd", "table", "caption",
+    "colgroup", "col", "thead", "tbody", "tfoot", "tr", "th", "td", "form", "fieldset", "legend",
+    "details", "summary", "h1", "h2", "h3", "h4", "h5", "h6",
+))
+
+
+def is_block_tag(tag):
+    # <!doctype>, conditional comments and the like aren't text either
+    match = TAG_NAME_PATTERN.match(tag)
+    return match is None or match.group(1).lower() in BLOCK_TAGS
+
+def minify_html(html):
+    # Collapse the whitespace of literal template markup (done once, at compile time).
+    # Comments go first, so the whitespace around one becomes a single run. A run that
+    # breaks the line between two block-level tags is indentation and goes away, any
+    # other run becomes one space: between inline tags (<a>x</a>\n<a>y</a>) it shows.
+    html = MINIFY_PATTERN.sub(lambda match: "" if match.group(3) else match.group(0), html)
+
+    def replace(match):
+        if match.group(1):
+            return match.group(1)
+        start, end = match.span()
+        if ("\n" in match.group(4) and html[start - 1:start] == ">" and html[end:end + 1] == "<"
+                and is_block_tag(html[html.rfind("<", 0, start):start]) and is_block_tag(html[end:end + 64])):
+            return ""
+        return " "
+    return MINIFY_PATTERN.sub(replace, html).strip()
+
+
+def resolve_attributes(html, resolve_url):
+    # Rewrite the URL attributes of literal template markup (done once, at compile time)
+    if resolve_url is None:
+        return html
+    return URL_ATTRIBUTE_PATTERN.sub(lambda match: f'{match.group(1)}="{resolve_url(match.group(2))}"', html)
+
+
+class Template():
+    """template.html split once into literal segments and placeholder slots.
+
+    The template's own href/src attributes are resolved against the basepath
+    at compile time; page content gets the same resolver while it is being
+    serialized. Rendering a page is then a single join of the precomputed
+    parts plus the page's title and content. With image_sizes (URL ->
+    (width, height)), local images in the content also get their size and
+    lazy-loading attributes. With minify, the template is whitespace-collapsed
+    here and the content while it is serialized. With critical_css (a
+    CriticalCss), the template's link to that stylesheet becomes an inline
+    <style> with the rules each page needs, plus a non-blocking link.
+    """
+
+    def __init__(self, text, basepath="/", asset_map=None, image_sizes=None, minify=False, critical_css=None):
+        self.basepath = basepath
+        self.resolve_url = basepath_resolver(basepath, asset_map)
+        self.image_size = image_sizes.get if image_sizes is not None else None
+        self.minify = minify
+        # How the content gets serialized, see write_html
+        self.content_options = {"resolve_url": self.resolve_url, "image_size": self.image_size, "minify": minify}
+        if minify:
+            text = minify_html(text)
+
+        self.critical_css = None
+        if critical_css is not None:
+            deferred = defer_stylesheet(text, critical_css.url, STYLE_SLOT)
+            if deferred is None:
+                print(f"🚨 Oops, the template doesn't link '{critical_css.url}', so there's no critical CSS to inline.")
+            else:
+                text = deferred
+                self.critical_css = critical_css
+                # The template's own elements are on every page
+                self.template_tags = frozenset(template_tags(text))
+
+        self.parts = []
+        self.slots = []
+
+        position = 0
+        for match in SLOT_PATTERN.finditer(text):
+            self.parts.append(resolve_attributes(text[position:match.start()], self.resolve_url))
+            self.slots.append((len(self.parts), match.group(1)))
+            self.parts.append(None)
+            position = match.end()
+        self.parts.append(resolve_attributes(text[position:], self.resolve_url))
+
+    def render(self, title, content, style=""):
+        # content must already be serialized by render_content, style comes from page_style
+        values = {"Title": title, "Content": content, "Style": style}
+        parts = self.parts.copy()
+        for index, name in self.slots:
+            parts[index] = values[name]
+        return "".join(parts)
+
+    def render_content(self, content_node):
+        return render_html(content_node, **self.content_options)
+
+    def page_style(self, content_node=None):
+        # The critical CSS for a page with this content; without the tree (a streamed
+        # page), for any element the renderer could have produced
+        if self.critical_css is None:
+            return ""
+        tags = RENDERER_TAGS if content_node is None else used_tags(content_node)
+        return self.critical_css.for_tags(self.template_tags | tags)
+
+    def write(self, out, title, content_node):
+        # Stream the page into out, serializing the content tree straight into it
+        self.write_with(out, title, lambda sink, **options: write_html(content_node, sink, **options),
+                        self.page_style(content_node))
+
+    def write_with(self, out, title, write_content, style=None):
+        # Like write, but the content comes from calling write_content(sink, **content_options),
+        # so it can be produced piece by piece while the page is being written
+        if style is None:
+            style = self.page_style()
+        slot_names = dict(self.slots)
+        for index, part in enumerate(self.parts):
+            if part is not None:
+                out.write(part)
+            elif slot_names[index] == "Title":
+                out.write(title)
+            elif slot_names[index] == "Style":
+                out.write(style)
+            else:
+                write_content(out, **self.content_options)
+
+    def __repr__(self):
+        return f"Template({[name for _, name in self.slots]}, {self.basepath})"
+
+
+_template_cache = {}
+
+# Fingerprinted asset names for this build ("/index.css" -> "/index.1a2b3c4d5e.css"), if any
+_asset_map = None
+# Sizes of the static images ("/images/tom.png" -> (width, height)), None when turned off
+_image_sizes = None
+# Whether pages are written whitespace-collapsed (--minify)
+_minify = False
+# The stylesheet to inline per page (--critical-css), a CriticalCss or None
+_critical_css = None
+# Bumped whenever one of the above changes, so compiled templates get rebuilt
+_settings_version = 0
+
+def set_asset_map(asset_map):
+    global _asset_map, _settings_version
+    _asset_map = asset_map
+    _settings_version += 1
+
+def get_asset_map():
+    return _asset_map
+
+def set_image_sizes(image_sizes):
+    global _image_sizes, _settings_version
+    _image_sizes = image_sizes
+    _settings_version += 1
+
+def get_image_sizes():
+    return _image_sizes
+
+def set_minify(minify):
+    global _minify, _settings_version
+    _minify = minify
+    _settings_version += 1
+
+def get_minify():
+    return _minify
+
+def set_critical_css(critical_css):
+    global _critical_css, _settings_version
+    _critical_css = critical_css
+    _settings_version += 1
+
+def get_critical_css():
+    return _critical_css
+
+def load_template(template_path, basepath="/"):
+    # Read and compile each template once per process; an edited file has a new
+    # mtime/size and gets recompiled, and so it is when any of the settings above change
+    stat = os.stat(template_path)
+    key = (os.path.abspath(template_path), basepath)
+    stamp = (stat.st_mtime_ns, stat.st_size, _settings_version)
+    cached = _template_cache.get(key)
+    if cached is None or cached[0] != stamp:
+        with open(template_path, 'r', encoding='utf-8') as file:
+            cached = (stamp, Template(file.read(), basepath, _asset_map, _image_sizes, _minify, _critical_css))
+        _template_cache[key] = cached
+    return cached[1]
@@ -0,0 +1,56 @@
+import io, unittest
+from contextlib import redirect_stdout
+
+from bench import (CorpusSpec, adversarial_inputs, generate_corpus, report, report_adversarial,
+                   run_benchmarks, time_adversarial)
+from main import extract_title
+from textsplit import markdown_to_html_node
+
+
+class TestBenchCorpus(unittest.TestCase):
+    def test_corpus_is_reproducible(self):
+        spec = CorpusSpec(pages=5, seed=7)
+        self.assertEqual(generate_corpus(spec), generate_corpus(CorpusSpec(pages=5, seed=7)))
+        self.assertNotEqual(generate_corpus(spec), generate_corpus(CorpusSpec(pages=5, seed=8)))
+
+    def test_pages_are_valid_markdown(self):
+        spec = CorpusSpec(pages=10, images_per_page=3, links_per_page=3, inline_density=0.5)
+        for markdown in generate_corpus(spec).values():
+            self.assertTrue(extract_title(markdown).startswith("Page"))
+            html = markdown_to_html_node(markdown).to_html()
+            self.assertIn("<img", html)
+            self.assertIn("<a", html)
+
+    def test_run_and_compare_with_baseline(self):
+        spec = CorpusSpec(pages=3, blocks_per_page=5)
+        results, input_bytes = run_benchmarks(spec, repeat=1)
+        self.assertIn("main_full_build", results)
+        self.assertGreater(input_bytes, 0)
+
+        slower = {"results": {name: seconds / 10 for name, seconds in results.items()}}
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(sorted(report(results, spec, input_bytes, slower)), sorted(results))
+            self.assertEqual(report(results, spec, input_bytes, {"results": results}), [])
+
+
+class TestAdversarialBench(unittest.TestCase):
+    def test_inputs_grow_with_size(self):
+        small, large = adversarial_inputs(10), adversarial_inputs(20)
+        self.assertEqual(small.keys(), large.keys())
+        for name in small:
+            self.assertGreater(len(large[name]), len(small[name]))
+
+    def test_every_parser_runs_on_every_input(self):
+        results = time_adversarial(50, repeat=1)
+        self.assertIn(("unclosed_links", "scan"), results)
+        self.assertIn(("many_links", "passes"), results)
+
+    def test_superlinear_growth_is_reported(self):
+        results = {("many_links", "scan"): (0.01, 0.021), ("unclosed_links", "passes"): (0.01, 0.04),
+                   ("backticks", "scan"): (0.0001, 0.001)}
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(report_adversarial(results, 10), [("unclosed_links", "passes")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+from blocklexer import Block, lex_blocks
+from textnode import BlockType, block_to_block_type
+from textsplit import markdown_to_blocks, markdown_to_html_node
+
+
+class TestBlockLexer(unittest.TestCase):
+    def test_types_and_line_ranges(self):
+        md = "# Title\n\nSome text\nmore text\n\n- a\n- b\n\n1. one\n2. two\n\n> quote\n> more\n"
+        self.assertListEqual(list(lex_blocks(md)), [
+            Block(BlockType.HEADING, ["# Title"], 0, 1),
+            Block(BlockType.PARAGRAPH, ["Some text", "more text"], 2, 4),
+            Block(BlockType.UNORDERED_LIST, ["- a", "- b"], 5, 7),
+            Block(BlockType.ORDERED_LIST, ["1. one", "2. two"], 8, 10),
+            Block(BlockType.QUOTE, ["> quote", "> more"], 11, 13),
+        ])
+
+    def test_agrees_with_markdown_to_blocks(self):
+        md = """
+        This is **bolded** paragraph
+
+        This is another paragraph with _italic_ text and `code` here
+        This is the same paragraph on a new line
+
+        - This is a list
+        - with items
+
+        1. first
+        3. not in order
+
+        ```
+        print("hi")
+        ```
+
+        ###### six
+        ####### seven
+        """
+        blocks = list(lex_blocks(md))
+        self.assertEqual([block.text for block in blocks], markdown_to_blocks(md))
+        self.assertEqual([block.block_type for block in blocks],
+                         [block_to_block_type(block) for block in markdown_to_blocks(md)])
+
+    def test_fenced_code_keeps_blank_lines(self):
+        md = "Intro\n\n```\nfirst()\n\n\nsecond()\n```\n\nOutro"
+        blocks = list(lex_blocks(md))
+        self.assertEqual([block.block_type for block in blocks],
+                         [BlockType.PARAGRAPH, BlockType.CODE, BlockType.PARAGRAPH])
+        self.assertEqual((blocks[1].start, blocks[1].end), (2, 8))
+        self.assertEqual(
+            markdown_to_html_node(md).to_html(),
+            "<div><p>Intro</p><pre><code>first()\n\n\nsecond()\n</code></pre><p>Outro</p></div>",
+        )
+
+    def test_unclosed_fence_is_a_paragraph(self):
+        blocks = list(lex_blocks("```\nnot code\n\nstill not"))
+        self.assertEqual([block.block_type for block in blocks], [BlockType.PARAGRAPH, BlockType.PARAGRAPH])
+
+    def test_inline_code_at_the_start_of_a_paragraph(self):
+        md = "```x``` is code\n\nBetween\n\n```\nreal()\n```\n\nAfter"
+        blocks = list(lex_blocks(md))
+        self.assertEqual([block.block_type for block in blocks],
+                         [BlockType.PARAGRAPH, BlockType.PARAGRAPH, BlockType.CODE, BlockType.PARAGRAPH])
+        self.assertEqual(
+            markdown_to_html_node(md).to_html(),
+            "<div><p><code>x</code> is code</p><p>Between</p><pre><code>real()\n</code></pre><p>After</p></div>",
+        )
+
+    def test_empty_document(self):
+        self.assertEqual(list(lex_blocks("")), [])
+        self.assertEqual(list(lex_blocks("\n   \n\t\n")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
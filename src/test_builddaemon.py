@@ -0,0 +1,97 @@
+import io, os, threading, unittest
+from contextlib import redirect_stdout
+
+from builddaemon import BuildDaemon, BuildServer
+from buildclient import send_request
+from template import set_minify
+from treecache import TreeCache, set_tree_cache
+from sitefixture import SiteTestCase
+
+
+class TestBuildDaemon(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(self.template, "<main>{{ Content }}</main>")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nPosts")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.daemon = BuildDaemon(tree_cache=TreeCache(os.path.join(self.root, "cache"), memory_entries=8),
+                                  content_path=self.content, static_path=self.static,
+                                  template_path=self.template, destination_path=self.dest)
+        self.addCleanup(set_tree_cache, None)
+        with redirect_stdout(io.StringIO()):
+            self.daemon.full_build()
+
+    def test_build_paths(self):
+        page = os.path.join(self.content, "blog", "index.md")
+        self.write(page, "# Blog\n\nNew post!")
+        response = self.daemon.handle({"command": "build", "paths": [page]})
+        self.assertTrue(response["ok"])
+        self.assertGreater(response["ms"], 0)
+        self.assertEqual(response["log"].count("Generating page"), 1)
+        self.assertIn("New post!", self.read_output("blog", "index.html"))
+        # The snapshot knows about the edit, so asking for changes finds nothing left to do
+        self.assertEqual(self.daemon.handle({"command": "changes"})["log"], "")
+
+    def test_build_a_removed_folder(self):
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        os.rmdir(os.path.join(self.content, "blog"))
+        response = self.daemon.handle({"command": "build", "paths": [os.path.join(self.content, "blog")]})
+        self.assertTrue(response["ok"])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "index.html")))
+
+    def test_changes_and_failures(self):
+        self.write(os.path.join(self.content, "index.md"), "No title")
+        response = self.daemon.handle({"command": "changes"})
+        self.assertFalse(response["ok"])
+        self.assertEqual(response["failures"],
+                         [[os.path.join(self.content, "index.md"), "ValueError: 🚨 No H1 title found in markdown!"]])
+
+    def test_paths_outside_the_site_are_skipped(self):
+        response = self.daemon.handle({"command": "build", "paths": [os.path.join(self.root, "elsewhere.md")]})
+        self.assertIn("skipping it", response["log"])
+
+    def test_unknown_command(self):
+        self.assertEqual(self.daemon.handle({"command": "dance"}), {"ok": False, "error": "Unknown command 'dance'."})
+
+    def test_full_build_reuses_parsed_pages(self):
+        self.write(self.template, "<article>{{ Content }}</article>")
+        response = self.daemon.handle({"command": "full"})
+        self.assertTrue(response["ok"])
+        self.assertTrue(self.read_output("index.html").startswith("<article>"))
+        self.assertEqual(len(self.daemon.tree_cache._memory), 2)
+
+    def test_build_options_apply_to_every_build(self):
+        self.addCleanup(set_minify, False)
+        daemon = BuildDaemon(build_options={"minify": True}, content_path=self.content, static_path=self.static,
+                             template_path=self.template, destination_path=self.dest)
+        page = os.path.join(self.content, "index.md")
+        self.write(page, "# Home\n\nSpaced    out")
+        with redirect_stdout(io.StringIO()):
+            daemon.full_build()
+        self.assertIn("Spaced out", self.read_output("index.html"))
+        self.write(page, "# Home\n\nStill    spaced")
+        self.assertTrue(daemon.handle({"command": "build", "paths": [page]})["ok"])
+        self.assertIn("Still spaced", self.read_output("index.html"))
+
+    def test_requests_over_the_socket(self):
+        socket_path = os.path.join(self.root, "daemon.sock")
+        server = BuildServer(socket_path, self.daemon)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            self.write(os.path.join(self.content, "index.md"), "# Home\n\nBack soon")
+            response = send_request({"command": "build", "paths": [os.path.join(self.content, "index.md")]}, socket_path)
+            self.assertTrue(response["ok"])
+            self.assertIn("Back soon", self.read_output("index.html"))
+            self.assertEqual(send_request({"command": "stop"}, socket_path)["command"], "stop")
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+        finally:
+            if thread.is_alive():
+                server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import io, os, pickle, tempfile, unittest
+from contextlib import redirect_stdout
+
+from criticalcss import CriticalCss, defer_stylesheet, parse_css, selector_tags, used_tags
+from htmlnode import LeafNode, ParentNode, basepath_resolver
+from main import build_site
+from template import Template, set_critical_css
+from textsplit import markdown_to_html_node
+
+CSS = """
+/* base */
+@import url("fonts.css");
+body { margin: 0; }
+h1,
+h2 { color: red; }
+pre code { padding: 0; }
+a:hover { color: blue; }
+table td { border: 1px solid; }
+.note, * { color: gray; }
+@media (max-width: 600px) {
+  blockquote { margin: 0; }
+  table { width: 100%; }
+}
+@font-face { font-family: "X"; src: url("x.woff"); }
+"""
+
+
+class TestParseCss(unittest.TestCase):
+    def test_selector_tags(self):
+        self.assertEqual(selector_tags("pre code"), {"pre", "code"})
+        self.assertEqual(selector_tags("ul > li + li"), {"ul", "li"})
+        self.assertEqual(selector_tags("a:not(.x):hover"), {"a"})
+        self.assertEqual(selector_tags('input[type="text"]'), {"input"})
+        self.assertEqual(selector_tags(".note"), set())
+        self.assertEqual(selector_tags("::-webkit-scrollbar"), set())
+
+    def test_rules_and_media(self):
+        rules = parse_css(CSS)
+        self.assertEqual([rule.selectors for rule in rules[:3]], [["body"], ["h1", "h2"], ["pre code"]])
+        self.assertEqual(rules[1].body, "color: red")
+        self.assertEqual(rules[-1].prelude, "@media (max-width: 600px)")
+        self.assertEqual(len(rules), 7)
+
+    def test_subset_keeps_only_used_selectors(self):
+        critical = CriticalCss("/index.css", CSS)
+        self.assertEqual(
+            critical.for_tags({"body", "h1", "p"}),
+            "body{margin: 0}h1{color: red}.note,*{color: gray}",
+        )
+        self.assertEqual(
+            critical.for_tags({"body", "pre", "code", "a", "blockquote"}),
+            "body{margin: 0}pre code{padding: 0}a:hover{color: blue}.note,*{color: gray}"
+            "@media (max-width: 600px){blockquote{margin: 0}}",
+        )
+
+    def test_subsets_are_memoized_and_not_pickled(self):
+        critical = CriticalCss("/index.css", CSS)
+        self.assertIs(critical.for_tags({"h1"}), critical.for_tags(["h1"]))
+        copy = pickle.loads(pickle.dumps(critical))
+        self.assertEqual(copy._subsets, {})
+        self.assertEqual(copy.for_tags({"h1"}), critical.for_tags({"h1"}))
+
+    def test_load_points_at_fingerprinted_assets(self):
+        with tempfile.TemporaryDirectory() as static:
+            css_path = os.path.join(static, "index.css")
+            with open(css_path, 'w', encoding='utf-8') as file:
+                file.write("body { background: url(/images/bg.png); }")
+            critical = CriticalCss.load(static, css_path, basepath_resolver("/", {"/images/bg.png": "/images/bg.abc.png"}))
+        self.assertEqual(critical.for_tags({"body"}), "body{background: url(/images/bg.abc.png)}")
+
+    def test_load_makes_relative_urls_root_relative(self):
+        with tempfile.TemporaryDirectory() as static:
+            css_path = os.path.join(static, "css", "index.css")
+            os.makedirs(os.path.dirname(css_path))
+            with open(css_path, 'w', encoding='utf-8') as file:
+                file.write("body { background: url(../images/bg.png?v=1); } h1 { background: url(data:x); }")
+            plain = CriticalCss.load(static, css_path)
+            based = CriticalCss.load(static, css_path, basepath_resolver("/site/"))
+        self.assertEqual(plain.for_tags({"body", "h1"}),
+                         "body{background: url(/images/bg.png?v=1)}h1{background: url(data:x)}")
+        self.assertEqual(based.for_tags({"body"}), "body{background: url(/site/images/bg.png?v=1)}")
+
+
+class TestCriticalTemplate(unittest.TestCase):
+    TEMPLATE = '<head><link href="/index.css" rel="stylesheet" /></head><body>{{ Content }}</body>'
+
+    def test_used_tags_come_from_the_tree(self):
+        node = markdown_to_html_node("# Hi\n\n```\ncode\n```\n\n[a](/b)")
+        self.assertEqual(used_tags(node), {"div", "h1", "pre", "code", "p", "a"})
+
+    def test_defer_stylesheet(self):
+        html = defer_stylesheet(self.TEMPLATE, "/index.css", "{{ Style }}")
+        self.assertIn('<style>{{ Style }}</style><link href="/index.css" rel="stylesheet" '
+                      'media="print" onload="this.media=\'all\'" />', html)
+        self.assertIn('<noscript><link href="/index.css" rel="stylesheet" /></noscript>', html)
+        self.assertIsNone(defer_stylesheet(self.TEMPLATE, "/other.css", "{{ Style }}"))
+
+    def test_each_page_gets_the_rules_it_uses(self):
+        template = Template(self.TEMPLATE, "/site/", critical_css=CriticalCss("/index.css", CSS))
+        node = ParentNode("div", [ParentNode("h1", [LeafNode(None, "Hi")])])
+        buffer = io.StringIO()
+        template.write(buffer, "t", node)
+        html = buffer.getvalue()
+        self.assertIn("<style>body{margin: 0}h1{color: red}.note,*{color: gray}</style>", html)
+        self.assertIn('<link href="/site/index.css" rel="stylesheet" media="print"', html)
+        self.assertEqual(html, template.render("t", template.render_content(node), template.page_style(node)))
+
+    def test_streamed_pages_assume_every_renderer_tag(self):
+        template = Template(self.TEMPLATE, critical_css=CriticalCss("/index.css", CSS))
+        self.assertIn("blockquote{margin: 0}", template.page_style())
+
+    def test_without_critical_css_the_style_slot_is_empty(self):
+        self.assertEqual(Template("<style>{{ Style }}</style>").render("t", "c"), "<style></style>")
+
+
+class TestCriticalCssBuild(unittest.TestCase):
+    def test_build_inlines_css(self):
+        self.addCleanup(set_critical_css, None)
+        with tempfile.TemporaryDirectory() as root:
+            paths = {name: os.path.join(root, name) for name in ("content", "static", "docs")}
+            os.makedirs(paths["content"])
+            os.makedirs(paths["static"])
+            template_path = os.path.join(root, "template.html")
+            for path, text in ((template_path, TestCriticalTemplate.TEMPLATE),
+                               (os.path.join(paths["content"], "index.md"), "# Home"),
+                               (os.path.join(paths["static"], "index.css"), CSS)):
+                with open(path, 'w', encoding='utf-8') as file:
+                    file.write(text)
+            with redirect_stdout(io.StringIO()):
+                build_site(content_path=paths["content"], static_path=paths["static"], template_path=template_path,
+                           destination_path=paths["docs"], critical_css=True)
+            with open(os.path.join(paths["docs"], "index.html"), encoding='utf-8') as file:
+                self.assertIn("<style>body{margin: 0}h1{color: red}", file.read())
+
+    def test_nested_page_gets_root_relative_urls(self):
+        # Inlined into /blog/tom/, "images/bg.png" would ask for /blog/tom/images/bg.png
+        self.addCleanup(set_critical_css, None)
+        with tempfile.TemporaryDirectory() as root:
+            paths = {name: os.path.join(root, name) for name in ("content", "static", "docs")}
+            os.makedirs(os.path.join(paths["content"], "blog", "tom"))
+            os.makedirs(paths["static"])
+            template_path = os.path.join(root, "template.html")
+            for path, text in ((template_path, TestCriticalTemplate.TEMPLATE),
+                               (os.path.join(paths["content"], "blog", "tom", "index.md"), "# Tom"),
+                               (os.path.join(paths["static"], "index.css"), "h1 { background: url(images/bg.png); }")):
+                with open(path, 'w', encoding='utf-8') as file:
+                    file.write(text)
+            with redirect_stdout(io.StringIO()):
+                build_site("/Static_Site_Generator/", content_path=paths["content"], static_path=paths["static"],
+                           template_path=template_path, destination_path=paths["docs"], critical_css=True)
+            with open(os.path.join(paths["docs"], "blog", "tom", "index.html"), encoding='utf-8') as file:
+                self.assertIn("<style>h1{background: url(/Static_Site_Generator/images/bg.png)}</style>", file.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
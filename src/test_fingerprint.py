@@ -0,0 +1,96 @@
+import io, json, os, unittest
+from contextlib import redirect_stdout
+
+from fingerprint import ASSET_MANIFEST_FILENAME, fingerprint_assets, fingerprinted_path, keeps_its_name, rewrite_css_urls
+from htmlnode import LeafNode, basepath_resolver
+from template import Template
+from sitefixture import SiteTestCase
+
+
+class TestFingerprint(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.css = os.path.join(self.static, "index.css")
+        self.write(self.css, "body {}")
+        self.write(os.path.join(self.static, "images", "tom.png"), "png")
+
+    def fingerprint(self):
+        with redirect_stdout(io.StringIO()):
+            return fingerprint_assets(self.static, self.dest)
+
+    def test_fingerprinted_path(self):
+        self.assertEqual(fingerprinted_path("images/tom.png", "abcdef0123456789"), "images/tom.abcdef0123.png")
+
+    def test_assets_copied_under_hashed_names(self):
+        asset_map = self.fingerprint()
+        self.assertEqual(sorted(asset_map), ["/images/tom.png", "/index.css"])
+        for url in asset_map.values():
+            self.assertTrue(os.path.isfile(os.path.join(self.dest, url.lstrip("/"))))
+        self.assertRegex(asset_map["/index.css"], r"^/index\.[0-9a-f]{10}\.css$")
+        self.assertTrue(os.path.isfile(os.path.join(self.dest, ASSET_MANIFEST_FILENAME)))
+
+    def test_well_known_files_keep_their_names(self):
+        fixed = ("robots.txt", "favicon.ico", "sitemap.xml", "CNAME", ".nojekyll", ".well-known/security.txt", "404.html")
+        for relative_path in fixed:
+            self.write(os.path.join(self.static, *relative_path.split("/")), "fixed")
+        asset_map = self.fingerprint()
+        for relative_path in fixed:
+            self.assertEqual(asset_map["/" + relative_path], "/" + relative_path)
+            self.assertTrue(os.path.isfile(os.path.join(self.dest, *relative_path.split("/"))))
+        self.assertNotEqual(asset_map["/images/tom.png"], "/images/tom.png")
+        self.assertFalse(keeps_its_name("images/robots.png"))
+
+    def test_changed_asset_gets_new_name(self):
+        first = self.fingerprint()
+        self.write(self.css, "body { margin: 0; }")
+        second = self.fingerprint()
+        self.assertNotEqual(first["/index.css"], second["/index.css"])
+        self.assertEqual(first["/images/tom.png"], second["/images/tom.png"])
+
+    def test_unchanged_stat_reuses_previous_hash(self):
+        first = self.fingerprint()
+        image = os.path.join(self.static, "images", "tom.png")
+        stat = os.stat(image)
+        # Same size and mtime: the previous hash is trusted and the file isn't read again
+        self.write(image, "gif")
+        os.utime(image, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(self.fingerprint()["/images/tom.png"], first["/images/tom.png"])
+        with open(os.path.join(self.dest, ASSET_MANIFEST_FILENAME), encoding='utf-8') as file:
+            self.assertIn("hash", json.load(file)["assets"]["/images/tom.png"])
+
+    def test_stylesheet_urls_rewritten(self):
+        self.write(self.css, 'a { background: url(/images/tom.png?v=1); } b { background: url("images/tom.png"); }'
+                             ' i { background: url(data:image/png;base64,AA==) url(/missing.png); }')
+        asset_map = self.fingerprint()
+        with open(os.path.join(self.dest, asset_map["/index.css"].lstrip("/")), encoding='utf-8') as file:
+            css = file.read()
+        image = asset_map["/images/tom.png"]
+        self.assertIn(f"url({image}?v=1)", css)
+        self.assertIn(f'url("{image.lstrip("/")}")', css)
+        self.assertIn("url(data:image/png;base64,AA==) url(/missing.png)", css)
+
+        # A changed image renames the stylesheet pointing at it as well
+        self.write(os.path.join(self.static, "images", "tom.png"), "new png")
+        self.assertNotEqual(self.fingerprint()["/index.css"], asset_map["/index.css"])
+
+    def test_rewrite_relative_urls(self):
+        asset_map = {"/images/tom.png": "/images/tom.abc.png", "/fonts/a.woff": "/fonts/a.def.woff"}
+        css = "a { b: url('../images/tom.png#x'); c: url( ../fonts/a.woff ); d: url(//cdn/x.png); }"
+        self.assertEqual(rewrite_css_urls(css, "/styles/site.css", asset_map),
+                         "a { b: url('../images/tom.abc.png#x'); c: url(../fonts/a.def.woff); d: url(//cdn/x.png); }")
+
+    def test_references_rewritten(self):
+        asset_map = {"/index.css": "/index.abc.css", "/images/tom.png": "/images/tom.def.png"}
+        template = Template('<link href="/index.css?v=2">{{ Content }}', "/site/", asset_map)
+        image = LeafNode("img", "", {"src": "/images/tom.png", "alt": "tom"})
+        self.assertEqual(
+            template.render("t", template.render_content(image)),
+            '<link href="/site/index.abc.css?v=2"><img src="/site/images/tom.def.png" alt="tom"></img>',
+        )
+        resolve_url = basepath_resolver("/", asset_map)
+        self.assertEqual(resolve_url("/index.css"), "/index.abc.css")
+        self.assertEqual(resolve_url("/blog/"), "/blog/")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,4 @@
-import unittest
+import io, os, random, unittest
 
 from htmlnode import *
 from textnode import *
@@ -672,8 +672,268 @@ class TestHtmlNode(unittest.TestCase):
         )
 
 
+class TestCompactNodes(unittest.TestCase):
+    def test_nodes_have_no_instance_dict(self):
+        for node in (HTMLNode("p"), LeafNode("b", "x"), ParentNode("div", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_leaves_share_read_only_empty_props(self):
+        first = LeafNode("b", "one")
+        second = LeafNode(None, "two")
+        self.assertIs(first.props, second.props)
+        self.assertEqual(first.props, {})
+        with self.assertRaises(TypeError):
+            first.props["href"] = "/"
+
+    def test_repr_unchanged(self):
+        self.assertEqual(repr(LeafNode("b", "x")), "HTMLNode(b, x, None, {})")
+
+    def test_tags_are_interned(self):
+        level = 2
+        self.assertIs(ParentNode(f"h{level}", []).tag, HTMLNode("h2").tag)
+
+
+class TestWriteHtml(unittest.TestCase):
+    def test_matches_to_html(self):
+        md = "# Title\n\nSome **bold** and a [link](/x)\n\n- one\n- _two_\n\n```\ncode\n```\n\n> quoted"
+        node = markdown_to_html_node(md)
+        buffer = io.StringIO()
+        write_html(node, buffer)
+        self.assertEqual(buffer.getvalue(), node.to_html())
+
+    def test_html_node_with_value_and_children(self):
+        node = HTMLNode("p", "Intro: ", [LeafNode("b", "bold")], {"class": "x"})
+        self.assertEqual(render_html(node), '<p class="x">Intro: <b>bold</b></p>')
+
+    def test_childless_html_node(self):
+        self.assertEqual(render_html(HTMLNode("br")), "<br></br>")
+        self.assertEqual(render_html(HTMLNode(None, "text")), "text")
+
+    def test_deep_tree_does_not_recurse(self):
+        node = LeafNode(None, "x")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        self.assertEqual(render_html(node), "<span>" * 5000 + "x" + "</span>" * 5000)
+
+    def test_parent_without_children_raises(self):
+        with self.assertRaises(ValueError):
+            render_html(ParentNode("div", None))
+
+    def test_minify_collapses_text_whitespace(self):
+        node = ParentNode("p", [LeafNode(None, "a  \n  b "), LeafNode("b", "c\t\td")])
+        self.assertEqual(render_html(node, minify=True), "<p>a b <b>c d</b></p>")
+
+    def test_minify_keeps_code_blocks(self):
+        md = "Some   spaced    text\n\n```\nx  =  1\nreturn  x\n```"
+        html = render_html(markdown_to_html_node(md), minify=True)
+        self.assertEqual(html, "<div><p>Some spaced text</p><pre><code>x  =  1\nreturn  x\n</code></pre></div>")
+
+    def test_minify_keeps_text_nested_in_pre(self):
+        node = ParentNode("div", [ParentNode("pre", [LeafNode(None, "a  b")]), LeafNode(None, "c  d")])
+        self.assertEqual(render_html(node, minify=True), "<div><pre>a  b</pre>c d</div>")
+
+
+class TestHtmlNodePassesParser(TestHtmlNode):
+    # Runs every test above again through the original five-pass inline parser
+    def setUp(self):
+        self.previous_parser = get_inline_parser()
+        set_inline_parser("passes")
+
+    def tearDown(self):
+        set_inline_parser(self.previous_parser)
+
+
+class TestHtmlNodeSpansParser(TestHtmlNode):
+    # Runs every test above again with inline text kept in SpanNodes
+    def setUp(self):
+        self.previous_parser = get_inline_parser()
+        set_inline_parser("spans")
+
+    def tearDown(self):
+        set_inline_parser(self.previous_parser)
+
+
+class TestHtmlNodeWithoutInlineMemo(TestHtmlNode):
+    # Runs every test above again with every inline text parsed afresh
+    def setUp(self):
+        self.previous_size = get_inline_memo_size()
+        set_inline_memo_size(0)
+
+    def tearDown(self):
+        set_inline_memo_size(self.previous_size)
+
+
+class TestInlineMemo(unittest.TestCase):
+    def setUp(self):
+        self.previous_size = get_inline_memo_size()
+        set_inline_memo_size(2)
+
+    def tearDown(self):
+        set_inline_memo_size(self.previous_size)
+
+    def test_repeated_text_reuses_nodes(self):
+        first = text_to_children("a **b** c")
+        second = text_to_children("a **b** c")
+        self.assertIsNot(first, second)
+        self.assertIs(first[1], second[1])
+        self.assertEqual(inline_memo_stats(), (1, 1))
+
+    def test_parser_is_part_of_the_key(self):
+        previous_parser = get_inline_parser()
+        set_inline_parser("scan")
+        text_to_children("a _b_")
+        set_inline_parser("passes")
+        try:
+            text_to_children("a _b_")
+        finally:
+            set_inline_parser(previous_parser)
+        self.assertEqual(inline_memo_stats(), (0, 2))
+
+    def test_memo_is_bounded(self):
+        for text in ("one", "two", "three", "one"):
+            text_to_children(text)
+        self.assertEqual(inline_memo_stats(), (0, 4))
+
+    def test_worker_counts_add_up(self):
+        text_to_children("x")
+        add_inline_memo_stats(5, 2)
+        self.assertEqual(inline_memo_stats(), (5, 3))
+
+
+class TestInlineScanMatchesPasses(unittest.TestCase):
+    def assertSameNodes(self, text):
+        self.assertSameSpans(text)
+        try:
+            expected = text_to_textnodes_passes(text)
+        except Exception as error:
+            with self.assertRaises(Exception) as caught:
+                text_to_textnodes_scan(text)
+            self.assertEqual(str(caught.exception), str(error))
+            return
+        self.assertListEqual(text_to_textnodes_scan(text), expected)
+
+    def test_tricky_inputs(self):
+        samples = [
+            "",
+            "plain",
+            "**bold****more**",
+            "***",
+            "a `code **not bold**` b",
+            "**a _b_ c** _d_",
+            "[a](b ![c](d) e",
+            "![i](u)[l](v)![j](w)",
+            "[x](y))",
+            "[link](https://en.wikipedia.org/wiki/Foo_(bar))",
+            "_snake_case_name_",
+            "`one` and `two",
+            "**a `c` b**",
+            "**open `code` and _italic",
+            "![a](b) `x` **y** [z](w) _q_",
+            "[empty]() and ![](img.png)",
+        ]
+        for text in samples:
+            with self.subTest(text=text):
+                self.assertSameNodes(text)
+
+    def test_site_content(self):
+        content = os.path.join(os.path.dirname(__file__), "..", "content")
+        for root, _, files in os.walk(content):
+            for name in files:
+                with open(os.path.join(root, name), 'r', encoding='utf-8') as file:
+                    for line in file:
+                        with self.subTest(line=line):
+                            self.assertSameNodes(line.strip())
+
+    def assertSameSpans(self, text):
+        try:
+            expected = text_to_textnodes_scan(text)
+        except Exception as error:
+            with self.assertRaises(Exception) as caught:
+                scan_spans(text)
+            self.assertEqual(str(caught.exception), str(error))
+            return
+        self.assertListEqual(text_to_textnodes_spans(text), expected)
+        leaves = [text_node_to_html_node(node) for node in expected]
+        self.assertEqual(scan_spans(text).to_html(), "".join(leaf.to_html() for leaf in leaves))
+
+
+class TestSpanNode(unittest.TestCase):
+    TEXT = "Some  **bold**  `a  b` and [a  link](/x) ![an  image](/i.png) _it_"
+
+    def test_records_point_into_the_text(self):
+        spans = scan_spans("a **b** [c](d)")
+        self.assertEqual(list(spans.kinds), [SPAN_TEXT, SPAN_BOLD, SPAN_TEXT, SPAN_LINK])
+        self.assertEqual(list(zip(spans.starts, spans.ends)), [(0, 2), (4, 5), (7, 8), (9, 10)])
+        self.assertEqual((spans.url_starts[3], spans.url_ends[3]), (12, 13))
+        self.assertEqual(spans.tags(), {"b", "a"})
+
+    def test_leaves_match_the_scan_parser(self):
+        leaves = [text_node_to_html_node(node) for node in text_to_textnodes_scan(self.TEXT)]
+        self.assertEqual(repr(list(scan_spans(self.TEXT).leaves())), repr(leaves))
+
+    def test_write_options_match_leaves(self):
+        spans = scan_spans(self.TEXT)
+        leaves = ParentNode("p", list(spans.leaves()))
+        options = {"resolve_url": lambda url: "/site" + url, "image_size": lambda url: (4, 3), "minify": True}
+        self.assertEqual(render_html(ParentNode("p", [spans]), **options), render_html(leaves, **options))
+        self.assertIn('alt="an  image" width="4" height="3"', render_html(spans, **options))
+        self.assertIn("<code>a  b</code>", render_html(spans, minify=True))
+
+    def test_tree_cache_round_trip(self):
+        from treecache import decode_node, encode_node
+        node = ParentNode("p", [scan_spans(self.TEXT)])
+        copy = decode_node(encode_node(node))
+        self.assertEqual(copy.to_html(), node.to_html())
+        self.assertEqual(list(copy.children[0].url_ends), list(node.children[0].url_ends))
+
+
+class CountingText(str):
+    # A str that adds up how many characters its find() calls have looked at
+    scanned = 0
+
+    def find(self, sub, start=0, end=None):
+        end = len(self) if end is None else end
+        found = str.find(self, sub, start, end)
+        self.scanned += (end if found == -1 else found + len(sub)) - start
+        return found
+
+
+class TestLinearInlineParsing(unittest.TestCase):
+    def test_finders_agree_with_the_patterns(self):
+        rng = random.Random(5)
+        for _ in range(20000):
+            text = "".join(rng.choice("![]()a\n") for _ in range(rng.randint(0, 14)))
+            start = rng.randint(0, len(text))
+            end = rng.randint(start, len(text))
+            for pattern, find in ((IMAGE_PATTERN, find_markdown_image), (LINK_PATTERN, find_markdown_link)):
+                match = pattern.search(text, start, end)
+                expected = None if match is None else (match.start(), match.end(), *match.span(1), *match.span(2))
+                self.assertEqual(find(text, start, end), expected, (pattern.pattern, text, start, end))
+
+    def test_extract_with_parens_in_url(self):
+        text = "[wiki](https://en.wikipedia.org/wiki/Foo_(bar)) and [x](y))"
+        self.assertEqual(extract_markdown_links(text), [("wiki", "https://en.wikipedia.org/wiki/Foo_(bar)"), ("x", "y)")])
+        self.assertEqual(extract_markdown_links(text), LINK_PATTERN.findall(text))
+
+    def test_hostile_paragraphs_parse_in_linear_time(self):
+        # Each of these took the regex search seconds to minutes. Rather than timing them,
+        # count the characters the parsers' find() calls look at: 4x the text should be
+        # about 4x the work, where a quadratic rescan would be 16x.
+        hostile = [lambda n: "[a](" * n, lambda n: "![a](" * n, lambda n: "[" * n + "](" * n,
+                   lambda n: "[a\n" * n + "](/x)", lambda n: "[a](/x) " * n]
+        for make in hostile:
+            for name, parser in INLINE_PARSERS.items():
+                small, large = CountingText(make(1000)), CountingText(make(4000))
+                parser(small)
+                parser(large)
+                self.assertLess(large.scanned, 6 * small.scanned, (name, make(2)))
+
+    def test_many_links_split_in_place(self):
+        text = " ".join(f"[l{index}](/p{index})" for index in range(1000))
+        nodes = split_nodes_link([TextNode(text, TextType.TEXT)])
+        self.assertEqual(len(nodes), 1999)
+        self.assertEqual(nodes[-1], TextNode("l999", TextType.LINK, "/p999"))
 
-    
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,130 @@
+import io, os, struct, unittest, zlib
+from contextlib import redirect_stdout
+from unittest import mock
+
+import imagemeta
+from imagemeta import IMAGE_INDEX_FILENAME, ImageIndex, build_image_index, read_image_size
+from htmlnode import LeafNode, ParentNode, render_html
+from template import Template
+from sitefixture import SiteTestCase
+
+
+def png_bytes(width, height):
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    chunk = b"IHDR" + header
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", len(header)) + chunk + struct.pack(">I", zlib.crc32(chunk))
+
+def gif_bytes(width, height):
+    return b"GIF89a" + struct.pack("<HH", width, height) + b"\x00\x00\x00"
+
+def jpeg_bytes(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    sof2 = b"\xff\xc2" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    return b"\xff\xd8" + app0 + sof2 + b"\xff\xd9"
+
+
+class TestReadImageSize(SiteTestCase):
+    def image(self, name, data):
+        return self.write(name, data)
+
+    def test_png(self):
+        self.assertEqual(read_image_size(self.image("a.png", png_bytes(640, 480))), (640, 480))
+
+    def test_gif(self):
+        self.assertEqual(read_image_size(self.image("a.gif", gif_bytes(32, 16))), (32, 16))
+
+    def test_jpeg_skips_segments_before_the_frame(self):
+        self.assertEqual(read_image_size(self.image("a.jpg", jpeg_bytes(1024, 768))), (1024, 768))
+
+    def test_not_an_image(self):
+        self.assertIsNone(read_image_size(self.image("a.png", b"png")))
+        self.assertIsNone(read_image_size(self.image("b.jpg", b"\xff\xd8\xff\xe0\x00")))
+
+    def test_real_site_image(self):
+        path = os.path.join(os.path.dirname(__file__), "..", "static", "images", "tom.png")
+        if not os.path.exists(path):
+            self.skipTest("static/images/tom.png isn't there")
+        width, height = read_image_size(path)
+        self.assertGreater(width, 0)
+        self.assertGreater(height, 0)
+
+
+class TestImageIndex(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.png = os.path.join(self.static, "images", "tom.png")
+        self.write(self.png, png_bytes(10, 20))
+        self.write(os.path.join(self.static, "index.css"), b"body {}")
+
+    def build(self):
+        with redirect_stdout(io.StringIO()):
+            return build_image_index(self.static, self.dest)
+
+    def test_index_holds_only_images(self):
+        index = self.build()
+        self.assertEqual(index.sizes(), {"/images/tom.png": (10, 20)})
+        self.assertTrue(os.path.isfile(os.path.join(self.dest, IMAGE_INDEX_FILENAME)))
+
+    def test_unchanged_images_are_not_reopened(self):
+        self.build()
+        with mock.patch.object(imagemeta, "read_image_size") as read:
+            index = self.build()
+        read.assert_not_called()
+        self.assertEqual(index.sizes(), {"/images/tom.png": (10, 20)})
+
+    def test_changed_image_is_read_again(self):
+        first = self.build()
+        self.write(self.png, png_bytes(30, 40))
+        os.utime(self.png, ns=(1, 1))
+        second = self.build()
+        self.assertEqual(second.sizes(), {"/images/tom.png": (30, 40)})
+        self.assertNotEqual(first.digest(), second.digest())
+
+    def test_is_stale(self):
+        index = ImageIndex()
+        self.assertTrue(index.is_stale(self.static))
+        index.refresh(self.static)
+        self.assertFalse(index.is_stale(self.static))
+        self.write(self.png, png_bytes(30, 40))
+        os.utime(self.png, ns=(1, 1))
+        self.assertTrue(index.is_stale(self.static))
+        index.refresh(self.static)
+        self.write(os.path.join(self.static, "images", "new", "bob.gif"), gif_bytes(1, 1))
+        self.assertTrue(index.is_stale(self.static))
+
+    def test_unreadable_index_starts_over(self):
+        self.write(os.path.join(self.dest, IMAGE_INDEX_FILENAME), b"{nope")
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(ImageIndex.load(self.dest).entries, {})
+
+
+class TestImageAttributes(unittest.TestCase):
+    def test_local_image_gets_size_and_lazy_loading(self):
+        node = LeafNode("img", "", {"src": "/images/tom.png", "alt": "Tom"})
+        html = render_html(node, image_size={"/images/tom.png": (10, 20)}.get)
+        self.assertEqual(
+            html,
+            '<img src="/images/tom.png" alt="Tom" width="10" height="20" loading="lazy" decoding="async"></img>',
+        )
+        self.assertEqual(node.props, {"src": "/images/tom.png", "alt": "Tom"})
+
+    def test_unknown_local_image_is_still_lazy(self):
+        node = LeafNode("img", "", {"src": "/images/missing.png?v=2", "alt": ""})
+        self.assertEqual(render_html(node, image_size={}.get),
+                         '<img src="/images/missing.png?v=2" alt="" loading="lazy" decoding="async"></img>')
+
+    def test_remote_image_is_left_alone(self):
+        node = LeafNode("img", "", {"src": "https://example.com/a.png", "alt": ""})
+        self.assertEqual(render_html(node, image_size={}.get), '<img src="https://example.com/a.png" alt=""></img>')
+
+    def test_template_resolves_src_and_adds_size(self):
+        template = Template("{{ Content }}", "/site/", image_sizes={"/images/tom.png": (10, 20)})
+        node = ParentNode("p", [LeafNode("img", "", {"src": "/images/tom.png", "alt": ""})])
+        self.assertEqual(
+            template.render_content(node),
+            '<p><img src="/site/images/tom.png" alt="" width="10" height="20" loading="lazy" decoding="async"></img></p>',
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os, unittest
+
+from main import generate_pages_recursive
+from manifest import BuildManifest, MANIFEST_FILENAME
+from sitefixture import SiteTestCase
+
+
+class TestBuildManifest(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(self.template, "<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nPosts")
+
+    def build(self, basepath="/"):
+        manifest = BuildManifest.load(self.dest, self.template, basepath)
+        generate_pages_recursive(self.content, self.template, self.dest, basepath, manifest)
+        manifest.remove_stale_outputs()
+        manifest.save()
+        return manifest
+
+    def mtimes(self):
+        return {
+            name: os.stat(os.path.join(self.dest, name)).st_mtime_ns
+            for name in ("index.html", os.path.join("blog", "index.html"))
+        }
+
+    def touch_outputs_into_past(self):
+        # Make rewrites detectable even on filesystems with coarse mtimes
+        for name in ("index.html", os.path.join("blog", "index.html")):
+            os.utime(os.path.join(self.dest, name), ns=(0, 0))
+
+    def test_first_build_writes_manifest(self):
+        manifest = self.build()
+        self.assertTrue(os.path.isfile(os.path.join(self.dest, MANIFEST_FILENAME)))
+        self.assertEqual(sorted(manifest.pages), ["blog/index.html", "index.html"])
+
+    def test_unchanged_pages_are_skipped(self):
+        self.build()
+        self.touch_outputs_into_past()
+        self.build()
+        self.assertEqual(set(self.mtimes().values()), {0})
+
+    def test_only_edited_page_is_rebuilt(self):
+        self.build()
+        self.touch_outputs_into_past()
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nNew post")
+        self.build()
+        mtimes = self.mtimes()
+        self.assertEqual(mtimes["index.html"], 0)
+        self.assertNotEqual(mtimes[os.path.join("blog", "index.html")], 0)
+
+    def test_template_change_rebuilds_everything(self):
+        self.build()
+        self.touch_outputs_into_past()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.build()
+        self.assertNotIn(0, self.mtimes().values())
+
+    def test_basepath_change_rebuilds_everything(self):
+        self.build()
+        self.touch_outputs_into_past()
+        self.build("/site/")
+        self.assertNotIn(0, self.mtimes().values())
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
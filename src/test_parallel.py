@@ -0,0 +1,57 @@
+import io, os, unittest
+from contextlib import redirect_stdout
+
+from main import discover_pages, generate_pages_parallel, generate_pages_recursive
+from sitefixture import SiteTestCase
+
+
+class TestParallelBuild(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(self.template, '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[Tom](/blog/tom)")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\n- **one**\n- _two_")
+        self.write(os.path.join(self.content, "blog", "tom", "index.md"), "# Tom\n\n![tom](/images/tom.png)")
+
+    def test_discover_pages(self):
+        dest = os.path.join(self.root, "out")
+        pages = discover_pages(self.content, dest)
+        self.assertEqual(
+            [os.path.relpath(dest_path, dest) for _, dest_path in pages],
+            ["index.html", os.path.join("blog", "index.html"), os.path.join("blog", "tom", "index.html")],
+        )
+
+    def test_parallel_matches_serial(self):
+        serial = os.path.join(self.root, "serial")
+        parallel = os.path.join(self.root, "parallel")
+        with redirect_stdout(io.StringIO()):
+            generate_pages_recursive(self.content, self.template, serial, "/site/")
+            failures = generate_pages_parallel(discover_pages(self.content, parallel), self.template, "/site/", 2)
+        self.assertEqual(failures, [])
+        self.assertEqual(self.read_tree(serial), self.read_tree(parallel))
+
+    def test_failing_page_is_reported_with_its_path(self):
+        broken = os.path.join(self.content, "blog", "broken.md")
+        self.write(broken, "## No title here")
+        dest = os.path.join(self.root, "out")
+        log = io.StringIO()
+        with redirect_stdout(log):
+            failures = generate_pages_parallel(discover_pages(self.content, dest), self.template, "/", 2)
+        self.assertEqual([path for path, _ in failures], [broken])
+        self.assertIn("No H1 title found", failures[0][1])
+        self.assertIn(broken, log.getvalue())
+        # The other pages still got built
+        self.assertTrue(os.path.isfile(os.path.join(dest, "blog", "tom", "index.html")))
+
+    def test_serial_build_carries_on_past_a_failing_page(self):
+        broken = os.path.join(self.content, "blog", "broken.md")
+        self.write(broken, "# Broken\n\nan `unclosed code span")
+        dest = os.path.join(self.root, "out")
+        with redirect_stdout(io.StringIO()):
+            failures = generate_pages_recursive(self.content, self.template, dest, "/")
+        self.assertEqual(failures, [(broken, "Exception: No closing delimiter '`' found")])
+        self.assertTrue(os.path.isfile(os.path.join(dest, "blog", "tom", "index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import gzip, io, os, unittest, zlib
+from contextlib import redirect_stdout
+
+from main import build_site
+from precompress import compress_file, is_compressible, precompress_outputs
+from sitefixture import SiteTestCase
+
+
+class TestPrecompress(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.html = os.path.join(self.dest, "index.html")
+        self.write(self.html, "<p>hello</p>" * 200)
+        self.write(os.path.join(self.dest, "logo.png"), "png")
+
+    def precompress(self):
+        with redirect_stdout(io.StringIO()) as output:
+            sidecars = precompress_outputs(self.dest, ["index.html", "logo.png"])
+        return sidecars, output.getvalue()
+
+    def test_is_compressible(self):
+        self.assertTrue(is_compressible("blog/index.html"))
+        self.assertTrue(is_compressible("asset-manifest.json"))
+        self.assertFalse(is_compressible("images/tom.png"))
+        self.assertFalse(is_compressible(".ssg-manifest.json"))
+
+    def test_sidecars_decompress_to_the_source(self):
+        sidecars, output = self.precompress()
+        self.assertEqual(sidecars, ["index.html.gz", "index.html.deflate"])
+        with open(self.html, 'rb') as file:
+            data = file.read()
+        with open(self.html + ".gz", 'rb') as file:
+            self.assertEqual(gzip.decompress(file.read()), data)
+        with open(self.html + ".deflate", 'rb') as file:
+            self.assertEqual(zlib.decompress(file.read()), data)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "logo.png.gz")))
+        self.assertIn("1 compressed, 0 up to date", output)
+
+    def test_newer_sidecars_are_kept(self):
+        self.precompress()
+        _, output = self.precompress()
+        self.assertIn("0 compressed, 1 up to date", output)
+
+    def test_edited_source_is_compressed_again(self):
+        self.precompress()
+        self.write(self.html, "<p>bye</p>")
+        stat = os.stat(self.html + ".gz")
+        os.utime(self.html, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertTrue(compress_file(self.html)[2])
+        with open(self.html + ".gz", 'rb') as file:
+            self.assertEqual(gzip.decompress(file.read()), b"<p>bye</p>")
+
+
+class TestPrecompressBuild(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nHello")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+
+    def build(self, precompress):
+        with redirect_stdout(io.StringIO()):
+            build_site(content_path=self.content, static_path=self.static, template_path=self.template,
+                       destination_path=self.dest, precompress=precompress)
+
+    def test_sidecars_follow_their_sources(self):
+        self.build(precompress=True)
+        for name in ("index.html.gz", "index.html.deflate", "index.css.gz", "index.css.deflate"):
+            self.assertTrue(os.path.isfile(os.path.join(self.dest, name)), name)
+
+        # Without --precompress they are leftovers like any other
+        self.build(precompress=False)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "index.html.gz")))
+        self.assertTrue(os.path.isfile(os.path.join(self.dest, "index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
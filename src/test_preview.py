@@ -0,0 +1,248 @@
+import gzip, io, os, threading, unittest
+from contextlib import redirect_stderr
+from http.client import HTTPConnection
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+from main import parse_args
+from preview import PreviewSite, PreviewHandler, accepts_gzip, etag_matches
+from template import set_critical_css
+from test_imagemeta import png_bytes
+from sitefixture import SiteTestCase
+
+
+class PreviewTestCase(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("template.html", "<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.write("content/index.md", "# Home\n\nWelcome **home**.")
+        self.write("content/blog/tom/index.md", "# Tom\n\nA [link](/blog/).")
+        self.write("content/about.md", "# About")
+        self.write("static/index.css", "body { margin: 0; }")
+        self.write("static/images/logo.bin", "not text")
+        self.site = PreviewSite("/", self.content, self.static, self.template)
+
+
+class TestPreviewSite(PreviewTestCase):
+    def test_locate(self):
+        content = os.path.join(self.root, "content")
+        static = os.path.join(self.root, "static")
+        self.assertEqual(self.site.locate("/"), ("page", os.path.join(content, "index.md")))
+        self.assertEqual(self.site.locate("/index.html"), ("page", os.path.join(content, "index.md")))
+        self.assertEqual(self.site.locate("/blog/tom/"), ("page", os.path.join(content, "blog", "tom", "index.md")))
+        self.assertEqual(self.site.locate("/about.html"), ("page", os.path.join(content, "about.md")))
+        self.assertEqual(self.site.locate("/index.css"), ("static", os.path.join(static, "index.css")))
+        self.assertEqual(self.site.locate("/blog/tom"), ("redirect", "/blog/tom/"))
+        self.assertIsNone(self.site.locate("/missing/"))
+        self.assertIsNone(self.site.locate("/../template.html"))
+        self.assertIsNone(self.site.locate("/%2e%2e/template.html"))
+
+    def test_locate_under_a_basepath(self):
+        self.site.basepath = "/Static_Site_Generator/"
+        content = os.path.join(self.root, "content")
+        self.assertEqual(self.site.locate("/Static_Site_Generator/"), ("page", os.path.join(content, "index.md")))
+        self.assertEqual(self.site.locate("/Static_Site_Generator/blog/tom/"),
+                         ("page", os.path.join(content, "blog", "tom", "index.md")))
+        self.assertEqual(self.site.locate("/Static_Site_Generator/index.css"),
+                         ("static", os.path.join(self.root, "static", "index.css")))
+        self.assertEqual(self.site.locate("/Static_Site_Generator/blog/tom"), ("redirect", "/Static_Site_Generator/blog/tom/"))
+        self.assertEqual(self.site.locate("/Static_Site_Generator"), ("redirect", "/Static_Site_Generator/"))
+        self.assertIsNone(self.site.locate("/blog/tom/"))
+        self.assertIsNone(self.site.locate("/Static_Site_GeneratorX/"))
+        self.assertIsNone(self.site.locate("/Static_Site_Generator/../index.css"))
+
+    def test_render_matches_the_template(self):
+        resource = self.site.resource("page", os.path.join(self.root, "content", "index.md"))
+        self.assertEqual(resource.body.decode('utf-8'),
+                         "<title>Home</title><main><div><h1>Home</h1><p>Welcome <b>home</b>.</p></div></main>")
+        self.assertEqual(resource.content_type, "text/html; charset=utf-8")
+
+    def test_pages_are_cached_until_the_source_changes(self):
+        path = self.write("content/about.md", "# About", mtime_ns=1_000_000_000)
+        first = self.site.resource("page", path)
+        self.assertIs(self.site.resource("page", path), first)
+
+        self.write("content/about.md", "# About us", mtime_ns=2_000_000_000)
+        second = self.site.resource("page", path)
+        self.assertIsNot(second, first)
+        self.assertIn(b"About us", second.body)
+        self.assertNotEqual(second.etag, first.etag)
+
+    def test_template_change_rerenders(self):
+        path = os.path.join(self.root, "content", "about.md")
+        first = self.site.resource("page", path)
+        self.write("template.html", "<h6>{{ Title }}</h6>{{ Content }}", mtime_ns=3_000_000_000)
+        self.assertIn(b"<h6>About</h6>", self.site.resource("page", path).body)
+        self.assertNotIn(b"<h6>", first.body)
+
+    def test_image_changes_rerender(self):
+        path = self.write("content/about.md", "# About\n\n![logo](/images/logo.png)")
+        self.assertNotIn(b"width=", self.site.resource("page", path).body)
+        self.write("static/images/logo.png", png_bytes(64, 32))
+        self.assertIn(b'width="64" height="32"', self.site.resource("page", path).body)
+
+    def test_unchanged_static_is_not_walked_again(self):
+        path = self.write("content/about.md", "# About\n\n![logo](/images/logo.png)")
+        image = self.write("static/images/logo.png", png_bytes(64, 32), mtime_ns=7_000_000_000)
+        self.assertIn(b'width="64"', self.site.resource("page", path).body)
+        with mock.patch("imagemeta.os.walk", wraps=os.walk) as walk:
+            self.site.resource("page", path)
+            self.site.resource("page", os.path.join(self.content, "index.md"))
+        walk.assert_not_called()
+
+        # Edited in place, so only the image's own stamp moves, not its folder's
+        self.write(image, png_bytes(80, 40), mtime_ns=8_000_000_000)
+        self.assertIn(b'width="80" height="40"', self.site.resource("page", path).body)
+
+    def test_critical_css_follows_the_stylesheet(self):
+        self.addCleanup(set_critical_css, None)
+        self.site.critical_css = True
+        self.write("template.html", '<link rel="stylesheet" href="/index.css">{{ Content }}')
+        path = os.path.join(self.root, "content", "about.md")
+        self.write("static/index.css", "h1 { color: red; }", mtime_ns=5_000_000_000)
+        self.assertIn(b"h1{color: red}", self.site.resource("page", path).body)
+        self.write("static/index.css", "h1 { color: blue; }", mtime_ns=6_000_000_000)
+        self.assertIn(b"h1{color: blue}", self.site.resource("page", path).body)
+
+    def test_renders_outside_the_lock(self):
+        # A slow page mustn't hold up a cached file another request wants
+        css = self.site.resource("static", os.path.join(self.root, "static", "index.css"))
+        rendering, finish = threading.Event(), threading.Event()
+        render = self.site.render
+        def slow_render(source_path):
+            rendering.set()
+            finish.wait(5)
+            return render(source_path)
+        with mock.patch.object(self.site, "render", slow_render):
+            slow = threading.Thread(target=self.site.resource, args=("page", os.path.join(self.root, "content", "about.md")))
+            slow.start()
+            self.assertTrue(rendering.wait(5))
+            self.assertIs(self.site.resource("static", os.path.join(self.root, "static", "index.css")), css)
+            finish.set()
+            slow.join()
+        self.assertEqual(len(self.site.cache), 2)
+
+    def test_gzip_is_made_once(self):
+        resource = self.site.resource("page", os.path.join(self.root, "content", "index.md"))
+        gzipped = resource.gzipped()
+        self.assertIs(resource.gzipped(), gzipped)
+        self.assertEqual(gzip.decompress(gzipped), resource.body)
+
+    def test_cache_is_bounded(self):
+        self.site.max_bytes = 1
+        for name in ("index.css", os.path.join("images", "logo.bin")):
+            self.site.resource("static", os.path.join(self.root, "static", name))
+        self.assertEqual(len(self.site.cache), 1)
+
+
+class TestHeaders(unittest.TestCase):
+    def test_accepts_gzip(self):
+        self.assertTrue(accepts_gzip("gzip, deflate, br"))
+        self.assertTrue(accepts_gzip("br;q=1.0, gzip;q=0.8"))
+        self.assertTrue(accepts_gzip("*"))
+        self.assertFalse(accepts_gzip("gzip;q=0"))
+        self.assertFalse(accepts_gzip("identity"))
+        self.assertFalse(accepts_gzip(None))
+        # A malformed q-value is a refusal, not a crash
+        self.assertFalse(accepts_gzip("gzip;q=abc"))
+        self.assertFalse(accepts_gzip("gzip;q=abc, *"))
+        # An explicit gzip wins over "*", whichever comes first
+        self.assertTrue(accepts_gzip("*;q=0, gzip"))
+        self.assertFalse(accepts_gzip("gzip;q=0, *"))
+
+    def test_etag_matches(self):
+        self.assertTrue(etag_matches('"a", "b"', '"b"'))
+        self.assertTrue(etag_matches('*', '"b"'))
+        self.assertTrue(etag_matches('W/"b"', '"b"'))
+        self.assertFalse(etag_matches('"a"', '"b"'))
+        self.assertFalse(etag_matches(None, '"b"'))
+
+
+class TestPreviewArguments(unittest.TestCase):
+    def test_flags_that_need_a_build_are_refused(self):
+        for flags in (["--jobs", "2"], ["--fingerprint"], ["--precompress"], ["--dest", "out"], ["--stream"]):
+            with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+                parse_args(["--preview", *flags])
+
+    def test_rendering_flags_are_accepted(self):
+        args = parse_args(["--preview", "--minify", "--critical-css", "--no-image-sizes", "--inline-parser", "spans"])
+        self.assertTrue(args.minify and args.critical_css)
+
+
+class TestPreviewServer(PreviewTestCase):
+    def setUp(self):
+        super().setUp()
+        handler = type("TestPreviewHandler", (PreviewHandler,), {"site": self.site, "log_message": lambda *args: None})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def get(self, path, method="GET", **headers):
+        connection = HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=5)
+        try:
+            connection.request(method, path, headers=headers)
+            response = connection.getresponse()
+            return response, response.read()
+        finally:
+            connection.close()
+
+    def test_etag_and_not_modified(self):
+        response, body = self.get("/blog/tom/")
+        self.assertEqual(response.status, 200)
+        self.assertIn(b"<h1>Tom</h1>", body)
+        etag = response.getheader("ETag")
+        self.assertEqual(response.getheader("Cache-Control"), "no-cache")
+
+        response, body = self.get("/blog/tom/", **{"If-None-Match": etag})
+        self.assertEqual((response.status, body), (304, b""))
+        self.assertEqual(response.getheader("ETag"), etag)
+
+        self.write("content/blog/tom/index.md", "# Tom again", mtime_ns=4_000_000_000)
+        response, body = self.get("/blog/tom/", **{"If-None-Match": etag})
+        self.assertEqual(response.status, 200)
+        self.assertIn(b"Tom again", body)
+
+    def test_gzip(self):
+        plain, plain_body = self.get("/")
+        response, body = self.get("/", **{"Accept-Encoding": "gzip"})
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+        self.assertEqual(gzip.decompress(body), plain_body)
+        self.assertNotEqual(response.getheader("ETag"), plain.getheader("ETag"))
+
+        response, body = self.get("/", **{"Accept-Encoding": "gzip", "If-None-Match": response.getheader("ETag")})
+        self.assertEqual(response.status, 304)
+
+        response, body = self.get("/", **{"Accept-Encoding": "gzip;q=abc"})
+        self.assertEqual((response.status, body), (200, plain_body))
+
+    def test_static_and_errors(self):
+        response, body = self.get("/index.css")
+        self.assertEqual((response.status, body), (200, b"body { margin: 0; }"))
+        self.assertEqual(response.getheader("Content-Type"), "text/css")
+
+        response, body = self.get("/images/logo.bin", **{"Accept-Encoding": "gzip"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+
+        response, _ = self.get("/blog/tom")
+        self.assertEqual((response.status, response.getheader("Location")), (301, "/blog/tom/"))
+        self.assertEqual(self.get("/nope.html")[0].status, 404)
+
+        response, body = self.get("/about.html", method="HEAD")
+        self.assertEqual((response.status, body), (200, b""))
+        self.assertGreater(int(response.getheader("Content-Length")), 0)
+
+    def test_broken_page_is_a_500(self):
+        self.write("content/broken/index.md", "no title here")
+        response, body = self.get("/broken/")
+        self.assertEqual(response.status, 500)
+        self.assertIn(b"Failed to render", body)
+        self.assertEqual(self.get("/")[0].status, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import io, json, os, unittest
+from contextlib import redirect_stdout
+
+from main import discover_pages, generate_page, generate_pages_parallel
+from profiler import Tracer, set_tracer, span, NULL_SPAN
+from textsplit import get_inline_parser, set_inline_parser
+from sitefixture import SiteTestCase
+
+
+class TestProfiler(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(self.template, "{{ Title }}{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nSome **bold** text\n\n- a\n- b")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\n_hi_")
+        self.tracer = Tracer()
+        set_tracer(self.tracer)
+
+    def tearDown(self):
+        set_tracer(None)
+
+    def test_span_is_free_without_tracer(self):
+        set_tracer(None)
+        self.assertIs(span("anything"), NULL_SPAN)
+
+    def test_page_event_has_stage_timings_and_counts(self):
+        source = os.path.join(self.content, "index.md")
+        with redirect_stdout(io.StringIO()):
+            generate_page(source, self.template, os.path.join(self.root, "index.html"), "/")
+        pages = self.tracer.page_events()
+        self.assertEqual([event["name"] for event in pages], [source])
+        args = pages[0]["args"]
+        self.assertEqual(args["blocks"], 3)
+        self.assertEqual(args["text_nodes"], 6)
+        for stage in ("read_us", "parse_us", "inline_us", "serialize_us", "template fill_us", "write_us"):
+            self.assertIn(stage, args)
+        stage_names = {event["name"] for event in self.tracer.events}
+        self.assertTrue({"read", "parse", "serialize", "template fill", "write"} <= stage_names)
+
+    def test_spans_parser_counts_tokens(self):
+        # One SpanNode per text, but the count is still the tokens inside it
+        previous = get_inline_parser()
+        set_inline_parser("spans")
+        try:
+            with redirect_stdout(io.StringIO()):
+                generate_page(os.path.join(self.content, "index.md"), self.template,
+                              os.path.join(self.root, "index.html"), "/")
+        finally:
+            set_inline_parser(previous)
+        self.assertEqual(self.tracer.page_events()[0]["args"]["text_nodes"], 6)
+
+    def test_parallel_build_collects_worker_events(self):
+        dest = os.path.join(self.root, "out")
+        with redirect_stdout(io.StringIO()):
+            generate_pages_parallel(discover_pages(self.content, dest), self.template, "/", 2)
+        self.assertEqual(len(self.tracer.page_events()), 2)
+
+    def test_save_and_summary(self):
+        with redirect_stdout(io.StringIO()):
+            for from_path, dest_path in discover_pages(self.content, os.path.join(self.root, "out")):
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                generate_page(from_path, self.template, dest_path, "/")
+        trace_path = os.path.join(self.root, "trace.json")
+        self.tracer.save(trace_path)
+        with open(trace_path, encoding='utf-8') as file:
+            trace = json.load(file)
+        self.assertTrue(all(event["ph"] == "X" for event in trace["traceEvents"]))
+        summary = self.tracer.summary(top=1)
+        self.assertIn("1 slowest page(s)", summary)
+        self.assertEqual(len(summary.splitlines()), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import io, os, subprocess, sys, unittest
+from contextlib import redirect_stdout
+
+from main import build_site, discover_pages, merge_site
+from shard import ShardOutput, check_shards, pages_in_shard, parse_shard, shard_of
+from sitefixture import SiteTestCase
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+class TestShardAssignment(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for text in ("0/4", "5/4", "2", "a/b"):
+            with self.assertRaises(ValueError):
+                parse_shard(text)
+
+    def test_assignment_is_stable(self):
+        # Pinned, so a change to the hashing (which would reshuffle every shard) is noticed
+        self.assertEqual([shard_of(f"blog/post-{index}/index.md", 4) for index in range(6)], [4, 3, 3, 4, 2, 3])
+        self.assertEqual(shard_of("blog\\index.md".replace("\\", os.sep), 4), shard_of("blog/index.md", 4))
+
+    def test_shards_partition_the_pages(self):
+        pages = [(os.path.join("content", f"page-{index}.md"), f"page-{index}.html") for index in range(50)]
+        slices = [pages_in_shard(pages, "content", index, 3) for index in (1, 2, 3)]
+        self.assertEqual(sorted(page for pages in slices for page in pages), sorted(pages))
+        self.assertTrue(all(slices))
+
+
+class TestCheckShards(unittest.TestCase):
+    ENTRY = {"source": "content/a.md", "source_hash": "1", "template_hash": "t", "basepath": "/",
+             "version": "3", "options": {}}
+
+    def shard(self, index, count, *pages, **changes):
+        return ShardOutput(".", index, count, {page: dict(self.ENTRY, **changes) for page in pages})
+
+    def problems(self, shards, expected):
+        # Leave the on-disk check out, these shards only exist in memory
+        return [problem for problem in check_shards(shards, expected) if "not on disk" not in problem]
+
+    def test_complete_shards_have_no_problems(self):
+        shards = [self.shard(1, 2, "a.html"), self.shard(2, 2, "b.html")]
+        self.assertEqual(self.problems(shards, ["a.html", "b.html"]), [])
+
+    def test_missing_and_duplicate_pages(self):
+        shards = [self.shard(1, 2, "a.html", "b.html"), self.shard(2, 2, "b.html", "c.html")]
+        self.assertEqual(self.problems(shards, ["a.html", "b.html", "d.html"]), [
+            "'b.html' was produced by 2 shards.",
+            "'c.html' was produced, but there's no such page in the content.",
+            "'d.html' was not produced by any shard.",
+        ])
+
+    def test_missing_or_mismatched_shards(self):
+        self.assertEqual(self.problems([self.shard(1, 3, "a.html"), self.shard(1, 3)], ["a.html"]),
+                         ["Shard 1/3 was given 2 times.", "Shard 2/3 is missing.", "Shard 3/3 is missing."])
+        self.assertEqual(self.problems([self.shard(1, 2, "a.html"), self.shard(1, 3)], ["a.html"]),
+                         ["Shards were split different ways: 2 shards, 3 shards."])
+
+    def test_different_settings(self):
+        shards = [self.shard(1, 2, "a.html"), self.shard(2, 2, "b.html", basepath="/site/")]
+        self.assertEqual(self.problems(shards, ["a.html", "b.html"]),
+                         ["Shards were built with different templates, basepaths or options."])
+
+
+class TestShardedBuild(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("static/index.css", "body { margin: 0; }")
+        for index in range(12):
+            self.write(f"content/section-{index % 3}/page-{index}/index.md", f"# Page {index}\n\n**bold** [home](/)")
+        self.write("content/index.md", "# Home")
+
+    def read_tree(self, folder):
+        # The build state files differ between a merge and a single build, the pages mustn't
+        return super().read_tree(folder, skip=lambda name: name.startswith(".ssg-"))
+
+    def run_main(self, *argv):
+        return subprocess.run([sys.executable, MAIN, *argv], cwd=self.root, capture_output=True, text=True)
+
+    def test_shard_processes_merge_into_the_same_site(self):
+        # Every shard in its own process, all at once, like separate machines would
+        shards = [subprocess.Popen([sys.executable, MAIN, "/site/", "--shard", f"{index}/3", "--no-cache"],
+                                   cwd=self.root, stdout=subprocess.DEVNULL)
+                  for index in (1, 2, 3)]
+        self.assertEqual([shard.wait() for shard in shards], [0, 0, 0])
+        merged = self.run_main("merge")
+        self.assertEqual(merged.returncode, 0, merged.stderr)
+        self.assertIn("🧩 Merged 3 shard(s): 13 page(s) copied", merged.stdout)
+
+        with redirect_stdout(io.StringIO()):
+            build_site("/site/", content_path=os.path.join(self.root, "content"),
+                       static_path=os.path.join(self.root, "static"),
+                       template_path=os.path.join(self.root, "template.html"),
+                       destination_path=os.path.join(self.root, "single"))
+        self.assertEqual(self.read_tree(os.path.join(self.root, "docs")), self.read_tree(os.path.join(self.root, "single")))
+
+        # The merged manifest keeps every page fresh for the next ordinary build
+        rebuilt = self.run_main("/site/", "--no-cache")
+        self.assertEqual(rebuilt.stdout.count("⏭️ Up to date"), 13)
+
+    def test_merge_refuses_incomplete_shards(self):
+        paths = {name: os.path.join(self.root, name) for name in ("content", "static", "template.html", "docs")}
+        with redirect_stdout(io.StringIO()):
+            for index in (1, 2):
+                build_site("/", content_path=paths["content"], static_path=paths["static"],
+                           template_path=paths["template.html"], destination_path=f"{paths['docs']}-shard-{index}-of-3",
+                           shard=(index, 3))
+            shard_paths = [f"{paths['docs']}-shard-{index}-of-3" for index in (1, 2)]
+            problems = merge_site(shard_paths, paths["content"], paths["static"], paths["template.html"], paths["docs"])
+        self.assertIn("Shard 3/3 is missing.", problems)
+        missing = [page for _, page in pages_in_shard(discover_pages(paths["content"], ""), paths["content"], 3, 3)]
+        self.assertEqual(len([problem for problem in problems if "not produced" in problem]), len(missing))
+        self.assertFalse(os.path.exists(paths["docs"]))
+
+    def test_shards_leave_static_files_to_the_merge(self):
+        with redirect_stdout(io.StringIO()):
+            build_site("/", content_path=os.path.join(self.root, "content"), static_path=os.path.join(self.root, "static"),
+                       template_path=os.path.join(self.root, "template.html"),
+                       destination_path=os.path.join(self.root, "shard"), shard=(1, 2))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "shard", "index.css")))
+
+
+if __name__ == "__main__":
+    unittest.main()
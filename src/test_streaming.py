@@ -0,0 +1,78 @@
+import io, os, unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import main
+from blocklexer import lex_lines
+from textsplit import markdown_to_html_node, write_blocks_html, lex_blocks
+from sitefixture import SiteTestCase
+
+
+class TestStreaming(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(self.template, '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+
+    def tearDown(self):
+        main.set_stream_threshold(main.STREAM_THRESHOLD)
+
+    def write_source(self, markdown):
+        return self.write("index.md", markdown)
+
+    def generate(self, source, name, threshold):
+        main.set_stream_threshold(threshold)
+        dest = os.path.join(self.root, name)
+        with redirect_stdout(io.StringIO()):
+            main.generate_page(source, self.template, dest, "/site/")
+        with open(dest, encoding='utf-8') as file:
+            return file.read()
+
+    def test_streamed_page_matches_regular_page(self):
+        source = self.write_source("# Title\n\nHello [home](/)\n\n```\na\n\nb\n```\n\n- x\n- **y**\n\n> quote\n")
+        self.assertEqual(self.generate(source, "streamed.html", 0),
+                         self.generate(source, "regular.html", main.STREAM_THRESHOLD))
+
+    def test_write_blocks_html_matches_tree(self):
+        md = "## Sub\n\npara _one_\n\n1. a\n2. b"
+        out = io.StringIO()
+        write_blocks_html(lex_blocks(md), out)
+        self.assertEqual(out.getvalue(), markdown_to_html_node(md).to_html())
+
+    def test_blocks_are_yielded_before_the_input_is_exhausted(self):
+        consumed = []
+        def lines():
+            for line in ["# Title", "", "first", "", "second"]:
+                consumed.append(line)
+                yield line
+        blocks = lex_lines(lines())
+        self.assertEqual(next(blocks).lines, ["# Title"])
+        self.assertEqual(consumed, ["# Title", ""])
+
+    def test_failed_stream_leaves_no_output(self):
+        source = self.write_source("# Title\n\nfine\n\nbroken `code")
+        dest = os.path.join(self.root, "broken.html")
+        main.set_stream_threshold(0)
+        with redirect_stdout(io.StringIO()), self.assertRaises(Exception):
+            main.generate_page(source, self.template, dest, "/")
+        self.assertFalse(os.path.exists(dest))
+        self.assertFalse(os.path.exists(dest + ".tmp"))
+
+    def test_failed_write_keeps_the_previous_page(self):
+        # The regular path swaps its output in too, so a render that dies halfway
+        # leaves the last good page rather than a truncated one
+        source = self.write_source("# Title\n\nfine")
+        previous = self.generate(source, "page.html", main.STREAM_THRESHOLD)
+        def write_half(out, *args):
+            out.write("<html><bo")
+            raise RuntimeError("render failed")
+        template = mock.Mock(write=write_half)
+        with mock.patch("main.load_template", return_value=template), redirect_stdout(io.StringIO()):
+            with self.assertRaises(RuntimeError):
+                main.generate_page(source, self.template, os.path.join(self.root, "page.html"), "/site/")
+        with open(os.path.join(self.root, "page.html"), encoding='utf-8') as file:
+            self.assertEqual(file.read(), previous)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "page.html.tmp")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import io, os, unittest
+from contextlib import redirect_stdout
+
+from main import sync_everything_from_to
+from manifest import BuildManifest
+from sitefixture import SiteTestCase
+
+
+class TestStaticSync(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(self.template, "{{ Content }}")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "tom.png"), "png bytes")
+
+    def sync(self, checksum=False):
+        manifest = BuildManifest.load(self.dest, self.template, "/")
+        with redirect_stdout(io.StringIO()):
+            counts = sync_everything_from_to(self.static, self.dest, manifest, checksum)
+            manifest.remove_stale_outputs()
+        manifest.save()
+        return counts
+
+    def test_second_sync_copies_nothing(self):
+        self.assertEqual(self.sync(), (2, 0))
+        self.assertEqual(self.sync(), (0, 2))
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        self.write(os.path.join(self.static, "index.css"), "body { color: red; }")
+        self.assertEqual(self.sync(), (1, 1))
+        with open(os.path.join(self.dest, "index.css"), encoding='utf-8') as file:
+            self.assertEqual(file.read(), "body { color: red; }")
+
+    def test_checksum_catches_same_size_edit_with_old_mtime(self):
+        self.sync()
+        css = os.path.join(self.static, "index.css")
+        stat = os.stat(css)
+        self.write(css, "main {}")
+        os.utime(css, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(self.sync(), (0, 2))
+        self.assertEqual(self.sync(checksum=True), (1, 1))
+
+    def test_removed_source_removes_output(self):
+        self.sync()
+        os.remove(os.path.join(self.static, "images", "tom.png"))
+        self.sync()
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.css")))
+
+    def test_first_build_removes_leftovers_only(self):
+        self.write(os.path.join(self.dest, "old.html"), "leftover")
+        self.sync()
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "old.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "images", "tom.png")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import io, os, tempfile, unittest
+
+from htmlnode import LeafNode, ParentNode
+
+from template import Template, load_template, minify_html
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render_fills_slots(self):
+        template = Template("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        self.assertEqual(
+            template.render("Hello", "<p>World</p>"),
+            "<title>Hello</title><article><p>World</p></article>",
+        )
+
+    def test_basepath_applied_to_urls(self):
+        text = '<link href="/index.css" /><h1>{{ Title }}</h1>{{ Content }}<img src="/logo.png">'
+        template = Template(text, "/site/")
+        content = ParentNode("p", [
+            LeafNode("a", "Blog", {"href": "/blog"}),
+            LeafNode("img", "", {"src": "/images/tom.png", "alt": "tom"}),
+        ])
+        self.assertEqual(
+            template.render("Tom", template.render_content(content)),
+            '<link href="/site/index.css" /><h1>Tom</h1><p><a href="/site/blog">Blog</a>'
+            '<img src="/site/images/tom.png" alt="tom"></img></p><img src="/site/logo.png">',
+        )
+
+    def test_basepath_leaves_text_and_other_urls_alone(self):
+        template = Template("{{ Content }}", "/site/")
+        content = ParentNode("div", [
+            ParentNode("pre", [ParentNode("code", [LeafNode(None, '<a href="/x">')])]),
+            LeafNode("a", "cdn", {"href": "//cdn.example.com/a.js"}),
+            LeafNode("a", "ext", {"href": "https://example.com/"}),
+        ])
+        self.assertEqual(
+            template.render_content(content),
+            '<div><pre><code><a href="/x"></code></pre><a href="//cdn.example.com/a.js">cdn</a>'
+            '<a href="https://example.com/">ext</a></div>',
+        )
+
+    def test_repeated_slots(self):
+        template = Template("{{ Title }}|{{ Title }}|{{ Content }}")
+        self.assertEqual(template.render("a", "b"), "a|a|b")
+
+    def test_unknown_placeholder_left_alone(self):
+        template = Template("{{ Footer }}{{ Content }}")
+        self.assertEqual(template.render("t", "c"), "{{ Footer }}c")
+
+    def test_write_streams_same_html_as_render(self):
+        template = Template('<link href="/index.css">{{ Title }}<main>{{ Content }}</main>', "/site/")
+        node = ParentNode("p", [LeafNode("a", "Home", {"href": "/"}), LeafNode("img", "", {"src": "/tom.png"})])
+        buffer = io.StringIO()
+        template.write(buffer, "Tom", node)
+        self.assertEqual(buffer.getvalue(), template.render("Tom", template.render_content(node)))
+
+    def test_load_template_reads_once_and_reloads_on_change(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "template.html")
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write("{{ Content }}")
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write("<main>{{ Content }}</main>")
+            self.assertEqual(load_template(path).render("t", "c"), "<main>c</main>")
+
+
+class TestMinify(unittest.TestCase):
+    def test_indentation_between_tags_is_dropped(self):
+        html = "<html>\n  <head>\n    <title>A  title</title>\n  </head>\n  <!-- note -->\n  <body>x</body>\n</html>\n"
+        self.assertEqual(minify_html(html), "<html><head><title>A title</title></head><body>x</body></html>")
+
+    def test_inline_spaces_are_kept_as_one(self):
+        self.assertEqual(minify_html("<p><b>a</b>   <i>b</i></p>"), "<p><b>a</b> <i>b</i></p>")
+
+    def test_line_breaks_between_inline_tags_keep_a_space(self):
+        self.assertEqual(minify_html("<a>x</a>\n<a>y</a>"), "<a>x</a> <a>y</a>")
+        # Only a run with a block-level tag on both sides goes away
+        self.assertEqual(minify_html("<ul>\n  <li>\n    <a>x</a>\n    <!-- gap -->\n    <img src=\"y\">\n  </li>\n</ul>"),
+                         '<ul><li> <a>x</a> <img src="y"> </li></ul>')
+
+    def test_whitespace_sensitive_elements_are_untouched(self):
+        html = "<div>\n  <pre>\n  keep   this\n</pre>\n  <script>\n var  x;\n</script>\n</div>"
+        self.assertEqual(minify_html(html), "<div><pre>\n  keep   this\n</pre><script>\n var  x;\n</script></div>")
+
+    def test_template_minifies_once_and_content_as_it_is_written(self):
+        template = Template("<body>\n  <article>{{ Content }}</article>\n</body>\n", minify=True)
+        self.assertEqual(template.parts, ["<body><article>", None, "</article></body>"])
+        node = ParentNode("div", [ParentNode("p", [LeafNode(None, "a   b")]),
+                                  ParentNode("pre", [LeafNode("code", "x  =  1\n")])])
+        buffer = io.StringIO()
+        template.write(buffer, "t", node)
+        self.assertEqual(buffer.getvalue(),
+                         "<body><article><div><p>a b</p><pre><code>x  =  1\n</code></pre></div></article></body>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -24,8 +24,12 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("Same text", TextType.ITALIC)
         self.assertNotEqual(node1, node2)
 
-    
-        
+    def test_repr(self):
+        node = TextNode("Same text", TextType.LINK, "https://example.com")
+        self.assertEqual(repr(node), "TextNode(Same text, link, https://example.com)")
+
+    def test_slotted(self):
+        self.assertFalse(hasattr(TextNode("x", TextType.TEXT), "__dict__"))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+import io, os, pickle, threading, unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from main import build_site, parse_page
+from textsplit import markdown_to_html_node
+from treecache import TreeCache, decode_node, encode_node, set_tree_cache
+from sitefixture import SiteTestCase
+
+MARKDOWN = """# Title
+
+Some **bold** and [a link](/x) and ![img](/i.png)
+
+- one
+- two
+
+```
+code
+```
+"""
+
+
+class TestTreeCache(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = TreeCache(os.path.join(self.root, "cache"))
+
+    def test_encode_round_trip(self):
+        node = markdown_to_html_node(MARKDOWN)
+        copy = decode_node(encode_node(node))
+        self.assertEqual(copy.to_html(), node.to_html())
+        self.assertEqual(repr(copy), repr(node))
+
+    def test_put_and_get(self):
+        key = self.cache.key(MARKDOWN, "scan")
+        self.assertIsNone(self.cache.get(key))
+        node = markdown_to_html_node(MARKDOWN)
+        self.cache.put(key, "Title", node)
+        title, cached = self.cache.get(key)
+        self.assertEqual(title, "Title")
+        self.assertEqual(cached.to_html(), node.to_html())
+
+    def test_key_depends_on_source_and_parser(self):
+        self.assertNotEqual(self.cache.key(MARKDOWN, "scan"), self.cache.key(MARKDOWN + "!", "scan"))
+        self.assertNotEqual(self.cache.key(MARKDOWN, "scan"), self.cache.key(MARKDOWN, "passes"))
+
+    def test_key_depends_on_generator_version(self):
+        # A renderer change only bumps GENERATOR_VERSION, and trees from the old renderer mustn't be served
+        key = self.cache.key(MARKDOWN, "scan")
+        with mock.patch("treecache.GENERATOR_VERSION", "next"):
+            self.assertNotEqual(self.cache.key(MARKDOWN, "scan"), key)
+
+    def test_concurrent_puts_of_one_key(self):
+        # Preview threads rendering the same new page all write its entry at once
+        key = self.cache.key(MARKDOWN, "scan")
+        node = markdown_to_html_node(MARKDOWN)
+        start, errors = threading.Barrier(8), []
+        def put():
+            start.wait()
+            try:
+                for _ in range(20):
+                    self.cache.put(key, "Title", node)
+            except Exception as error:
+                errors.append(error)
+        threads = [threading.Thread(target=put) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.cache.get(key)[1].to_html(), node.to_html())
+        self.assertEqual(os.listdir(os.path.dirname(self.cache.path(key))), [os.path.basename(self.cache.path(key))])
+
+    def test_corrupt_entry_is_a_miss(self):
+        key = self.cache.key(MARKDOWN, "scan")
+        os.makedirs(os.path.dirname(self.cache.path(key)))
+        with open(self.cache.path(key), 'wb') as file:
+            file.write(b"\x00garbage")
+        self.assertIsNone(self.cache.get(key))
+
+    def test_memory_keeps_recent_entries_decoded(self):
+        cache = TreeCache(self.cache.cache_dir, memory_entries=1)
+        node = markdown_to_html_node(MARKDOWN)
+        cache.put(cache.key(MARKDOWN, "scan"), "Title", node)
+        self.assertIs(cache.get(cache.key(MARKDOWN, "scan"))[1], node)
+        cache.put(cache.key("# Other", "scan"), "Other", markdown_to_html_node("# Other"))
+        # Pushed out of memory, but still on disk
+        self.assertIsNot(cache.get(cache.key(MARKDOWN, "scan"))[1], node)
+        self.assertEqual(pickle.loads(pickle.dumps(cache))._memory, {})
+
+    def test_prune_evicts_least_recently_used(self):
+        keys = [self.cache.key(f"# Page {index}", "scan") for index in range(3)]
+        for age, key in enumerate(keys):
+            self.cache.put(key, "t", markdown_to_html_node(f"# Page {age}"))
+            os.utime(self.cache.path(key), ns=(age * 10**9, age * 10**9))
+        # Reading the oldest entry makes it the most recently used one
+        self.cache.get(keys[0])
+
+        entry_size = os.path.getsize(self.cache.path(keys[1]))
+        self.cache.max_bytes = entry_size * 2
+        self.assertEqual(self.cache.prune(), (2, entry_size * 2, 1))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[0]))
+
+
+class TestParsePage(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        set_tree_cache(TreeCache(self.root))
+        self.addCleanup(set_tree_cache, None)
+
+    def test_second_parse_comes_from_the_cache(self):
+        node, title = parse_page(MARKDOWN)
+        with mock.patch("main.markdown_to_html_node") as parse:
+            cached_node, cached_title = parse_page(MARKDOWN)
+        parse.assert_not_called()
+        self.assertEqual((cached_node.to_html(), cached_title), (node.to_html(), title))
+
+    def test_template_change_skips_parsing(self):
+        self.write(os.path.join(self.content, "index.md"), MARKDOWN)
+
+        def build(template):
+            self.write(self.template, template)
+            with redirect_stdout(io.StringIO()):
+                build_site(content_path=self.content, static_path=self.static, template_path=self.template,
+                           destination_path=self.dest, tree_cache=TreeCache(os.path.join(self.root, "cache")))
+
+        build("{{ Content }}")
+        with mock.patch("main.markdown_to_html_node") as parse:
+            build("<main>{{ Content }}</main>")
+        parse.assert_not_called()
+        self.assertTrue(self.read_output("index.html").startswith("<main><div><h1>Title</h1>"))
+
+
+if __name__ == "__main__":
+    unittest.main()
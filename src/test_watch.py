@@ -0,0 +1,139 @@
+import importlib.util, io, os, threading, unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+
+import main
+from main import parse_args
+from template import set_critical_css, set_minify
+from textsplit import STREAM_THRESHOLD, set_stream_threshold
+from watch import SiteWatcher, ReloadBroadcaster, inject_reload_script, RELOAD_SCRIPT
+from sitefixture import SiteTestCase
+
+
+class WatcherTestCase(SiteTestCase):
+    TEMPLATE = "<main>{{ Content }}</main>"
+    CSS = "body {}"
+    BUILD_OPTIONS = None
+
+    def setUp(self):
+        super().setUp()
+        self.write(self.template, self.TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nPosts")
+        self.write(os.path.join(self.static, "index.css"), self.CSS)
+        self.watcher = SiteWatcher(content_path=self.content, static_path=self.static, template_path=self.template,
+                                   destination_path=self.dest, build_options=self.BUILD_OPTIONS)
+        with redirect_stdout(io.StringIO()):
+            self.watcher.full_build()
+
+    def poll(self):
+        log = io.StringIO()
+        with redirect_stdout(log):
+            rebuilt = self.watcher.poll()
+        return rebuilt, log.getvalue()
+
+
+class TestSiteWatcher(WatcherTestCase):
+    def test_nothing_changed(self):
+        self.assertEqual(self.poll(), (False, ""))
+
+    def test_only_edited_page_is_rebuilt(self):
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nNew post!")
+        rebuilt, log = self.poll()
+        self.assertTrue(rebuilt)
+        self.assertIn("New post!", self.read_output("blog", "index.html"))
+        self.assertEqual(log.count("Generating page"), 1)
+
+    def test_template_change_rebuilds_all_pages(self):
+        self.write(self.template, "<article>{{ Content }}</article>")
+        _, log = self.poll()
+        self.assertEqual(log.count("Generating page"), 2)
+        self.assertTrue(self.read_output("index.html").startswith("<article>"))
+
+    def test_asset_change_and_removal(self):
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0; }")
+        self.poll()
+        self.assertEqual(self.read_output("index.css"), "body { margin: 0; }")
+        os.remove(os.path.join(self.static, "index.css"))
+        self.poll()
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "index.css")))
+
+    def test_broken_page_does_not_stop_watching(self):
+        self.write(os.path.join(self.content, "index.md"), "no title")
+        _, log = self.poll()
+        self.assertIn("Failed to generate", log)
+        self.write(os.path.join(self.content, "index.md"), "# Fixed")
+        self.poll()
+        self.assertIn("Fixed", self.read_output("index.html"))
+
+
+class TestWatchBuildOptions(WatcherTestCase):
+    TEMPLATE = '<link rel="stylesheet" href="/index.css">{{ Content }}'
+    CSS = "h1 { color: red; }"
+    BUILD_OPTIONS = {"minify": True, "critical_css": True}
+
+    def setUp(self):
+        self.addCleanup(set_minify, False)
+        self.addCleanup(set_critical_css, None)
+        super().setUp()
+
+    def test_rebuilds_keep_the_build_options(self):
+        self.assertIn("h1{color: red}", self.read_output("index.html"))
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nEdited   page")
+        self.poll()
+        page = self.read_output("index.html")
+        self.assertIn("Edited page", page)
+        self.assertIn("h1{color: red}", page)
+
+    def test_stylesheet_change_refreshes_critical_css(self):
+        self.write(os.path.join(self.static, "index.css"), "h1 { color: blue; }")
+        _, log = self.poll()
+        self.assertIn("Critical CSS", log)
+        self.assertIn("h1{color: blue}", self.read_output("index.html"))
+
+
+class TestWatchStreaming(WatcherTestCase):
+    def test_stream_flag_reaches_rebuilds(self):
+        # `python main.py --watch --stream` sets the threshold in the script's own copy
+        # of main, while watch.py builds through the imported one
+        self.addCleanup(set_stream_threshold, STREAM_THRESHOLD)
+        spec = importlib.util.spec_from_file_location("script_main", main.__file__)
+        script_main = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(script_main)
+        script_main.set_stream_threshold(0)
+
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nStreamed")
+        with mock.patch("main.generate_page_streaming", wraps=main.generate_page_streaming) as streamed:
+            self.poll()
+        streamed.assert_called_once()
+        self.assertIn("Streamed", self.read_output("index.html"))
+
+
+class TestWatchArguments(unittest.TestCase):
+    def test_unsupported_flags_are_refused(self):
+        for flag in ("--fingerprint", "--precompress", "--profile", "--clean"):
+            with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+                parse_args(["--watch", flag])
+
+    def test_build_flags_are_accepted(self):
+        args = parse_args(["--watch", "--minify", "--critical-css", "-j", "2", "--inline-parser", "spans", "--stream"])
+        self.assertTrue(args.minify and args.critical_css and args.stream)
+
+
+class TestLiveReload(unittest.TestCase):
+    def test_inject_before_body_end(self):
+        self.assertEqual(inject_reload_script("<body>x</body>"), f"<body>x{RELOAD_SCRIPT}</body>")
+        self.assertEqual(inject_reload_script("x"), "x" + RELOAD_SCRIPT)
+
+    def test_broadcaster_wakes_waiters(self):
+        broadcaster = ReloadBroadcaster()
+        seen = []
+        waiter = threading.Thread(target=lambda: seen.append(broadcaster.wait(0, timeout=5)))
+        waiter.start()
+        broadcaster.notify()
+        waiter.join()
+        self.assertEqual(seen, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
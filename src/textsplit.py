@@ -1,5 +1,8 @@
+import functools
 from textnode import *
 from htmlnode import *
+from profiler import current_tracer, now_us
+from blocklexer import lex_blocks, lex_lines
 
 
 # old_notes = list
@@ -40,82 +43,38 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
     return results
 
 def split_nodes_image(old_nodes):
-    result = []
-    for old_node in old_nodes:
-        if old_node.text_type != TextType.TEXT:
-            result.append(old_node)
-            continue
-        
-        images = extract_markdown_images(old_node.text)
-        
-        if not images:
-            result.append(old_node)
-            continue
-        
-        remaining_text = old_node.text
-
-        for image_alt, path in images:
-            markdown_image = f"![{image_alt}]({path})"
-            
-            parts = remaining_text.split(markdown_image, 1)
-            
-            if parts[0]:
-                result.append(TextNode(parts[0], TextType.TEXT))
-            
-            result.append(TextNode(image_alt, TextType.IMAGE, path))
-            
-            if len(parts) > 1:
-                remaining_text = parts[1]
-            else:
-                remaining_text = ""
-        
-        if remaining_text:
-            result.append(TextNode(remaining_text, TextType.TEXT))
-        
-    return result
-
-
-
-
+    return split_nodes_bracketed(old_nodes, iter_markdown_images, TextType.IMAGE)
 
 def split_nodes_link(old_nodes):
+    return split_nodes_bracketed(old_nodes, iter_markdown_links, TextType.LINK)
+
+def split_nodes_bracketed(old_nodes, iter_matches, text_type):
+    # Cut the text at the positions of the matches themselves, rather than splitting the
+    # rest of the text again for every one of them (quadratic with many links per paragraph)
     result = []
     for old_node in old_nodes:
         if old_node.text_type != TextType.TEXT:
             result.append(old_node)
             continue
-        
-        links = extract_markdown_links(old_node.text)
 
-        if not links:
+        text = old_node.text
+        position = 0
+        for start, end, label_start, label_end, url_start, url_end in iter_matches(text):
+            if start > position:
+                result.append(TextNode(text[position:start], TextType.TEXT))
+            result.append(TextNode(text[label_start:label_end], text_type, text[url_start:url_end]))
+            position = end
+
+        if position == 0:
             result.append(old_node)
-            continue
-        
-        remaining_text = old_node.text
+        elif position < len(text):
+            result.append(TextNode(text[position:], TextType.TEXT))
 
-        for link_text, url in links:
-            markdown_link = f"[{link_text}]({url})"
-            
-            parts = remaining_text.split(markdown_link, 1)
-            
-            if parts[0]:
-                result.append(TextNode(parts[0], TextType.TEXT))
-            
-            result.append(TextNode(link_text, TextType.LINK, url))
-            
-            if len(parts) > 1:
-                remaining_text = parts[1]
-            else:
-                remaining_text = ""
-        
-        if remaining_text:
-            result.append(TextNode(remaining_text, TextType.TEXT))
-        
     return result
 
 
 
-def text_to_textnodes(text):
+def text_to_textnodes_passes(text):
     nodes = [TextNode(text, TextType.TEXT)]
 
     nodes = split_nodes_image(nodes)
@@ -128,6 +87,120 @@ def text_to_textnodes(text):
     #     print(node)
     return nodes
 
+# Inline delimiters from strongest to weakest, the same order text_to_textnodes_passes splits them in
+INLINE_DELIMITERS = (("`", TextType.CODE), ("**", TextType.BOLD), ("_", TextType.ITALIC))
+
+# SpanNode token kind for each delimiter of INLINE_DELIMITERS
+DELIMITER_SPAN_KINDS = (SPAN_CODE, SPAN_BOLD, SPAN_ITALIC)
+SPAN_TEXT_TYPES = (TextType.TEXT, TextType.BOLD, TextType.ITALIC, TextType.CODE, TextType.LINK, TextType.IMAGE)
+
+def scan_inline(text, add):
+    # One left-to-right walk over the text that finds the same tokens as
+    # text_to_textnodes_passes, without building a new node list per pass.
+    # Images win over links, links over code, code over bold, bold over italic,
+    # so every lookahead is bounded by the next stronger token. Each token is
+    # handed to add(kind, start, end[, url_start, url_end]) as it is found, so
+    # the scan parser and scan_spans share the walk but not a middle format.
+    errors = []
+    position = 0
+    length = len(text)
+
+    while position < length:
+        image = find_markdown_image(text, position)
+        image_start = image[0] if image else length
+
+        # Links can only match inside the stretch before the next image
+        while True:
+            link = find_markdown_link(text, position, image_start)
+            if link is None:
+                break
+            scan_delimited(text, position, link[0], add, errors)
+            add(SPAN_LINK, *link[2:])
+            position = link[1]
+
+        scan_delimited(text, position, image_start, add, errors)
+        if image is None:
+            break
+        add(SPAN_IMAGE, *image[2:])
+        position = image[1]
+
+    if errors:
+        # Report the same delimiter the pass-based splitter would have tripped over first
+        raise Exception(f"No closing delimiter '{INLINE_DELIMITERS[min(errors)][0]}' found")
+
+def scan_delimited(text, start, end, add, errors, level=0):
+    # Hand over the tokens for text[start:end], pairing the delimiter of this level and
+    # passing the stretches between pairs down to the next (weaker) delimiter
+    if start >= end:
+        return
+    if level == len(INLINE_DELIMITERS):
+        add(SPAN_TEXT, start, end)
+        return
+
+    delimiter = INLINE_DELIMITERS[level][0]
+    width = len(delimiter)
+    position = start
+    while True:
+        opening = text.find(delimiter, position, end)
+        if opening == -1:
+            break
+        closing = text.find(delimiter, opening + width, end)
+        if closing == -1:
+            errors.append(level)
+            return
+
+        scan_delimited(text, position, opening, add, errors, level + 1)
+        if closing > opening + width:
+            add(DELIMITER_SPAN_KINDS[level], opening + width, closing)
+        position = closing + width
+
+    scan_delimited(text, position, end, add, errors, level + 1)
+
+def text_to_textnodes_scan(text):
+    # scan_inline slicing out a TextNode per token as it goes
+    if not text:
+        return [TextNode(text, TextType.TEXT)]
+    nodes = []
+    append = nodes.append
+
+    def add(kind, start, end, url_start=0, url_end=0):
+        append(TextNode(text[start:end], SPAN_TEXT_TYPES[kind], text[url_start:url_end] if kind >= SPAN_LINK else None))
+
+    scan_inline(text, add)
+    return nodes
+
+def scan_spans(text):
+    # scan_inline recording (kind, start, end, url_start, url_end) into a SpanNode
+    # instead of slicing out a TextNode per token
+    spans = SpanNode(text)
+    if not text:
+        spans.add(SPAN_TEXT, 0, 0)
+        return spans
+    scan_inline(text, spans.add)
+    return spans
+
+# The "spans" parser walks the text the same way, it just keeps the SpanNode (see render_inline)
+text_to_textnodes_spans = text_to_textnodes_scan
+
+INLINE_PARSERS = {
+    "scan": text_to_textnodes_scan,
+    "passes": text_to_textnodes_passes,
+    "spans": text_to_textnodes_spans,
+}
+inline_parser = "scan"
+
+def set_inline_parser(name):
+    global inline_parser
+    if name not in INLINE_PARSERS:
+        raise ValueError(f"🚨 Unknown inline parser '{name}', pick one of {sorted(INLINE_PARSERS)}")
+    inline_parser = name
+
+def get_inline_parser():
+    return inline_parser
+
+def text_to_textnodes(text):
+    return INLINE_PARSERS[inline_parser](text)
+
 def markdown_to_blocks(markdown):
     # Split the string into lines
     lines = markdown.split('\n')
@@ -155,155 +228,234 @@ def markdown_to_blocks(markdown):
     return blocks
 
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
     parent_node = HTMLNode(tag="div", children=[])
-    
-    for block in blocks:
-        block_type = block_to_block_type(block)
 
-        if block_type.value == "paragraph":
-            # Create the paragraph node
-            paragraph_node = HTMLNode(tag="p", children=[])
+    # The lexer hands over each block already typed and split into lines
+    for block in lex_blocks(markdown):
+        parent_node.children.extend(block_to_html_nodes(block))
 
-            # Replace newlines with spaces and normalize whitespace
+    return parent_node
 
-            normalized_text = re.sub(r'\s+', ' ', block.replace('\n', ' ')).strip()
+# Pages at least this big are parsed and written block by block instead of all at once.
+# It lives here rather than in main.py so that `python main.py --watch` (whose watch.py
+# imports a second copy of main) and the build share the one setting.
+STREAM_THRESHOLD = 8 * 1024 * 1024
+stream_threshold = STREAM_THRESHOLD
 
-            # Process the paragraph text and assign the children
-            paragraph_node.children = text_to_children(normalized_text)
+def set_stream_threshold(size):
+    global stream_threshold
+    stream_threshold = size
 
-            # Add the paragraph node to the parent
-            parent_node.children.append(paragraph_node)
+def get_stream_threshold():
+    return stream_threshold
 
-        elif block_type.value == "heading":
-            # Split the block into lines to handle multiple headings
-            lines = block.split("\n")
-            for line in lines:
-                if line.strip():  # Only process non-empty lines
-                    heading_match = re.match(r'^(#+)', line)
-                    if heading_match:
-                        heading_level = len(heading_match.group(1))
-                        
-                        # Create the heading node
-                        heading_node = HTMLNode(tag=f"h{heading_level}", children=[])
+def write_blocks_html(blocks, out, resolve_url=None, image_size=None, minify=False):
+    # Streaming twin of markdown_to_html_node(...).to_html(): each block is turned into
+    # nodes and written out before the next one is lexed, so memory stays flat
+    out.write("<div>")
+    for block in blocks:
+        for node in block_to_html_nodes(block):
+            write_html(node, out, resolve_url, image_size, minify)
+    out.write("</div>")
+
+def block_to_html_nodes(block):
+    # The HTML nodes for one lexed block (a heading block can hold several headings)
+    tracer = current_tracer()
+    if tracer is not None:
+        tracer.count("blocks")
+    block_type = block.block_type
+    nodes = []
+
+    if block_type.value == "paragraph":
+        # Create the paragraph node
+        paragraph_node = HTMLNode(tag="p", children=[])
+
+        # Replace newlines with spaces and normalize whitespace
+
+        normalized_text = re.sub(r'\s+', ' ', " ".join(block.lines)).strip()
+
+        # Process the paragraph text and assign the children
+        paragraph_node.children = text_to_children(normalized_text)
+
+        # Add the paragraph node to the parent
+        nodes.append(paragraph_node)
+
+    elif block_type.value == "heading":
+        # Each line of the block can be its own heading
+        for line in block.lines:
+            if line.strip():  # Only process non-empty lines
+                heading_match = re.match(r'^(#+)', line)
+                if heading_match:
+                    heading_level = len(heading_match.group(1))
+                    
+                    # Create the heading node
+                    heading_node = HTMLNode(tag=f"h{heading_level}", children=[])
 
-                        # Remove the heading markers and any leading/trailing whitespaces
-                        heading_text = line[heading_level:].strip()
+                    # Remove the heading markers and any leading/trailing whitespaces
+                    heading_text = line[heading_level:].strip()
 
-                        # Process the heading text and assign the children
-                        heading_node.children = text_to_children(heading_text)
+                    # Process the heading text and assign the children
+                    heading_node.children = text_to_children(heading_text)
 
-                        # Add the heading node to the parent
-                        parent_node.children.append(heading_node)
+                    # Add the heading node to the parent
+                    nodes.append(heading_node)
 
-        elif block_type.value == "code":
-            # Create the code node structure: pre > code
-            code_node = HTMLNode(tag="code", children=[])
-            pre_node = HTMLNode(tag="pre", children=[code_node])
-            
-            # Extract the code content from the block
-            code_content = block.strip()
-            if code_content.startswith("```") and code_content.endswith("```"):
-                code_content = code_content[3:-3]
+    elif block_type.value == "code":
+        # Create the code node structure: pre > code
+        code_node = HTMLNode(tag="code", children=[])
+        pre_node = HTMLNode(tag="pre", children=[code_node])
+        
+        # Extract the code content from the block
+        code_content = block.text.strip()
+        if code_content.startswith("```") and code_content.endswith("```"):
+            code_content = code_content[3:-3]
 
-            # To make sure the code content has a trailing newline
-            code_content = code_content.lstrip("\n")
+        # To make sure the code content has a trailing newline
+        code_content = code_content.lstrip("\n")
 
-            # Ensure exactly one trailing newline
-            code_content = code_content.rstrip("\n") + "\n"
+        # Ensure exactly one trailing newline
+        code_content = code_content.rstrip("\n") + "\n"
 
-            # Create a text node with type "text" to avoid inline markdown processing
-            text_node = TextNode(code_content, TextType.TEXT)
+        # Create a text node with type "text" to avoid inline markdown processing
+        text_node = TextNode(code_content, TextType.TEXT)
 
-            # Convert to HTML node and add as child to code_node
-            code_node.children.append(text_node_to_html_node(text_node))
+        # Convert to HTML node and add as child to code_node
+        code_node.children.append(text_node_to_html_node(text_node))
 
-            # Add pre_node to parent
-            parent_node.children.append(pre_node)
-            
+        # Add pre_node to parent
+        nodes.append(pre_node)
         
-        elif block_type.value == "quote":
-            # Remove the '>' marker from each line and join them
-            quote_lines = [line.lstrip('>').strip() for line in block.split('\n')]
-            quote_content = '\n'.join(quote_lines).strip()
+    
+    elif block_type.value == "quote":
+        # Remove the '>' marker from each line and join them
+        quote_lines = [line.lstrip('>').strip() for line in block.lines]
+        quote_content = '\n'.join(quote_lines).strip()
 
-            # Create the blockquote node
-            blockquote_node = HTMLNode(tag="blockquote", children=[])
+        # Create the blockquote node
+        blockquote_node = HTMLNode(tag="blockquote", children=[])
 
-            # Process the quote content and assign children
-            blockquote_node.children = text_to_children(quote_content)
+        # Process the quote content and assign children
+        blockquote_node.children = text_to_children(quote_content)
 
-            #Add to parent
-            parent_node.children.append(blockquote_node)
-            
-        elif block_type.value == "unordered_list":
-            # Create the ul node
-            ul_node = HTMLNode(tag="ul", children=[])
-            
-            # Split the block into lines (list items)
-            list_items = block.split("\n")
+        #Add to parent
+        nodes.append(blockquote_node)
+        
+    elif block_type.value == "unordered_list":
+        # Create the ul node
+        ul_node = HTMLNode(tag="ul", children=[])
+        
+        # Each line is a list item
+        list_items = block.lines
 
-            # Process each list item
-            for item in list_items:
-                if item.strip():
-                    # Remove the '- ' prefix and trim
-                    item_text = item.strip().lstrip('-').strip()
+        # Process each list item
+        for item in list_items:
+            if item.strip():
+                # Remove the '- ' prefix and trim
+                item_text = item.strip().lstrip('-').strip()
 
-                    # Create a list item node
-                    li_node = HTMLNode(tag="li", children=[])
+                # Create a list item node
+                li_node = HTMLNode(tag="li", children=[])
 
-                    # Process inline formatting for the item text
-                    li_node.children = text_to_children(item_text)
+                # Process inline formatting for the item text
+                li_node.children = text_to_children(item_text)
 
-                    # Add the list item to the unordered list
-                    ul_node.children.append(li_node)
-            
-            # Add the list item to the unordered list
-            parent_node.children.append(ul_node)
+                # Add the list item to the unordered list
+                ul_node.children.append(li_node)
+        
+        # Add the list item to the unordered list
+        nodes.append(ul_node)
 
-        elif block_type.value == "ordered_list":
-            # Create the ol node
-            ol_node = HTMLNode(tag="ol", children=[])
-            
-            # Split the block into lines (list items)
-            list_items = block.split("\n")
+    elif block_type.value == "ordered_list":
+        # Create the ol node
+        ol_node = HTMLNode(tag="ol", children=[])
+        
+        # Each line is a list item
+        list_items = block.lines
 
-            # Process each list item
-            for item in list_items:
-                if item.strip(): #Skip empty lines
-                    # Remove the number prefix using regex
-                    item_text = re.sub(r'^\d+\.\s*', '', item.strip())
+        # Process each list item
+        for item in list_items:
+            if item.strip(): #Skip empty lines
+                # Remove the number prefix using regex
+                item_text = re.sub(r'^\d+\.\s*', '', item.strip())
 
-                    # Create a list item node
-                    li_node = HTMLNode(tag="li", children=[])
+                # Create a list item node
+                li_node = HTMLNode(tag="li", children=[])
 
-                    # Process inline formatting for the item text
-                    li_node.children = text_to_children(item_text)
+                # Process inline formatting for the item text
+                li_node.children = text_to_children(item_text)
 
-                    # Add the list item to the unordered list
-                    ol_node.children.append(li_node)
-            
-            # Add the list item to the unordered list
-            parent_node.children.append(ol_node)
+                # Add the list item to the unordered list
+                ol_node.children.append(li_node)
+        
+        # Add the list item to the unordered list
+        nodes.append(ol_node)
 
-    return parent_node
+    return nodes
 
         
 
         # if block_type == "paragraph":
 
 def text_to_children(text):
-    # Convert the text to a list of TextNodes (my function)
-    text_nodes = text_to_textnodes(text)
+    # Convert the text to a list of HTMLNodes, reusing the memo's nodes for text seen before
+    tracer = current_tracer()
+    if tracer is None:
+        if inline_memo is not None:
+            return list(inline_memo(text, inline_parser))
+        return list(render_inline(text, inline_parser))
+
+    # Far too many calls for one trace event each, so add them up per page instead
+    started = now_us()
+    if inline_memo is not None:
+        hits = inline_memo.cache_info().hits
+        html_nodes = list(inline_memo(text, inline_parser))
+        tracer.count("inline_memo_hits", inline_memo.cache_info().hits - hits)
+    else:
+        html_nodes = list(render_inline(text, inline_parser))
+    tracer.count("inline_us", now_us() - started)
+    # A SpanNode holds every token of its text, so count the tokens rather than the node
+    tracer.count("text_nodes", sum(len(node) if isinstance(node, SpanNode) else 1 for node in html_nodes))
+    return html_nodes
 
-    # Convert each TextNode to an HTMLNode
-    html_nodes = []
-    for text_node in text_nodes:
-        html_node = text_node_to_html_node(text_node)
-        html_nodes.append(html_node)
+def render_inline(text, parser_name):
+    # Convert the text to a list of TextNodes (my function), then each TextNode to an HTMLNode.
+    # A tuple, since the memo hands the same result to every page with this text.
+    if parser_name == "spans":
+        # All the tokens stay in one SpanNode, sliced only when it's written
+        return (scan_spans(text),)
+    return tuple(text_node_to_html_node(text_node) for text_node in INLINE_PARSERS[parser_name](text))
+
+
+# The same strings (list items, headings, captions, boilerplate) come up again and again,
+# so the nodes for recent inline texts are kept around. Nothing changes a node once it is
+# built, so pages can share them. Each worker process has a memo of its own.
+INLINE_MEMO_SIZE = 8192
+inline_memo = None
+# Hits and misses that worker processes reported back
+inline_memo_worker_counts = [0, 0]
+
+def set_inline_memo_size(size):
+    global inline_memo
+    inline_memo = functools.lru_cache(maxsize=size)(render_inline) if size > 0 else None
+    inline_memo_worker_counts[:] = [0, 0]
+
+def get_inline_memo_size():
+    return inline_memo.cache_parameters()["maxsize"] if inline_memo is not None else 0
+
+def add_inline_memo_stats(hits, misses):
+    inline_memo_worker_counts[0] += hits
+    inline_memo_worker_counts[1] += misses
+
+def inline_memo_stats():
+    # (hits, misses) of this process's memo plus whatever workers reported
+    hits, misses = inline_memo_worker_counts
+    if inline_memo is not None:
+        info = inline_memo.cache_info()
+        hits, misses = hits + info.hits, misses + info.misses
+    return hits, misses
+
+set_inline_memo_size(INLINE_MEMO_SIZE)
 
-    return html_nodes
-    
 # markdown_text ="- This is the first list item in a list block\n\n- This is a list item\n\n- This is another list item"
 
 # print(markdown_to_html_node(markdown_text))
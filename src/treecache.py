@@ -0,0 +1,204 @@
+import hashlib, marshal, os, tempfile
+from array import array
+from collections import OrderedDict
+
+from htmlnode import EMPTY_PROPS, HTMLNode, LeafNode, ParentNode, SpanNode, intern_tag
+from manifest import GENERATOR_VERSION
+
+# Bump whenever the encoding of cached trees changes. A renderer change bumps
+# manifest.GENERATOR_VERSION, which is part of every key too.
+TREE_FORMAT_VERSION = "1"
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+
+# The cache pages are parsed through in this process, None when it is off (--no-cache)
+_tree_cache = None
+
+
+def set_tree_cache(tree_cache):
+    global _tree_cache
+    _tree_cache = tree_cache
+
+def get_tree_cache():
+    return _tree_cache
+
+
+def encode_node(node):
+    # Flatten a tree into a preorder list that marshal dumps and loads very quickly:
+    #   "text"                                  a plain text leaf (most of any page)
+    #   (tag, value, props)                     any other leaf
+    #   (plain, tag, value, props, children)    a ParentNode, or an HTMLNode when plain is
+    #                                           True; children is how many items below are
+    #                                           its children, -1 for None
+    #   (text, kinds, starts, ends, url_starts, url_ends)
+    #                                           a SpanNode, its arrays as bytes
+    flat = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        node_type = type(node)
+        if node_type is LeafNode:
+            if node.tag is None and not node.props:
+                flat.append(node.value)
+            else:
+                flat.append((node.tag, node.value, tuple(node.props.items()) if node.props else None))
+            continue
+        if node_type is SpanNode:
+            flat.append((node.text, node.kinds.tobytes(), node.starts.tobytes(), node.ends.tobytes(),
+                         node.url_starts.tobytes(), node.url_ends.tobytes()))
+            continue
+        if node_type is not ParentNode and node_type is not HTMLNode:
+            raise TypeError(f"Can't cache a {node_type.__name__}.")
+        props = tuple(node.props.items()) if node.props else None
+        children = node.children
+        flat.append((node_type is HTMLNode, node.tag, node.value, props, -1 if children is None else len(children)))
+        if children:
+            stack.extend(reversed(children))
+    return flat
+
+def decode_node(flat):
+    # Rebuild the tree. The slots are filled directly: __init__ would re-check and
+    # re-intern what was already checked when the page was first parsed.
+    new = object.__new__
+    root = None
+    # [node, how many children it still waits for]
+    open_parents = []
+    for item in flat:
+        if type(item) is str:
+            node = new(LeafNode)
+            node.tag, node.value, node.props, node.children = None, item, EMPTY_PROPS, None
+            waits_for = 0
+        elif len(item) == 3:
+            tag, value, props = item
+            node = new(LeafNode)
+            node.tag, node.value, node.children = intern_tag(tag), value, None
+            node.props = dict(props) if props else EMPTY_PROPS
+            waits_for = 0
+        elif len(item) == 6:
+            node = new(SpanNode)
+            node.tag, node.value, node.props, node.children = None, None, None, None
+            node.text = item[0]
+            node.kinds, node.starts, node.ends, node.url_starts, node.url_ends = (
+                array(typecode, data) for typecode, data in zip("biiii", item[1:]))
+            waits_for = 0
+        else:
+            plain, tag, value, props, waits_for = item
+            node = new(HTMLNode if plain else ParentNode)
+            node.tag, node.value = intern_tag(tag), value
+            node.props = dict(props) if props else None
+            node.children = [] if waits_for >= 0 else None
+
+        if open_parents:
+            parent = open_parents[-1]
+            parent[0].children.append(node)
+            parent[1] -= 1
+            while open_parents and open_parents[-1][1] == 0:
+                open_parents.pop()
+        else:
+            root = node
+        if waits_for > 0:
+            open_parents.append([node, waits_for])
+    return root
+
+
+class TreeCache():
+    """Parsed pages on disk, one file per (markdown source, parser version).
+
+    Each file holds the page's title and its HTMLNode tree. A hit touches
+    the file's mtime, so after a build prune() can drop the least recently
+    used entries until the cache fits in max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_SIZE, memory_entries=0):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # How many recently used entries a long-lived process (serve-builds) also keeps
+        # decoded in memory. Rendering never changes a tree, so they can be handed out again.
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+
+    def key(self, source, parser_version):
+        digest = hashlib.sha256(f"{TREE_FORMAT_VERSION}:{GENERATOR_VERSION}:{parser_version}\0".encode('utf-8'))
+        digest.update(source.encode('utf-8'))
+        return digest.hexdigest()
+
+    def path(self, key):
+        # Fan out over subfolders, so no folder ends up with a huge listing
+        return os.path.join(self.cache_dir, key[:2], key[2:] + ".marshal")
+
+    def get(self, key):
+        # Returns (title, node) or None
+        remembered = self._memory.get(key)
+        if remembered is not None:
+            self._memory.move_to_end(key)
+            return remembered
+
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as file:
+                title, tree = marshal.load(file)
+            node = decode_node(tree)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError, TypeError):
+            # Half-written or from an incompatible Python: parse again and overwrite it
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._remember(key, title, node)
+        return title, node
+
+    def put(self, key, title, node):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Several workers, or preview threads, may write the same entry; each writes a
+        # file of its own and swaps it in
+        descriptor, temporary_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                marshal.dump((title, encode_node(node)), file)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        self._remember(key, title, node)
+
+    def _remember(self, key, title, node):
+        if self.memory_entries <= 0:
+            return
+        self._memory[key] = (title, node)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def __getstate__(self):
+        # Workers start with an empty memory rather than a pickled copy of ours
+        state = dict(self.__dict__)
+        state["_memory"] = OrderedDict()
+        return state
+
+    def prune(self):
+        # Evict least recently used entries beyond max_bytes. Returns (entries, bytes, evicted).
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        return len(entries) - evicted, total, evicted
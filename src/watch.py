@@ -0,0 +1,257 @@
+import os, shutil, threading, time
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+from main import (CONTENT_PATH, STATIC_PATH, TEMPLATE_PATH, DESTINATION_PATH,
+                  build_site, discover_pages, generate_page, index_images, load_critical_css)
+from manifest import file_hash, remove_empty_parents
+from imagemeta import IMAGE_EXTENSIONS
+from template import get_critical_css, get_image_sizes, set_critical_css
+
+RELOAD_PATH = "/__livereload"
+RELOAD_SCRIPT = f'<script>new EventSource("{RELOAD_PATH}").onmessage = () => location.reload();</script>'
+
+
+def snapshot(paths):
+    # Polling fallback that needs nothing outside the standard library:
+    # remember (mtime, size) of every file and compare on the next poll
+    state = {}
+    for path in paths:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            state[os.path.normpath(path)] = (stat.st_mtime_ns, stat.st_size)
+            continue
+        for root, _, files in os.walk(path):
+            for name in files:
+                file_path = os.path.normpath(os.path.join(root, name))
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue  # deleted between listing and stat, the next poll sees it
+                state[file_path] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+def diff_snapshots(old, new):
+    changed = sorted(path for path, stamp in new.items() if old.get(path) != stamp)
+    removed = sorted(path for path in old if path not in new)
+    return changed, removed
+
+def inside(path, folder):
+    relative_path = os.path.relpath(path, folder)
+    return relative_path != os.curdir and not relative_path.startswith(os.pardir)
+
+
+class SiteWatcher():
+    """Keeps ./docs in step with content/, static/ and template.html.
+
+    Only the pages and assets whose sources changed are rebuilt; a changed
+    template re-renders every page since they all embed it. build_options
+    (jobs, image_sizes, minify, critical_css, tree_cache) go to build_site,
+    which also sets up the single-page rebuilds to match.
+    """
+
+    def __init__(self, basepath="/", checksum=False, content_path=CONTENT_PATH, static_path=STATIC_PATH,
+                 template_path=TEMPLATE_PATH, destination_path=DESTINATION_PATH, build_options=None):
+        self.basepath = basepath
+        self.checksum = checksum
+        self.build_options = dict(build_options or {})
+        self.content_path = os.path.normpath(content_path)
+        self.static_path = os.path.normpath(static_path)
+        self.template_path = os.path.normpath(template_path)
+        self.destination_path = os.path.normpath(destination_path)
+        self.manifest = None
+        self.state = {}
+
+    def watched_paths(self):
+        return [self.content_path, self.static_path, self.template_path]
+
+    def full_build(self):
+        self.manifest, _ = build_site(self.basepath, checksum=self.checksum,
+                                      content_path=self.content_path, static_path=self.static_path,
+                                      template_path=self.template_path, destination_path=self.destination_path,
+                                      **self.build_options)
+        self.state = snapshot(self.watched_paths())
+
+    def poll(self):
+        # Returns True when something was rebuilt
+        current = snapshot(self.watched_paths())
+        changed, removed = diff_snapshots(self.state, current)
+        self.state = current
+        if not changed and not removed:
+            return False
+        self.apply_changes(changed, removed)
+        return True
+
+    def page_output(self, source_path):
+        relative_path = os.path.relpath(source_path, self.content_path)
+        return os.path.join(self.destination_path, os.path.splitext(relative_path)[0] + ".html")
+
+    def asset_output(self, source_path):
+        return os.path.join(self.destination_path, os.path.relpath(source_path, self.static_path))
+
+    def apply_changes(self, changed, removed):
+        started = time.perf_counter()
+
+        rerender_all = False
+        if self.template_path in changed or self.template_path in removed:
+            print(f"🎨 Template '{self.template_path}' changed, re-rendering every page.")
+            self.manifest.refresh_template(self.template_path)
+            rerender_all = True
+        if any(inside(path, self.static_path) and path.lower().endswith(IMAGE_EXTENSIONS) for path in changed + removed):
+            # Pages carry the image sizes, so they need re-rendering if any size changed
+            if self.refresh_image_sizes():
+                print("🖼️ Image sizes changed, re-rendering every page.")
+                rerender_all = True
+        critical_css_path = os.path.join(self.static_path, "index.css")
+        if get_critical_css() is not None and critical_css_path in changed + removed:
+            # Every page inlines its share of the stylesheet
+            print(f"🎨 Critical CSS '{critical_css_path}' changed, re-rendering every page.")
+            set_critical_css(load_critical_css(self.static_path, self.manifest, self.basepath))
+            rerender_all = True
+        if rerender_all:
+            changed = [path for path in changed if not inside(path, self.content_path)]
+            changed += [from_path for from_path, _ in discover_pages(self.content_path, self.destination_path)]
+
+        for path in changed:
+            if inside(path, self.content_path) and path.endswith('.md'):
+                self.build_page(path)
+            elif inside(path, self.static_path):
+                self.copy_asset(path)
+
+        for path in removed:
+            if inside(path, self.content_path) and path.endswith('.md'):
+                self.remove_output(self.page_output(path))
+            elif inside(path, self.static_path):
+                self.remove_output(self.asset_output(path))
+
+        self.manifest.save()
+        print(f"⚡ Rebuilt in {(time.perf_counter() - started) * 1000:.1f} ms.")
+
+    def refresh_image_sizes(self):
+        # Returns True when the sizes pages get to see are different now
+        old_sizes = get_image_sizes()
+        if old_sizes is None:
+            return False
+        index_images(self.static_path, self.destination_path, self.manifest)
+        return get_image_sizes() != old_sizes
+
+    def build_page(self, source_path):
+        # Returns the error when the page failed to build, None when it built
+        dest_path = self.page_output(source_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        try:
+            generate_page(source_path, self.template_path, dest_path, self.basepath)
+        except Exception as caught:
+            # Keep watching; the page gets another go on its next save
+            error = f"{type(caught).__name__}: {caught}"
+            print(f"🚨 Failed to generate '{source_path}': {error}")
+            return error
+        self.manifest.record_page(dest_path, source_path, file_hash(source_path))
+        return None
+
+    def copy_asset(self, source_path):
+        dest_path = self.asset_output(source_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        shutil.copy2(source_path, dest_path)
+        print(f"📄 Copied file: '{source_path}' → '{dest_path}'")
+        self.manifest.record_asset(dest_path)
+
+    def remove_output(self, dest_path):
+        if os.path.isfile(dest_path):
+            os.remove(dest_path)
+            print(f"🗑️ Output deleted: {dest_path}")
+        remove_empty_parents(os.path.dirname(dest_path), self.destination_path)
+        self.manifest.forget(dest_path)
+
+
+class ReloadBroadcaster():
+    # Bumps a version number on every rebuild; event-stream handlers wait for it to move
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, seen_version, timeout=None):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != seen_version, timeout)
+            return self.version
+
+
+def inject_reload_script(html):
+    position = html.rfind("</body>")
+    if position == -1:
+        return html + RELOAD_SCRIPT
+    return html[:position] + RELOAD_SCRIPT + html[position:]
+
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    broadcaster = None
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0].split('#', 1)[0]
+        if path == RELOAD_PATH:
+            return self.stream_reloads()
+
+        file_path = self.translate_path(path)
+        if path.endswith('/'):
+            file_path = os.path.join(file_path, "index.html")
+        if not (file_path.endswith('.html') and os.path.isfile(file_path)):
+            return super().do_GET()
+
+        with open(file_path, 'r', encoding='utf-8') as file:
+            body = inject_reload_script(file.read()).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_reloads(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        seen_version = self.broadcaster.version
+        try:
+            while True:
+                version = self.broadcaster.wait(seen_version, timeout=15)
+                if version == seen_version:
+                    # Keep-alive comment, also how we notice the tab went away
+                    self.wfile.write(b": ping\n\n")
+                else:
+                    seen_version = version
+                    self.wfile.write(b"data: reload\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        if not self.path.startswith(RELOAD_PATH):
+            super().log_message(format, *args)
+
+
+def watch(basepath="/", port=8888, interval=0.2, checksum=False, destination_path=DESTINATION_PATH, **build_options):
+    watcher = SiteWatcher(basepath, checksum, destination_path=destination_path, build_options=build_options)
+    watcher.full_build()
+
+    broadcaster = ReloadBroadcaster()
+    handler = type("SiteReloadHandler", (LiveReloadHandler,), {"broadcaster": broadcaster})
+    server = ThreadingHTTPServer(("127.0.0.1", port),
+                                 lambda *args, **kwargs: handler(*args, directory=watcher.destination_path, **kwargs))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"👀 Watching {', '.join(watcher.watched_paths())} and serving http://127.0.0.1:{port}/")
+
+    try:
+        while True:
+            time.sleep(interval)
+            if watcher.poll():
+                broadcaster.notify()
+    except KeyboardInterrupt:
+        print("👋 Stopped watching.")
+    finally:
+        server.shutdown()